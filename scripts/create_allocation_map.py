@@ -3,19 +3,22 @@ from pathlib import Path
 
 import pandas as pd
 import pgeocode
-import plotly.express as px
 from plotly import io as pio
 
+from ioe.data.data_input import (
+    SCHEMA_MATCHES,
+    SCHEMA_SCHOOLS,
+    SCHEMA_STUDENTS,
+    read_data,
+)
+from ioe.maps import create_allocation_figure
+
 LATITUDE_COL = "latitude"
 LONGITUDE_COL = "longitude"
 MATCHES_SCHOOL_ID = "allocation_school_id"
 SCHOOL_ID = "SE2 PP: Code"
-SCHOOL_LATITUDE = "latitude_school"
-SCHOOL_LONGITUDE = "longitude_school"
 SCHOOL_POSTCODE = "SE2 PP: PC"
 STUDENT_ID = "ST: ID"
-STUDENT_LATITUDE = "latitude_student"
-STUDENT_LONGITUDE = "longitude_student"
 STUDENT_POSTCODE = "ST: Term PC"
 
 _file_location = Path(__file__).resolve()
@@ -35,121 +38,41 @@ def _read_data(
         The three prepared dataframes.
     """
     # prepare whole school data
-    schools = (
-        pd.read_csv(
-            _file_location.parents[1] / "data" / f"{subject}_schools.csv",
-            usecols=[SCHOOL_ID, LATITUDE_COL, LONGITUDE_COL],
-        )
-        .rename(
-            columns={LONGITUDE_COL: SCHOOL_LONGITUDE, LATITUDE_COL: SCHOOL_LATITUDE}
-        )
-        .convert_dtypes()
+    schools = read_data(
+        _file_location.parents[1] / "data" / f"{subject}_schools.csv",
+        schema=SCHEMA_SCHOOLS,
+        usecols=[SCHOOL_ID, LATITUDE_COL, LONGITUDE_COL],
     )
     # prepare whole student data
-    students = (
-        pd.read_csv(
-            _file_location.parents[1] / "data" / f"{subject}_students.csv",
-            usecols=[STUDENT_ID, LATITUDE_COL, LONGITUDE_COL],
-        )
-        .rename(
-            columns={LONGITUDE_COL: STUDENT_LONGITUDE, LATITUDE_COL: STUDENT_LATITUDE}
-        )
-        .convert_dtypes()
+    students = read_data(
+        _file_location.parents[1] / "data" / f"{subject}_students.csv",
+        schema=SCHEMA_STUDENTS,
+        usecols=[STUDENT_ID, LATITUDE_COL, LONGITUDE_COL],
     )
     # prepare spopt allocated data
-    matches = pd.read_csv(
+    matches = read_data(
         _file_location.parents[1] / "data" / f"{subject}_matches.csv",
-        usecols=[
-            STUDENT_ID,
-            MATCHES_SCHOOL_ID,
-        ],
-    ).convert_dtypes()
+        schema=SCHEMA_MATCHES,
+        usecols=[STUDENT_ID, MATCHES_SCHOOL_ID],
+    )
     return schools, students, matches
 
 
-def _prepare_data(
+def _prepare_plot(
+    subject: str,
     schools: pd.DataFrame,
     students: pd.DataFrame,
     matches: pd.DataFrame,
-) -> pd.DataFrame:
-    """Merges the three dataframes to make a singular dataframe with
-    student/school ID and the lat lon coordinates.
+) -> None:
+    """Creates the plot of points on a map.
 
     Args:
+        subject: The name of the subject to process.
         schools: All school data.
         students: All students data.
         matches: The matched student-school data.
-
-    Returns:
-        The prepared dataframe of coordinates.
     """
-    # merge all schools on the student matches
-    schools_merge_matches = schools.merge(
-        matches, how="left", left_on=SCHOOL_ID, right_on=MATCHES_SCHOOL_ID
-    ).drop(columns=MATCHES_SCHOOL_ID)
-    # merge students with the composite matches
-    matches_merge_students = schools_merge_matches.merge(
-        students, how="left", on=STUDENT_ID
-    )
-    # remove NaNs
-    return matches_merge_students.dropna()
-
-
-def _prepare_connecting_lines(df: pd.DataFrame) -> pd.DataFrame:
-    """Prepares the dataframe in a format such that lines can be drawn on the map.
-
-    Args:
-        df: The prepared dataframe with NaNs removed.
-
-    Returns:
-        A dataframe alternating with school row followed by a student row.
-    """
-    return pd.DataFrame(
-        {
-            "ID": df[[SCHOOL_ID, STUDENT_ID]].values.reshape(-1),
-            LATITUDE_COL: df[[SCHOOL_LATITUDE, STUDENT_LATITUDE]].values.reshape(-1),
-            LONGITUDE_COL: df[[SCHOOL_LONGITUDE, STUDENT_LONGITUDE]].values.reshape(-1),
-        }
-    )
-
-
-def _prepare_plot(subject: str, df: pd.DataFrame) -> None:
-    """Creates the plot of points on a map.
-
-    Args:
-        subject: The name of the subject to process.
-        df: The prepared datafame.
-    """
-    # plot all schools
-    fig = px.scatter_mapbox(
-        df,
-        lat=SCHOOL_LATITUDE,
-        lon=SCHOOL_LONGITUDE,
-        color_discrete_sequence=["red"],
-    )
-    # plot all students
-    students = px.scatter_mapbox(
-        df,
-        lat=STUDENT_LATITUDE,
-        lon=STUDENT_LONGITUDE,
-        color_discrete_sequence=["blue"],
-    )
-    fig.add_trace(students.data[0])
-
-    # connect the student-school pairs
-    df_combined_lat_lon = _prepare_connecting_lines(df.dropna())
-    for i in range(0, len(df_combined_lat_lon), 2):
-        connection = px.line_mapbox(
-            df_combined_lat_lon.loc[i : i + 1],
-            lat=LATITUDE_COL,
-            lon=LONGITUDE_COL,
-            color_discrete_sequence=["black"],
-        )
-        fig.add_trace(connection.data[0])
-
-    # prepare final output
-    fig.update_layout(mapbox_style="open-street-map")
-    fig.update_layout(margin={"r": 0, "t": 0, "l": 0, "b": 0})
+    fig = create_allocation_figure(schools, students, matches)
     filename = f"matched_student_school_pairs_{subject}"
     fig.write_html(_file_location.parent / f"{filename}.html")
     pio.show(fig, config={"toImageButtonOptions": {"filename": filename}})
@@ -163,8 +86,7 @@ def main(subject: str) -> None:
         subject: The name of the subject.
     """
     schools, students, matches = _read_data(subject)
-    df = _prepare_data(schools, students, matches)
-    _prepare_plot(subject, df)
+    _prepare_plot(subject, schools, students, matches)
 
 
 if __name__ == "__main__":
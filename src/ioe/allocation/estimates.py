@@ -0,0 +1,28 @@
+import numpy as np
+
+from ioe.constants import MINUTES, OPTIMISTIC_SPEEDS_KMH
+
+
+def lower_bound_travel_times(distances: np.ndarray, travel: np.ndarray) -> np.ndarray:
+    """Optimistic travel time estimates for every student school pair
+
+    The straight-line distance is covered at `OPTIMISTIC_SPEEDS_KMH`, which no
+    real journey of the travel mode should beat, so the estimate is a lower
+    bound on the time of every pair, routed or not. For public transport this
+    allows for fast rail into London, and a journey beating it, i.e. from a
+    station on a high speed line, breaks the bound.
+
+    Args:
+        distances: The students by schools matrix of straight-line distances
+        travel: The travel mode of each student, i.e. "P", "B" or "C"
+
+    Returns:
+        The students by schools matrix of estimated minutes
+    """
+    speeds = np.array(
+        [
+            OPTIMISTIC_SPEEDS_KMH.get(t, max(OPTIMISTIC_SPEEDS_KMH.values()))
+            for t in travel
+        ]
+    )
+    return distances * MINUTES / speeds[:, np.newaxis]
@@ -0,0 +1,168 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pulp
+
+from ioe.allocation.estimates import lower_bound_travel_times
+from ioe.allocation.pmedian import (
+    create_cost_matrix,
+    find_priority_column,
+    solve_allocation,
+)
+from ioe.constants import (
+    COLUMN_SCHOOL_ID,
+    COLUMN_STUDENT_ID,
+    COLUMN_TRAVEL,
+    LARGE_VALUE_PLACEHOLDER,
+)
+from ioe.data.accumulator import PairAccumulator
+from ioe.main import compute_pair_journeys
+from ioe.spatial import pairwise_distances
+
+_logger = logging.getLogger(__name__)
+
+
+def _find_candidate_pairs(
+    cost_matrix: np.ndarray,
+    estimates: np.ndarray,
+    allocation: np.ndarray,
+    *,
+    n_alternatives: int,
+) -> np.ndarray:
+    """Find the pairs which could change the allocation
+
+    These are the current allocation, the cheapest alternatives of each student
+    and any pair whose estimate beats the cost of the current allocation, i.e.
+    the estimated reduced cost is negative.
+
+    Args:
+        cost_matrix: The current best known costs
+        estimates: The estimated costs
+        allocation: The index of the allocated school of each student
+        n_alternatives: The number of cheapest schools to consider per student
+
+    Returns:
+        A students by schools mask of the candidate pairs
+    """
+    students = np.arange(cost_matrix.shape[0])
+    candidates = np.zeros(cost_matrix.shape, dtype=bool)
+    candidates[students, allocation] = True
+    n_alternatives = min(n_alternatives, cost_matrix.shape[1])
+    cheapest = np.argpartition(cost_matrix, n_alternatives - 1, axis=1)
+    candidates[students[:, np.newaxis], cheapest[:, :n_alternatives]] = True
+    reduced_costs = estimates - cost_matrix[students, allocation][:, np.newaxis]
+    return candidates | (reduced_costs < 0)
+
+
+def _record_journeys(
+    times: np.ndarray,
+    records: PairAccumulator,
+    students: pd.DataFrame,
+    schools: pd.DataFrame,
+    *,
+    failed: bool,
+) -> None:
+    """Store the real time of the found journeys or failures in place
+
+    Args:
+        times: The students by schools matrix of real times
+        records: The journeys or failures output
+        students: The students dataframe
+        schools: The schools dataframe
+        failed: Whether the records are failures
+    """
+    student_index = pd.Index(students[COLUMN_STUDENT_ID]).get_indexer(
+        records.student_ids
+    )
+    school_index = pd.Index(schools[COLUMN_SCHOOL_ID]).get_indexer(records.school_ids)
+    times[student_index, school_index] = (
+        LARGE_VALUE_PLACEHOLDER if failed else records.values
+    )
+
+
+def lazy_allocation(  # noqa: PLR0913
+    subject: str,
+    students: pd.DataFrame,
+    schools: pd.DataFrame,
+    *,
+    journeys: pd.DataFrame | None = None,
+    keep_messages: bool = True,
+    max_iterations: int = 100,
+    n_alternatives: int = 2,
+    n_cores: int = 1,
+    solver: pulp.LpSolver | None = None,
+) -> tuple[PairAccumulator, PairAccumulator, np.ndarray]:
+    """Allocate students whilst only routing the pairs which matter
+
+    Every travel time starts as an optimistic estimate. The allocation is
+    solved repeatedly, requesting real times only for the candidate pairs
+    which could change it. As long as the estimates are lower bounds, once
+    every allocated pair has a real time no unrouted pair can improve on it
+    and the allocation has the objective of the one from the full matrix.
+    Already known journeys, i.e. of a previous run, are not requested again.
+
+    Args:
+        subject: The subject
+        students: The students dataframe
+        schools: The schools dataframe
+        journeys (optional): Already known journeys. Defaults to None.
+        keep_messages (optional): Whether to keep the route messages.
+            Defaults to True.
+        max_iterations (optional): The maximum number of solves. Defaults to 100.
+        n_alternatives (optional): The cheapest schools per student to route.
+            Defaults to 2.
+        n_cores (optional): The number of cores to parallelise over. Defaults to 1.
+        solver (optional): The `pulp` solver. Defaults to CBC.
+
+    Returns:
+        The newly found journeys and failures and the allocated school indices
+    """
+    priority_column = find_priority_column(schools)
+    distances = pairwise_distances(students, schools)
+    travel = students[COLUMN_TRAVEL].to_numpy()
+    times = np.full(distances.shape, np.nan)
+    if journeys is not None:
+        known = create_cost_matrix(journeys, students, schools)
+        times[known != LARGE_VALUE_PLACEHOLDER] = known[
+            known != LARGE_VALUE_PLACEHOLDER
+        ]
+
+    found_journeys = PairAccumulator(keep_text=keep_messages)
+    found_failures = PairAccumulator()
+    estimates = lower_bound_travel_times(distances, travel)
+    for iteration in range(max_iterations):
+        evaluated = ~np.isnan(times)
+        cost_matrix = np.where(evaluated, times, estimates)
+        allocation = solve_allocation(
+            cost_matrix, schools, priority_column=priority_column, solver=solver
+        )
+        allocated = evaluated[np.arange(len(students)), allocation]
+        _logger.info(
+            f"Iteration {iteration}: {evaluated.sum()}/{evaluated.size} pairs "
+            f"evaluated, {(~allocated).sum()} allocations estimated "
+            f"for subject {subject}"
+        )
+        if allocated.all():
+            break
+        candidates = _find_candidate_pairs(
+            cost_matrix, estimates, allocation, n_alternatives=n_alternatives
+        )
+        new_journeys, new_failures = compute_pair_journeys(
+            subject,
+            students,
+            schools,
+            np.argwhere(candidates & ~evaluated),
+            keep_messages=keep_messages,
+            n_cores=n_cores,
+        )
+        _record_journeys(times, new_journeys, students, schools, failed=False)
+        _record_journeys(times, new_failures, students, schools, failed=True)
+        found_journeys.extend(new_journeys)
+        found_failures.extend(new_failures)
+    else:
+        _logger.warning(
+            f"Allocation not stable after {max_iterations} iterations "
+            f"for subject {subject}"
+        )
+    return found_journeys, found_failures, allocation
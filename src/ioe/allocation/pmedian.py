@@ -0,0 +1,269 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pulp
+from scipy import sparse
+from spopt.locate import PMedian
+
+from ioe.constants import (
+    COLUMN_COUNT,
+    COLUMN_SCHOOL_ID,
+    COLUMN_STUDENT_ID,
+    LARGE_VALUE_PLACEHOLDER,
+    SUFFIX_SCHOOL_PRIORITY,
+)
+
+_logger = logging.getLogger(__name__)
+
+
+def find_priority_column(schools: pd.DataFrame) -> str:
+    """Find the subject specific priority column, i.e. `MAT priority`
+
+    Args:
+        schools: The schools dataframe
+
+    Returns:
+        The name of the priority column
+    """
+    columns = [c for c in schools.columns if c.endswith(SUFFIX_SCHOOL_PRIORITY)]
+    if len(columns) != 1:
+        error = f"Expected one priority column in the schools data, found {columns}"
+        raise ValueError(error)
+    return columns[0]
+
+
+def create_cost_matrix(
+    journeys: pd.DataFrame, students: pd.DataFrame, schools: pd.DataFrame
+) -> np.ndarray:
+    """Create the students by schools cost matrix from the journeys output
+
+    Pairs without a journey are filled with `LARGE_VALUE_PLACEHOLDER`.
+
+    Args:
+        journeys: The journeys with student, school and time columns
+        students: The students dataframe
+        schools: The schools dataframe
+
+    Returns:
+        The cost matrix ordered as the students and schools
+    """
+    cost_matrix = np.full(
+        (len(students), len(schools)), LARGE_VALUE_PLACEHOLDER, dtype=int
+    )
+    student_index = pd.Index(students[COLUMN_STUDENT_ID]).get_indexer(
+        journeys["student"]
+    )
+    school_index = pd.Index(schools[COLUMN_SCHOOL_ID]).get_indexer(journeys["school"])
+    known = (student_index >= 0) & (school_index >= 0)
+    cost_matrix[student_index[known], school_index[known]] = journeys["time"].to_numpy(
+        dtype=int
+    )[known]
+    return cost_matrix
+
+
+def create_sparse_cost_matrix(
+    journeys: pd.DataFrame, students: pd.DataFrame, schools: pd.DataFrame
+) -> sparse.csr_array:
+    """Create the students by schools cost matrix holding only the journeys
+
+    Pairs without a journey, never routed or failed, are not stored rather
+    than filled with `LARGE_VALUE_PLACEHOLDER`, so a journey of zero minutes
+    is an explicit zero.
+
+    Args:
+        journeys: The journeys with student, school and time columns
+        students: The students dataframe
+        schools: The schools dataframe
+
+    Returns:
+        The sparse cost matrix ordered as the students and schools
+    """
+    student_index = pd.Index(students[COLUMN_STUDENT_ID]).get_indexer(
+        journeys["student"]
+    )
+    school_index = pd.Index(schools[COLUMN_SCHOOL_ID]).get_indexer(journeys["school"])
+    known = np.flatnonzero((student_index >= 0) & (school_index >= 0))
+    # the last journey of a pair wins as in the dense matrix
+    flat = student_index[known] * len(schools) + school_index[known]
+    _, last = np.unique(flat[::-1], return_index=True)
+    known = known[len(known) - 1 - last]
+    return sparse.csr_array(
+        (
+            journeys["time"].to_numpy(dtype=int)[known],
+            (student_index[known], school_index[known]),
+        ),
+        shape=(len(students), len(schools)),
+    )
+
+
+def create_pmedian(
+    cost_matrix: np.ndarray,
+    schools: pd.DataFrame,
+    *,
+    priority_column: str | None = None,
+) -> PMedian:
+    """Build the capacitated p-median model as in the reproducible example
+
+    Every student has a demand of one, the priority one schools must be
+    fulfilled and the capacities come from the count of each school.
+
+    Args:
+        cost_matrix: The students by schools cost matrix
+        schools: The schools dataframe
+        priority_column (optional): The priority column. Defaults to None.
+
+    Returns:
+        The unsolved p-median model
+    """
+    priority_column = priority_column or find_priority_column(schools)
+    n_students = cost_matrix.shape[0]
+    return PMedian.from_cost_matrix(
+        cost_matrix,
+        np.ones(n_students),
+        p_facilities=n_students,
+        predefined_facilities_arr=np.flatnonzero(schools[priority_column] == 1),
+        facility_capacities=schools[COLUMN_COUNT].to_numpy(),
+        fulfill_predefined_fac=True,
+    )
+
+
+def create_sparse_pmedian(
+    cost_matrix: sparse.csr_array,
+    schools: pd.DataFrame,
+    *,
+    priority_column: str | None = None,
+) -> tuple[pulp.LpProblem, list[pulp.LpVariable]]:
+    """Build the capacitated p-median of `create_pmedian` on the stored pairs
+
+    The constraints are those of `spopt`, but a student can only be assigned
+    to the schools it has a journey to, so the model grows with the number
+    of pairs rather than students times schools.
+
+    Args:
+        cost_matrix: The sparse students by schools cost matrix
+        schools: The schools dataframe
+        priority_column (optional): The priority column. Defaults to None.
+
+    Returns:
+        The unsolved problem and the assignment variable of each stored pair
+    """
+    priority_column = priority_column or find_priority_column(schools)
+    n_students, n_schools = cost_matrix.shape
+    n_pairs = np.diff(cost_matrix.indptr)
+    if (n_pairs == 0).any():
+        error = (
+            f"Students at positions {np.flatnonzero(n_pairs == 0).tolist()} "
+            "have no journey to any school"
+        )
+        raise ValueError(error)
+
+    rows = np.repeat(np.arange(n_students), n_pairs)
+    problem = pulp.LpProblem("allocation", pulp.LpMinimize)
+    schools_open = [
+        pulp.LpVariable(f"y[{j}]", cat=pulp.LpBinary) for j in range(n_schools)
+    ]
+    assigned = [
+        pulp.LpVariable(f"z[{i}_{j}]", cat=pulp.LpBinary)
+        for i, j in zip(rows, cost_matrix.indices, strict=True)
+    ]
+    problem += pulp.lpSum(
+        int(c) * z for c, z in zip(cost_matrix.data, assigned, strict=True)
+    )
+    for i in range(n_students):
+        pairs = range(cost_matrix.indptr[i], cost_matrix.indptr[i + 1])
+        problem += pulp.lpSum(assigned[k] for k in pairs) == 1
+    for k, j in enumerate(cost_matrix.indices):
+        problem += schools_open[j] - assigned[k] >= 0
+    problem += pulp.lpSum(schools_open) == n_students
+
+    capacities = schools[COLUMN_COUNT].to_numpy(dtype=int)
+    predefined = schools[priority_column].to_numpy() == 1
+    by_school = np.argsort(cost_matrix.indices, kind="stable")
+    bounds = np.searchsorted(cost_matrix.indices[by_school], np.arange(n_schools + 1))
+    for j in range(n_schools):
+        students_at = pulp.lpSum(
+            assigned[k] for k in by_school[bounds[j] : bounds[j + 1]]
+        )
+        problem += students_at <= int(capacities[j]) * schools_open[j]
+        if predefined[j]:
+            schools_open[j].lowBound = 1
+            problem += students_at >= int(capacities[j])
+    return problem, assigned
+
+
+def solve_allocation(
+    cost_matrix: np.ndarray | sparse.csr_array,
+    schools: pd.DataFrame,
+    *,
+    priority_column: str | None = None,
+    solver: pulp.LpSolver | None = None,
+) -> np.ndarray:
+    """Solve the allocation and find the school allocated to each student
+
+    A sparse cost matrix is solved with `create_sparse_pmedian`, so only its
+    stored pairs can be allocated.
+
+    Args:
+        cost_matrix: The students by schools cost matrix, dense or sparse
+        schools: The schools dataframe
+        priority_column (optional): The priority column. Defaults to None.
+        solver (optional): The `pulp` solver. Defaults to CBC.
+
+    Returns:
+        The index of the allocated school for each student
+    """
+    if sparse.issparse(cost_matrix):
+        return _solve_sparse_allocation(
+            cost_matrix, schools, priority_column=priority_column, solver=solver
+        )
+
+    pmedian = create_pmedian(cost_matrix, schools, priority_column=priority_column)
+    pmedian.problem.solve(solver or pulp.PULP_CBC_CMD(msg=False))
+    if pmedian.problem.status != pulp.LpStatusOptimal:
+        error = f"The allocation is {pulp.LpStatus[pmedian.problem.status].lower()}"
+        raise ValueError(error)
+    pmedian.facility_client_array()
+    pmedian.client_facility_array()
+    _logger.info(
+        f"Solved allocation with objective {pulp.value(pmedian.problem.objective)}"
+    )
+    return np.array([fac[0] for fac in pmedian.cli2fac])
+
+
+def _solve_sparse_allocation(
+    cost_matrix: sparse.csr_array,
+    schools: pd.DataFrame,
+    *,
+    priority_column: str | None,
+    solver: pulp.LpSolver | None,
+) -> np.ndarray:
+    """Solve the allocation over the stored pairs of a sparse cost matrix
+
+    Args:
+        cost_matrix: The sparse students by schools cost matrix
+        schools: The schools dataframe
+        priority_column: The priority column, or None to find it
+        solver: The `pulp` solver, or None for CBC
+
+    Returns:
+        The index of the allocated school for each student
+    """
+    cost_matrix = sparse.csr_array(cost_matrix)
+    problem, assigned = create_sparse_pmedian(
+        cost_matrix, schools, priority_column=priority_column
+    )
+    problem.solve(solver or pulp.PULP_CBC_CMD(msg=False))
+    if problem.status != pulp.LpStatusOptimal:
+        error = f"The allocation is {pulp.LpStatus[problem.status].lower()}"
+        raise ValueError(error)
+    _logger.info(
+        f"Solved allocation over {cost_matrix.nnz}/{np.prod(cost_matrix.shape)} "
+        f"pairs with objective {pulp.value(problem.objective)}"
+    )
+    chosen = np.array([pulp.value(z) for z in assigned]) > 0.5  # noqa: PLR2004
+    allocation = np.empty(cost_matrix.shape[0], dtype=int)
+    allocation[
+        np.repeat(np.arange(cost_matrix.shape[0]), np.diff(cost_matrix.indptr))[chosen]
+    ] = cost_matrix.indices[chosen]
+    return allocation
@@ -0,0 +1,239 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, NamedTuple
+
+import numpy as np
+import pandas as pd
+import pulp
+
+from ioe.allocation.pmedian import find_priority_column
+from ioe.constants import COLUMN_COUNT, COLUMN_SCHOOL_ID
+
+_logger = logging.getLogger(__name__)
+
+_model: "AllocationModel | None" = None
+
+
+class Scenario(NamedTuple):
+    """A variant of the capacities, priorities and number of schools to open"""
+
+    capacity_scale: float = 1.0
+    predefined_priorities: tuple[int, ...] = (1,)
+    excluded_priorities: tuple[int, ...] = ()
+    p_facilities: int | None = None
+
+    def __str__(self) -> str:
+        return (
+            f"capacity x{self.capacity_scale:g}, "
+            f"predefined {list(self.predefined_priorities)}, "
+            f"excluded {list(self.excluded_priorities)}, "
+            f"p {'all students' if self.p_facilities is None else self.p_facilities}"
+        )
+
+
+class AllocationModel(NamedTuple):
+    """The capacitated p-median whose scenario parameters can be changed
+
+    Every parameter which varies between scenarios is either a variable bound
+    or the right hand side of a named constraint, so a scenario is applied by
+    changing numbers rather than rebuilding the model.
+    """
+
+    problem: pulp.LpProblem
+    schools_open: list[pulp.LpVariable]
+    assigned: np.ndarray
+    cost_matrix: np.ndarray
+    capacities: np.ndarray
+    priorities: np.ndarray
+    school_ids: np.ndarray
+
+
+def create_allocation_model(
+    cost_matrix: np.ndarray,
+    schools: pd.DataFrame,
+    *,
+    priority_column: str | None = None,
+) -> AllocationModel:
+    """Build the capacitated p-median of `create_pmedian` in a changeable form
+
+    The capacity of a school is a bound on its number of students, which
+    together with each student only going to an open school is the same as
+    the capacity constraint of `spopt`.
+
+    Args:
+        cost_matrix: The students by schools cost matrix
+        schools: The schools dataframe
+        priority_column (optional): The priority column. Defaults to None.
+
+    Returns:
+        The model, with no scenario applied
+    """
+    priority_column = priority_column or find_priority_column(schools)
+    n_students, n_schools = cost_matrix.shape
+    problem = pulp.LpProblem("allocation", pulp.LpMinimize)
+    schools_open = [
+        pulp.LpVariable(f"y[{j}]", cat=pulp.LpBinary) for j in range(n_schools)
+    ]
+    assigned = np.array(
+        [
+            [
+                pulp.LpVariable(f"z[{i}_{j}]", cat=pulp.LpBinary)
+                for j in range(n_schools)
+            ]
+            for i in range(n_students)
+        ]
+    )
+    problem += pulp.lpSum(
+        int(cost_matrix[i, j]) * assigned[i, j]
+        for i in range(n_students)
+        for j in range(n_schools)
+    )
+    for i in range(n_students):
+        problem += pulp.lpSum(assigned[i]) == 1, f"assignment_{i}"
+        for j in range(n_schools):
+            problem += schools_open[j] - assigned[i, j] >= 0, f"opening_{i}_{j}"
+    problem += pulp.lpSum(schools_open) == n_students, "facilities"
+    for j in range(n_schools):
+        problem += pulp.lpSum(assigned[:, j]) <= 0, f"capacity_{j}"
+        problem += pulp.lpSum(assigned[:, j]) >= 0, f"fulfil_{j}"
+    return AllocationModel(
+        problem=problem,
+        schools_open=schools_open,
+        assigned=assigned,
+        cost_matrix=cost_matrix,
+        capacities=schools[COLUMN_COUNT].to_numpy(dtype=int),
+        priorities=schools[priority_column].to_numpy(dtype=int),
+        school_ids=schools[COLUMN_SCHOOL_ID].to_numpy(dtype=object),
+    )
+
+
+def scale_capacities(capacities: np.ndarray, scale: float) -> np.ndarray:
+    """Scale the total capacity and share it out in proportion to each school
+
+    Rounding each school on its own would leave the many schools with a
+    single place unchanged by a scale of 0.9 and close all of them at 0.5.
+    Instead the total is rounded once, each school keeps the whole part of
+    its scaled capacity and the places left go to the largest remainders,
+    ties to the earlier school. A school can so end up with no places.
+
+    Args:
+        capacities: The capacity of each school
+        scale: The factor to scale the total capacity by
+
+    Returns:
+        The scaled capacity of each school, summing to the rounded total
+    """
+    scaled = capacities * scale
+    result = np.floor(scaled).astype(int)
+    n_left = round(scaled.sum()) - result.sum()
+    result[np.argsort(result - scaled, kind="stable")[:n_left]] += 1
+    return result
+
+
+def _apply_scenario(model: AllocationModel, scenario: Scenario) -> None:
+    """Set every scenario parameter of the model in place
+
+    Args:
+        model: The allocation model
+        scenario: The scenario to apply
+    """
+    capacities = scale_capacities(model.capacities, scenario.capacity_scale)
+    excluded = np.isin(model.priorities, scenario.excluded_priorities)
+    predefined = np.isin(model.priorities, scenario.predefined_priorities) & ~excluded
+    constraints = model.problem.constraints
+    for j, school_open in enumerate(model.schools_open):
+        school_open.lowBound = int(predefined[j])
+        school_open.upBound = int(not excluded[j])
+        constraints[f"capacity_{j}"].changeRHS(int(capacities[j]))
+        constraints[f"fulfil_{j}"].changeRHS(int(capacities[j]) if predefined[j] else 0)
+    constraints["facilities"].changeRHS(
+        model.cost_matrix.shape[0]
+        if scenario.p_facilities is None
+        else scenario.p_facilities
+    )
+
+
+def _initialise_worker(model: AllocationModel) -> None:
+    """Keep the model in the worker process, run on its creation
+
+    Args:
+        model: The allocation model, with the values of the warm start
+    """
+    global _model  # noqa: PLW0603
+    _model = model
+
+
+def _solve_scenario(scenario: Scenario, *, warm_start: bool = True) -> dict[str, Any]:
+    """Solve the model of the process under a scenario and summarise it
+
+    Args:
+        scenario: The scenario to solve
+        warm_start (optional): Start from the current variable values.
+            Defaults to True.
+
+    Returns:
+        The objective, travel times and number of students at each school
+    """
+    assert _model is not None  # noqa: S101
+    _apply_scenario(_model, scenario)
+    _model.problem.solve(pulp.PULP_CBC_CMD(msg=False, warmStart=warm_start))
+    status = pulp.LpStatus[_model.problem.status]
+    summary: dict[str, Any] = {
+        "scenario": str(scenario),
+        **scenario._asdict(),
+        "status": status,
+    }
+    for field in ("predefined_priorities", "excluded_priorities"):
+        summary[field] = ",".join(map(str, summary[field])) or "none"
+    if _model.problem.status != pulp.LpStatusOptimal:
+        _logger.warning(f"Scenario {scenario} is {status.lower()}")
+        return summary
+
+    values = np.vectorize(pulp.value, otypes=[float])(_model.assigned)
+    allocation = values.argmax(axis=1)
+    times = _model.cost_matrix[np.arange(len(allocation)), allocation]
+    fill = np.bincount(allocation, minlength=len(_model.school_ids))
+    summary.update(
+        {
+            "objective": pulp.value(_model.problem.objective),
+            "mean_time": times.mean(),
+            "max_time": times.max(),
+        }
+    )
+    summary.update(
+        {f"fill {s}": n for s, n in zip(_model.school_ids, fill, strict=True)}
+    )
+    return summary
+
+
+def sweep_scenarios(
+    cost_matrix: np.ndarray,
+    schools: pd.DataFrame,
+    scenarios: list[Scenario],
+    *,
+    n_cores: int = 1,
+) -> pd.DataFrame:
+    """Solve the allocation under every scenario in parallel
+
+    The model is built once. The first scenario is solved on its own and its
+    solution is the warm start of all the others, which are solved in a
+    process pool each holding a copy of the model.
+
+    Args:
+        cost_matrix: The students by schools cost matrix
+        schools: The schools dataframe
+        scenarios: The scenarios to solve
+        n_cores (optional): The number of cores to parallelise over. Defaults to 1.
+
+    Returns:
+        The summary of each scenario
+    """
+    model = create_allocation_model(cost_matrix, schools)
+    _initialise_worker(model)
+    _logger.info(f"Solving the first of {len(scenarios)} scenarios: {scenarios[0]}")
+    summaries = [_solve_scenario(scenarios[0], warm_start=False)]
+    with ProcessPoolExecutor(
+        max_workers=n_cores, initializer=_initialise_worker, initargs=(model,)
+    ) as e:
+        summaries.extend(e.map(_solve_scenario, scenarios[1:]))
+    return pd.DataFrame(summaries)
@@ -0,0 +1,444 @@
+import logging
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from ioe.constants import (
+    COLUMN_LATITUDE,
+    COLUMN_LONGITUDE,
+    COLUMN_SCHOOL_ID,
+    COLUMN_STUDENT_ID,
+    COLUMN_TRAVEL,
+)
+from ioe.data.accumulator import PairAccumulator
+from ioe.main import compute_all_pairs_journeys, compute_pair_journeys
+from ioe.spatial import haversine_distances, pairwise_distances
+
+_logger = logging.getLogger(__name__)
+
+_VALIDATION_FOLDS = 5
+
+
+class ApproximationError(NamedTuple):
+    """The error of the approximate times on a sample of exactly routed pairs"""
+
+    n_pairs: int
+    mean_absolute: float
+    percentile_90: float
+    maximum: float
+    bias: float
+
+    def __str__(self) -> str:
+        return (
+            f"{self.n_pairs} pairs, mean absolute error {self.mean_absolute:.1f} "
+            f"min, 90th percentile {self.percentile_90:.1f} min, maximum "
+            f"{self.maximum:.1f} min, bias {self.bias:+.1f} min"
+        )
+
+
+class ValidationErrors(NamedTuple):
+    """The error of the approximate times with and without the correction
+
+    The corrected error is cross-validated, each pair being scored with the
+    gradients fitted on the other folds of the sample.
+    """
+
+    corrected: ApproximationError
+    uncorrected: ApproximationError
+    gradients: dict[str, float]
+
+    def __str__(self) -> str:
+        gradients = ", ".join(f"{m} {g:.2f}" for m, g in self.gradients.items())
+        return (
+            f"{self.corrected}, against {self.uncorrected} without the "
+            f"correction of {gradients} min/km"
+        )
+
+
+def cluster_students(
+    students: pd.DataFrame, *, radius_km: float
+) -> tuple[np.ndarray, np.ndarray]:
+    """Group nearby students with the same mode of travel
+
+    Each student not yet in a cluster becomes the representative of every
+    other such student of the same mode within the radius, so no student is
+    further than the radius from their representative.
+
+    Args:
+        students: The students dataframe
+        radius_km: The maximum distance to the representative in kilometres
+
+    Returns:
+        The cluster of each student and the position of each representative
+    """
+    latitudes = students[COLUMN_LATITUDE].to_numpy(dtype=float)
+    longitudes = students[COLUMN_LONGITUDE].to_numpy(dtype=float)
+    travel = students[COLUMN_TRAVEL].to_numpy()
+    labels = np.full(len(students), -1)
+    representatives: list[int] = []
+    for i in range(len(students)):
+        if labels[i] >= 0:
+            continue
+        candidates = np.flatnonzero((labels < 0) & (travel == travel[i]))
+        distances = haversine_distances(
+            latitudes[i], longitudes[i], latitudes[candidates], longitudes[candidates]
+        )
+        labels[candidates[distances <= radius_km]] = len(representatives)
+        representatives.append(i)
+    return labels, np.array(representatives, dtype=int)
+
+
+def distance_differences(
+    students: pd.DataFrame,
+    schools: pd.DataFrame,
+    labels: np.ndarray,
+    representatives: np.ndarray,
+) -> np.ndarray:
+    """How much further each student is from each school than its representative
+
+    Args:
+        students: The students dataframe
+        schools: The schools dataframe
+        labels: The cluster of each student
+        representatives: The position of the representative of each cluster
+
+    Returns:
+        The students by schools matrix of straight-line differences in kilometres
+    """
+    distances = pairwise_distances(students, schools)
+    return distances - distances[representatives[labels]]
+
+
+def _expand_records(  # noqa: PLR0913
+    records: PairAccumulator,
+    students: pd.DataFrame,
+    schools: pd.DataFrame,
+    labels: np.ndarray,
+    representatives: np.ndarray,
+    *,
+    corrections: np.ndarray | None = None,
+    exclude: np.ndarray | None = None,
+) -> PairAccumulator:
+    """Copy the records of each representative to every student of its cluster
+
+    Args:
+        records: The journeys or failures of the representatives
+        students: The students dataframe, with unique IDs
+        schools: The schools dataframe
+        labels: The cluster of each student
+        representatives: The position of the representative of each cluster
+        corrections (optional): The corrections to add to the times, None for
+            failures or no correction. Defaults to None.
+        exclude (optional): The students by schools mask of the pairs not to
+            copy to, i.e. routed exactly. Defaults to None.
+
+    Returns:
+        The journeys or failures of every student
+    """
+    student_ids = students[COLUMN_STUDENT_ID].to_numpy()
+    # the cluster of a representative is its position among the representatives
+    clusters = pd.Index(student_ids[representatives]).get_indexer(records.student_ids)
+    schools_at = pd.Index(schools[COLUMN_SCHOOL_ID]).get_indexer(records.school_ids)
+    members = pd.Series(np.arange(len(students))).groupby(labels).indices
+    expanded = PairAccumulator(keep_text=records.keep_text)
+    for (_, school, value, text), cluster, j in zip(
+        records, clusters, schools_at, strict=True
+    ):
+        for i in members[cluster]:
+            if exclude is not None and exclude[i, j]:
+                continue
+            expanded.append(
+                student_ids[i],
+                school,
+                value
+                if corrections is None
+                else max(round(value + corrections[i, j]), 0),
+                text or "",
+            )
+    return expanded
+
+
+def _sample_validation_pairs(
+    labels: np.ndarray,
+    representatives: np.ndarray,
+    n_schools: int,
+    n_pairs: int,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """Pick approximated pairs at random to route exactly
+
+    Args:
+        labels: The cluster of each student
+        representatives: The position of the representative of each cluster
+        n_schools: The number of schools
+        n_pairs: The number of pairs to pick
+        rng: The random number generator
+
+    Returns:
+        The positional indices of the student and school of each pair
+    """
+    others = np.setdiff1d(np.arange(len(labels)), representatives)
+    n_pairs = min(n_pairs, len(others) * n_schools)
+    flat = rng.choice(len(others) * n_schools, size=n_pairs, replace=False)
+    return np.column_stack((others[flat // n_schools], flat % n_schools))
+
+
+def _pair_times(
+    approximate: PairAccumulator,
+    exact: PairAccumulator,
+    students: pd.DataFrame,
+    schools: pd.DataFrame,
+) -> pd.DataFrame:
+    """Match the approximate times with the exactly routed ones
+
+    Args:
+        approximate: The approximate journeys
+        exact: The exact journeys of the validation sample
+        students: The students dataframe, with unique IDs
+        schools: The schools dataframe
+
+    Returns:
+        The position of the student and school and both times of each pair
+        found in both
+    """
+    exact_times, approximate_times = (
+        pd.DataFrame(
+            {"student": r.student_ids, "school": r.school_ids, "time": r.values}
+        )
+        for r in (exact, approximate)
+    )
+    pairs = exact_times.merge(
+        approximate_times,
+        on=["student", "school"],
+        suffixes=("_exact", "_approximate"),
+    )
+    return pairs.assign(
+        i=pd.Index(students[COLUMN_STUDENT_ID]).get_indexer(pairs["student"]),
+        j=pd.Index(schools[COLUMN_SCHOOL_ID]).get_indexer(pairs["school"]),
+    )
+
+
+def _fit_gradient(differences: np.ndarray, errors: np.ndarray) -> float:
+    """The gradient through the origin with the least absolute error
+
+    The weighted median of the error per kilometre, never negative, so the
+    times are left uncorrected if a correction would not help.
+
+    Args:
+        differences: The distance differences in kilometres
+        errors: The exact minus the uncorrected times
+
+    Returns:
+        The gradient in minutes per kilometre
+    """
+    nonzero = differences != 0
+    if not nonzero.any():
+        return 0.0
+    ratios = errors[nonzero] / differences[nonzero]
+    weights = np.abs(differences[nonzero])
+    order = np.argsort(ratios)
+    cumulative = np.cumsum(weights[order])
+    median = ratios[order][np.searchsorted(cumulative, cumulative[-1] / 2)]
+    return max(float(median), 0.0)
+
+
+def _fit_gradients(
+    pairs: pd.DataFrame, differences: np.ndarray, students: pd.DataFrame
+) -> dict[str, float]:
+    """Fit the minutes per extra kilometre of each mode on the validation pairs
+
+    Args:
+        pairs: The output of `_pair_times` for the uncorrected times
+        differences: The output of `distance_differences`
+        students: The students dataframe, with unique IDs
+
+    Returns:
+        The gradient of each mode of travel in minutes per kilometre
+    """
+    i, j = pairs["i"].to_numpy(), pairs["j"].to_numpy()
+    errors = (pairs["time_exact"] - pairs["time_approximate"]).to_numpy(dtype=float)
+    travel = students[COLUMN_TRAVEL].to_numpy()[i]
+    return {
+        mode: _fit_gradient(differences[i, j][travel == mode], errors[travel == mode])
+        for mode in np.unique(students[COLUMN_TRAVEL])
+    }
+
+
+def _correct_times(
+    pairs: pd.DataFrame,
+    differences: np.ndarray,
+    students: pd.DataFrame,
+    gradients: dict[str, float],
+) -> np.ndarray:
+    """Correct the approximate times of some pairs as `_expand_records` does
+
+    Args:
+        pairs: The output of `_pair_times` for the uncorrected times
+        differences: The output of `distance_differences`
+        students: The students dataframe, with unique IDs
+        gradients: The gradient of each mode of travel in minutes per kilometre
+
+    Returns:
+        The corrected time of each pair
+    """
+    i, j = pairs["i"].to_numpy(), pairs["j"].to_numpy()
+    gradient = students[COLUMN_TRAVEL].map(gradients).to_numpy(dtype=float)[i]
+    return np.maximum(
+        np.round(pairs["time_approximate"] + differences[i, j] * gradient), 0
+    )
+
+
+def _cross_validate(
+    pairs: pd.DataFrame,
+    differences: np.ndarray,
+    students: pd.DataFrame,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """Correct each validation pair with the gradients of the other folds
+
+    Args:
+        pairs: The output of `_pair_times` for the uncorrected times
+        differences: The output of `distance_differences`
+        students: The students dataframe, with unique IDs
+        rng: The random number generator
+
+    Returns:
+        The out of sample corrected time of each pair
+    """
+    folds = rng.permutation(len(pairs)) % _VALIDATION_FOLDS
+    corrected = np.empty(len(pairs))
+    for fold in range(_VALIDATION_FOLDS):
+        held_out = folds == fold
+        gradients = _fit_gradients(pairs[~held_out], differences, students)
+        corrected[held_out] = _correct_times(
+            pairs[held_out], differences, students, gradients
+        )
+    return corrected
+
+
+def _measure_error(errors: np.ndarray) -> ApproximationError:
+    """Summarise the errors of the approximate times
+
+    Args:
+        errors: The approximate minus the exact time of each validation pair
+
+    Returns:
+        The error summary
+    """
+    return ApproximationError(
+        n_pairs=len(errors),
+        mean_absolute=np.abs(errors).mean(),
+        percentile_90=np.percentile(np.abs(errors), 90),
+        maximum=np.abs(errors).max(),
+        bias=errors.mean(),
+    )
+
+
+def compute_approximate_journeys(  # noqa: PLR0913
+    subject: str,
+    students: pd.DataFrame,
+    schools: pd.DataFrame,
+    *,
+    radius_km: float,
+    keep_messages: bool = True,
+    n_cores: int = 1,
+    n_validation: int = 100,
+    seed: int | None = None,
+) -> tuple[PairAccumulator, PairAccumulator, ValidationErrors | None]:
+    """Approximate the journey times by only routing one student per cluster
+
+    The number of requests scales with the number of clusters rather than the
+    number of students. The journey of the representative is used for every
+    student of its cluster. A random sample of the other pairs is routed
+    exactly, and keeps its exact journeys. On it a correction for being
+    further from or closer to the school than the representative is fitted
+    per mode, and the error is measured with and without it.
+
+    Args:
+        subject: The subject
+        students: The students dataframe, with unique IDs
+        schools: The schools dataframe
+        radius_km: The maximum distance to the representative in kilometres
+        keep_messages (optional): Whether to keep the route messages.
+            Defaults to True.
+        n_cores (optional): The number of cores to parallelise over. Defaults to 1.
+        n_validation (optional): The number of pairs to route exactly, without
+            which the times are not corrected. Defaults to 100.
+        seed (optional): The seed of the validation sample. Defaults to None.
+
+    Returns:
+        The approximate journeys and failures and the measured errors
+    """
+    duplicated = students[COLUMN_STUDENT_ID].duplicated()
+    if duplicated.any():
+        error = (
+            f"Students {students.loc[duplicated, COLUMN_STUDENT_ID].unique().tolist()} "
+            "appear more than once, so their journeys cannot be told apart"
+        )
+        raise ValueError(error)
+    labels, representatives = cluster_students(students, radius_km=radius_km)
+    _logger.info(
+        f"{len(representatives)} clusters of {len(students)} students within "
+        f"{radius_km} km for subject {subject}"
+    )
+    routed, routed_failures = compute_all_pairs_journeys(
+        subject,
+        students.iloc[representatives],
+        schools,
+        keep_messages=keep_messages,
+        n_cores=n_cores,
+    )
+    journeys = _expand_records(routed, students, schools, labels, representatives)
+
+    rng = np.random.default_rng(seed)
+    pairs = _sample_validation_pairs(
+        labels, representatives, len(schools), n_validation, rng
+    )
+    if not len(pairs):
+        failures = _expand_records(
+            routed_failures, students, schools, labels, representatives
+        )
+        return journeys, failures, None
+    exact, exact_failures = compute_pair_journeys(
+        subject, students, schools, pairs, keep_messages=keep_messages, n_cores=n_cores
+    )
+    differences = distance_differences(students, schools, labels, representatives)
+    times = _pair_times(journeys, exact, students, schools)
+    gradients = _fit_gradients(times, differences, students)
+    corrections = (
+        differences
+        * students[COLUMN_TRAVEL].map(gradients).to_numpy(dtype=float)[:, np.newaxis]
+    )
+    # the sampled pairs were paid for, so keep their exact journeys
+    sampled = np.zeros(differences.shape, dtype=bool)
+    sampled[pairs[:, 0], pairs[:, 1]] = True
+    corrected = _expand_records(
+        routed,
+        students,
+        schools,
+        labels,
+        representatives,
+        corrections=corrections,
+        exclude=sampled,
+    )
+    corrected.extend(exact)
+    failures = _expand_records(
+        routed_failures, students, schools, labels, representatives, exclude=sampled
+    )
+    failures.extend(exact_failures)
+
+    if times.empty:
+        return corrected, failures, None
+    exact_times = times["time_exact"].to_numpy(dtype=float)
+    validation = ValidationErrors(
+        corrected=_measure_error(
+            _cross_validate(times, differences, students, rng) - exact_times
+        ),
+        uncorrected=_measure_error(
+            times["time_approximate"].to_numpy(dtype=float) - exact_times
+        ),
+        gradients=gradients,
+    )
+    _logger.info(f"Approximation error for subject {subject}: {validation}")
+    return corrected, failures, validation
@@ -1,27 +1,54 @@
 import logging
 import os
 
+ACCESS_SPEEDS_KMH = {"B": 15.0, "C": 30.0, "P": 5.0}
+BACKEND_OPENROUTESERVICE = "openrouteservice"
+BACKEND_TFL = "tfl"
+COLUMN_ALLOCATION_SCHOOL_ID = "allocation_school_id"
 COLUMN_COUNT = "Count"
 COLUMN_LATITUDE = "latitude"
 COLUMN_LONGITUDE = "longitude"
 COLUMN_PLACEMENT_STATUS = "PL: Status"
 COLUMN_SCHOOL_ID = "SE2 PP: Code"
 COLUMN_SCHOOL_POSTCODE = "SE2 PP: PC"
+COLUMN_STOP_ID = "ATCOCode"
+COLUMN_STOP_LATITUDE = "Latitude"
+COLUMN_STOP_LONGITUDE = "Longitude"
+COLUMN_STOP_STATUS = "Status"
 COLUMN_STUDENT_ID = "ST: ID"
 COLUMN_STUDENT_POSTCODE = "ST: Term PC"
 COLUMN_STUDENT_PRIORITY = "ST: Allocation Priority"
 COLUMN_SUBJECT = "PL: Subject"
+COLUMN_TFL_ACCESS_MINUTES = "tfl_access_minutes"
+COLUMN_TFL_LATITUDE = "tfl_latitude"
+COLUMN_TFL_LONGITUDE = "tfl_longitude"
 COLUMN_TRAVEL = "Travel"
+DEFAULT_LATENCY_SECONDS = {BACKEND_OPENROUTESERVICE: 0.5, BACKEND_TFL: 2.0}
+EARTH_RADIUS_KM = 6371.0
+ISOCHRONE_BANDS_MINUTES = (10, 20, 30, 45, 60)
+LARGE_VALUE_PLACEHOLDER = 10_000
 MAX_REQUESTS_PER_MINUTE = 250
 MINUTES = 60
 N_CORES = int(os.getenv("N_CORES", default="1"))
 OPENROUTESERVICE_API_KEY = os.getenv("OPENROUTESERVICE_API_KEY")
 OPENROUTESERVICE_BASE_URL = os.getenv("OPENROUTESERVICE_BASE_URL")
+OPENROUTESERVICE_BASE_URLS = [
+    u.strip() for u in (OPENROUTESERVICE_BASE_URL or "").split(",") if u.strip()
+]
+OPENROUTESERVICE_HEALTH_RETRY_SECONDS = 30
+OPENROUTESERVICE_MAX_CONCURRENCY = int(
+    os.getenv("OPENROUTESERVICE_MAX_CONCURRENCY") or "4"
+)
 OPENROUTESERVICE_TRANSPORT_MODES = {"B": "cycling-regular", "C": "driving-car"}
+OPTIMISTIC_SPEEDS_KMH = {"B": 25.0, "C": 120.0, "P": 200.0}
+SUFFIX_SCHOOL_PRIORITY = " priority"
 TFL_API_PREFIX = "https://api.tfl.gov.uk/Journey/JourneyResults"
 TFL_APP_KEY = os.getenv("TFL_APP_KEY")
+TFL_SNAP_RADIUS_KM = 2.0
+TFL_STOP_RADIUS_KM = 0.5
 VALUE_COMPLETED = "completed"
 VALUE_DO_NOT_USE = "do not use"
+VALUE_INACTIVE = "inactive"
 VALUE_NOT_APPLICABLE = "not applicable"
 VALUE_NOT_KNOWN = "not known"
 
@@ -0,0 +1,205 @@
+from array import array
+from collections.abc import Iterator
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+TYPECODE_CODE = "i"
+TYPECODE_STUDENT = "q"
+TYPECODE_VALUE = "i"
+
+
+def as_numpy(data: array) -> np.ndarray:
+    """Copy a typed array into numpy in one go
+
+    A copy rather than a view, as a typed array cannot grow whilst its buffer
+    is exported.
+
+    Args:
+        data: The typed array
+
+    Returns:
+        The numpy array
+    """
+    return np.frombuffer(data, dtype=data.typecode).copy()
+
+
+class StringTable:
+    """Dictionary encoding of repeated strings, i.e. school IDs or messages"""
+
+    def __init__(self, values: list[str] | None = None) -> None:
+        self.values: list[str] = values or []
+        self._codes = {v: i for i, v in enumerate(self.values)}
+
+    def encode(self, value: str) -> int:
+        """Find the code of the string, adding it to the table if new
+
+        Args:
+            value: The string to encode
+
+        Returns:
+            The integer code
+        """
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def remap(self, other: "StringTable") -> np.ndarray:
+        """Find the codes in this table of every string in another table
+
+        Args:
+            other: The table to merge in
+
+        Returns:
+            The code in this table indexed by the code in the other table
+        """
+        return np.array([self.encode(v) for v in other.values], dtype=TYPECODE_CODE)
+
+    def to_categorical(self, codes: np.ndarray) -> pd.Categorical:
+        """Decode to a categorical with the categories in sorted order
+
+        Args:
+            codes: The codes to decode
+
+        Returns:
+            The categorical which sorts as the strings would
+        """
+        order = np.argsort(self.values)
+        ranks = np.empty_like(order)
+        ranks[order] = np.arange(len(order))
+        return pd.Categorical.from_codes(
+            ranks[codes], categories=np.array(self.values, dtype=object)[order]
+        )
+
+
+class PairAccumulator:
+    """Columnar store of the student, school, value, text output records
+
+    Students are kept as integer IDs, schools and texts are dictionary encoded
+    and the values are a typed array, so millions of pairs do not each need a
+    tuple of Python objects. The text column can be skipped entirely when only
+    the values are needed, i.e. the journey times.
+    """
+
+    def __init__(self, *, keep_text: bool = True) -> None:
+        self.keep_text = keep_text
+        self._students = array(TYPECODE_STUDENT)
+        self._schools = array(TYPECODE_CODE)
+        self._values = array(TYPECODE_VALUE)
+        self._texts = array(TYPECODE_CODE)
+        self._school_table = StringTable()
+        self._text_table = StringTable()
+
+    def __len__(self) -> int:
+        return len(self._students)
+
+    def __iter__(self) -> Iterator[tuple[int, str, int, str | None]]:
+        schools = self._school_table.values
+        texts = self._text_table.values
+        for i in range(len(self)):
+            yield (
+                self._students[i],
+                schools[self._schools[i]],
+                self._values[i],
+                texts[self._texts[i]] if self.keep_text else None,
+            )
+
+    def __getstate__(self) -> dict[str, Any]:
+        # send the raw buffers rather than pickling element by element
+        return {
+            "keep_text": self.keep_text,
+            "schools_table": self._school_table.values,
+            "texts_table": self._text_table.values,
+            "students": self._students.tobytes(),
+            "schools": self._schools.tobytes(),
+            "values": self._values.tobytes(),
+            "texts": self._texts.tobytes(),
+        }
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.keep_text = state["keep_text"]
+        self._school_table = StringTable(state["schools_table"])
+        self._text_table = StringTable(state["texts_table"])
+        self._students = array(TYPECODE_STUDENT, state["students"])
+        self._schools = array(TYPECODE_CODE, state["schools"])
+        self._values = array(TYPECODE_VALUE, state["values"])
+        self._texts = array(TYPECODE_CODE, state["texts"])
+
+    def append(self, student: int, school: str, value: int, text: str) -> None:
+        """Add a single record
+
+        Args:
+            student: The student ID
+            school: The school ID
+            value: The journey time or the response code
+            text: The journey message or the failure reason
+        """
+        self._students.append(student)
+        self._schools.append(self._school_table.encode(school))
+        self._values.append(value)
+        if self.keep_text:
+            self._texts.append(self._text_table.encode(text))
+
+    def extend(self, other: "PairAccumulator") -> None:
+        """Add all the records of another accumulator, i.e. from a process
+
+        The records of an accumulator without texts get empty texts here.
+
+        Args:
+            other: The accumulator to merge in
+        """
+        self._students.extend(other._students)
+        self._values.extend(other._values)
+        school_codes = self._school_table.remap(other._school_table)
+        self._schools.frombytes(school_codes[as_numpy(other._schools)].tobytes())
+        if self.keep_text and other.keep_text:
+            text_codes = self._text_table.remap(other._text_table)
+            self._texts.frombytes(text_codes[as_numpy(other._texts)].tobytes())
+        elif self.keep_text:
+            empty = self._text_table.encode("")
+            self._texts.frombytes(
+                np.full(len(other), empty, dtype=TYPECODE_CODE).tobytes()
+            )
+
+    @property
+    def student_ids(self) -> np.ndarray:
+        """The student ID of every record"""
+        return as_numpy(self._students)
+
+    @property
+    def school_ids(self) -> np.ndarray:
+        """The school ID of every record"""
+        return np.array(self._school_table.values, dtype=object)[
+            as_numpy(self._schools)
+        ]
+
+    @property
+    def values(self) -> np.ndarray:
+        """The value of every record, i.e. the time or response code"""
+        return as_numpy(self._values)
+
+    def to_frame(self, columns: list[str]) -> pd.DataFrame:
+        """Create a dataframe with categorical school and text columns
+
+        Args:
+            columns: The names of the student, school, value and text columns
+
+        Returns:
+            The records as a dataframe, the text column being empty if not kept
+        """
+        student, school, value, text = columns
+        return pd.DataFrame(
+            {
+                student: self.student_ids,
+                school: self._school_table.to_categorical(as_numpy(self._schools)),
+                value: self.values,
+                text: (
+                    self._text_table.to_categorical(as_numpy(self._texts))
+                    if self.keep_text
+                    else pd.Categorical([None] * len(self))
+                ),
+            }
+        )
@@ -0,0 +1,271 @@
+from array import array
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+from ioe.constants import MINUTES
+from ioe.data.accumulator import (
+    TYPECODE_CODE,
+    TYPECODE_STUDENT,
+    TYPECODE_VALUE,
+    StringTable,
+    as_numpy,
+)
+
+_MODE_WALKING = "walking"
+
+
+class AlternativesStore:
+    """Columnar store of every journey alternative returned and their legs
+
+    Each alternative keeps its student, school and total duration, and each
+    leg its alternative, mode, line and duration, so the journeys can later be
+    re-ranked under other constraints without calling the APIs again.
+    """
+
+    def __init__(self) -> None:
+        self._students = array(TYPECODE_STUDENT)
+        self._schools = array(TYPECODE_CODE)
+        self._durations = array(TYPECODE_VALUE)
+        self._leg_alternatives = array(TYPECODE_STUDENT)
+        self._leg_modes = array(TYPECODE_CODE)
+        self._leg_lines = array(TYPECODE_CODE)
+        self._leg_durations = array(TYPECODE_VALUE)
+        self._school_table = StringTable()
+        self._mode_table = StringTable()
+        self._line_table = StringTable()
+
+    def __len__(self) -> int:
+        return len(self._students)
+
+    def __getstate__(self) -> dict[str, Any]:
+        # send the raw buffers rather than pickling element by element
+        return {
+            "students": self._students.tobytes(),
+            "schools": self._schools.tobytes(),
+            "durations": self._durations.tobytes(),
+            "leg_alternatives": self._leg_alternatives.tobytes(),
+            "leg_modes": self._leg_modes.tobytes(),
+            "leg_lines": self._leg_lines.tobytes(),
+            "leg_durations": self._leg_durations.tobytes(),
+            "schools_table": self._school_table.values,
+            "modes_table": self._mode_table.values,
+            "lines_table": self._line_table.values,
+        }
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self._students = array(TYPECODE_STUDENT, state["students"])
+        self._schools = array(TYPECODE_CODE, state["schools"])
+        self._durations = array(TYPECODE_VALUE, state["durations"])
+        self._leg_alternatives = array(TYPECODE_STUDENT, state["leg_alternatives"])
+        self._leg_modes = array(TYPECODE_CODE, state["leg_modes"])
+        self._leg_lines = array(TYPECODE_CODE, state["leg_lines"])
+        self._leg_durations = array(TYPECODE_VALUE, state["leg_durations"])
+        self._school_table = StringTable(state["schools_table"])
+        self._mode_table = StringTable(state["modes_table"])
+        self._line_table = StringTable(state["lines_table"])
+
+    def _add_alternative(
+        self, student: int, school: str, duration: int, legs: Iterable[tuple]
+    ) -> None:
+        """Add a single alternative and its legs
+
+        Args:
+            student: The student ID
+            school: The school ID
+            duration: The total duration in minutes
+            legs: The mode, line and duration in minutes of each leg
+        """
+        index = len(self)
+        self._students.append(student)
+        self._schools.append(self._school_table.encode(school))
+        self._durations.append(duration)
+        for mode, line, leg_duration in legs:
+            self._leg_alternatives.append(index)
+            self._leg_modes.append(self._mode_table.encode(mode))
+            self._leg_lines.append(self._line_table.encode(line))
+            self._leg_durations.append(leg_duration)
+
+    def add_tfl_journeys(
+        self,
+        student: int,
+        school: str,
+        journeys: list[dict],
+        *,
+        access_minutes: tuple[int, int] = (0, 0),
+    ) -> None:
+        """Add every journey of a TfL JourneyResults response
+
+        Args:
+            student: The student ID
+            school: The school ID
+            journeys: The journeys of the response
+            access_minutes (optional): The walks onto the stop the student and
+                off the stop the school were snapped to, added as walking
+                legs. Defaults to (0, 0).
+        """
+        start, end = (
+            [(_MODE_WALKING, "", minutes)] if minutes else []
+            for minutes in access_minutes
+        )
+        for journey in journeys:
+            self._add_alternative(
+                student,
+                school,
+                journey["duration"] + sum(access_minutes),
+                [
+                    *start,
+                    *(
+                        (
+                            leg["mode"]["id"],
+                            next((r["name"] for r in leg.get("routeOptions", [])), ""),
+                            leg["duration"],
+                        )
+                        for leg in journey["legs"]
+                    ),
+                    *end,
+                ],
+            )
+
+    def add_ors_routes(
+        self, student: int, school: str, routes: list[dict], profile: str
+    ) -> None:
+        """Add every route of an openrouteservice directions response
+
+        Args:
+            student: The student ID
+            school: The school ID
+            routes: The routes of the response
+            profile: The openrouteservice profile, i.e. `cycling-regular`
+        """
+        for route in routes:
+            duration = round(route["summary"]["duration"] / MINUTES)
+            self._add_alternative(student, school, duration, [(profile, "", duration)])
+
+    def extend(self, other: "AlternativesStore") -> None:
+        """Add all the alternatives of another store, i.e. from a process
+
+        Args:
+            other: The store to merge in
+        """
+        offset = len(self)
+        self._students.extend(other._students)
+        self._durations.extend(other._durations)
+        self._leg_durations.extend(other._leg_durations)
+        self._leg_alternatives.frombytes(
+            (as_numpy(other._leg_alternatives) + offset).tobytes()
+        )
+        for codes, table, other_codes, other_table in (
+            (self._schools, self._school_table, other._schools, other._school_table),
+            (self._leg_modes, self._mode_table, other._leg_modes, other._mode_table),
+            (self._leg_lines, self._line_table, other._leg_lines, other._line_table),
+        ):
+            codes.frombytes(table.remap(other_table)[as_numpy(other_codes)].tobytes())
+
+    def to_frame(self) -> pd.DataFrame:
+        """Create a dataframe with a row per leg, repeating its alternative
+
+        The alternatives of a pair are ranked in the order the API returned
+        them, so the rows are keyed on the student, school and rank wherever
+        the pair was routed, i.e. on any shard.
+
+        Returns:
+            The legs with their student, school, rank and alternative duration
+        """
+        students = as_numpy(self._students)
+        schools = as_numpy(self._schools)
+        ranks = (
+            pd.DataFrame({"student": students, "school": schools})
+            .groupby(["student", "school"])
+            .cumcount()
+            .to_numpy()
+        )
+        alternatives = as_numpy(self._leg_alternatives)
+        return pd.DataFrame(
+            {
+                "student": students[alternatives],
+                "school": self._school_table.to_categorical(schools[alternatives]),
+                "rank": ranks[alternatives],
+                "duration": as_numpy(self._durations)[alternatives],
+                "mode": self._mode_table.to_categorical(as_numpy(self._leg_modes)),
+                "line": self._line_table.to_categorical(as_numpy(self._leg_lines)),
+                "leg_duration": as_numpy(self._leg_durations),
+            }
+        )
+
+    def save(self, filepath: Path) -> None:
+        """Save as a Parquet file, which compresses the repeated columns
+
+        Args:
+            filepath: The output filename
+        """
+        self.to_frame().to_parquet(filepath, index=False)
+
+
+def read_alternatives(filepath: Path) -> pd.DataFrame:
+    """Read a saved store of alternatives
+
+    Args:
+        filepath: The Parquet filename
+
+    Returns:
+        The legs with their student, school, rank and alternative duration
+    """
+    return pd.read_parquet(filepath)
+
+
+def constrained_journeys(
+    alternatives: pd.DataFrame,
+    *,
+    max_walking_minutes: int | None = None,
+    excluded_modes: Iterable[str] = (),
+    max_changes: int | None = None,
+) -> pd.DataFrame:
+    """Find the quickest alternative of each pair which meets the constraints
+
+    The output has the same student, school and time columns as the journeys
+    file, so can be turned into a cost matrix in the same way.
+
+    Args:
+        alternatives: The stored alternatives
+        max_walking_minutes (optional): The maximum total walking time.
+            Defaults to None.
+        excluded_modes (optional): Modes which cannot be used, i.e.
+            `national-rail`. Defaults to ().
+        max_changes (optional): The maximum number of changes between
+            non-walking legs. Defaults to None.
+
+    Returns:
+        The journeys, pairs without a valid alternative are left out
+    """
+    walking = alternatives["mode"] == _MODE_WALKING
+    summary = (
+        alternatives.assign(
+            walking=alternatives["leg_duration"].where(walking, 0),
+            excluded=alternatives["mode"].isin(list(excluded_modes)),
+            rides=~walking,
+        )
+        .groupby(["student", "school", "rank"], observed=True)
+        .agg(
+            time=("duration", "first"),
+            walking=("walking", "sum"),
+            excluded=("excluded", "any"),
+            rides=("rides", "sum"),
+        )
+        .reset_index()
+    )
+
+    valid = ~summary["excluded"]
+    if max_walking_minutes is not None:
+        valid &= summary["walking"] <= max_walking_minutes
+    if max_changes is not None:
+        valid &= (summary["rides"] - 1).clip(lower=0) <= max_changes
+
+    return (
+        summary[valid]
+        .sort_values("time", kind="stable")
+        .drop_duplicates(subset=["student", "school"])[["student", "school", "time"]]
+        .sort_values(by=["student", "school"], ignore_index=True)
+    )
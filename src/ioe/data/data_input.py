@@ -1,17 +1,208 @@
+import logging
+import os
+import re
+import tempfile
+import zlib
 from pathlib import Path
 
 import pandas as pd
 
+from ioe.constants import (
+    COLUMN_ALLOCATION_SCHOOL_ID,
+    COLUMN_COUNT,
+    COLUMN_LATITUDE,
+    COLUMN_LONGITUDE,
+    COLUMN_SCHOOL_ID,
+    COLUMN_STOP_ID,
+    COLUMN_STOP_LATITUDE,
+    COLUMN_STOP_LONGITUDE,
+    COLUMN_STUDENT_ID,
+    COLUMN_STUDENT_PRIORITY,
+    COLUMN_SUBJECT,
+    COLUMN_TRAVEL,
+)
 
-def read_data(filepath: Path, *, nrows: int | None = None) -> list[str]:
-    """Read in given file output subset if needed
+_logger = logging.getLogger(__name__)
+
+_CACHE_DIRECTORY = ".cache"
+
+SCHEMA_STUDENTS = {
+    COLUMN_STUDENT_ID: "int64",
+    COLUMN_LATITUDE: "float64",
+    COLUMN_LONGITUDE: "float64",
+    COLUMN_SUBJECT: "category",
+    COLUMN_TRAVEL: "category",
+    COLUMN_STUDENT_PRIORITY: "Int8",
+}
+SCHEMA_SCHOOLS = {
+    COLUMN_SCHOOL_ID: "string",
+    COLUMN_LATITUDE: "float64",
+    COLUMN_LONGITUDE: "float64",
+    COLUMN_SUBJECT: "category",
+    COLUMN_COUNT: "int16",
+}
+SCHEMA_JOURNEYS = {
+    "student": "int64",
+    "school": "category",
+    "time": "int32",
+    "message": "string",
+}
+SCHEMA_FAILURES = {
+    "student": "int64",
+    "school": "category",
+    "code": "int16",
+    "reason": "string",
+}
+SCHEMA_STOPS = {
+    COLUMN_STOP_ID: "string",
+    COLUMN_STOP_LATITUDE: "float64",
+    COLUMN_STOP_LONGITUDE: "float64",
+}
+SCHEMA_MATCHES = {
+    COLUMN_STUDENT_ID: "int64",
+    COLUMN_ALLOCATION_SCHOOL_ID: "string",
+}
+
+
+def _validate_columns(
+    filepath: Path, columns: pd.Index, schema: dict[str, str], usecols: list[str]
+) -> None:
+    """Check the file has every requested column, or the whole schema if none
+
+    Args:
+        filepath: The input data path
+        columns: The columns of the file
+        schema: The dtype of each expected column
+        usecols: The requested columns, empty for all
+    """
+    missing = [c for c in usecols or schema if c not in columns]
+    if missing:
+        error = f"File {filepath} is missing the columns {sorted(set(missing))}"
+        raise ValueError(error)
+
+
+def _cache_filepath(filepath: Path, schema: dict[str, str]) -> Path:
+    """The binary copy of the file for its current version and the schema
+
+    Args:
+        filepath: The input data path
+        schema: The dtype of each column read
+
+    Returns:
+        The Parquet cache path, which changes whenever the source does
+    """
+    stat = filepath.stat()
+    return (
+        filepath.parent
+        / _CACHE_DIRECTORY
+        / f"{filepath.stem}-{stat.st_size}-{stat.st_mtime_ns}-"
+        f"{_schema_key(schema)}.parquet"
+    )
+
+
+def _schema_key(schema: dict[str, str]) -> str:
+    """The part of the cache path which identifies the schema
+
+    Args:
+        schema: The dtype of each column read
+
+    Returns:
+        The checksum of the schema in hexadecimal
+    """
+    return f"{zlib.crc32(repr(sorted(schema.items())).encode()):08x}"
+
+
+def _evict_stale(filepath: Path, schema: dict[str, str], cache_path: Path) -> None:
+    """Remove the older versions of the cache of the file with the same schema
+
+    The caches of the file under another schema are kept, as other readers
+    may still use them.
+
+    Args:
+        filepath: The input data path
+        schema: The dtype of each column read
+        cache_path: The current cache path, which is kept
+    """
+    pattern = re.compile(
+        rf"{re.escape(filepath.stem)}-\d+-\d+-{_schema_key(schema)}\.parquet"
+    )
+    for stale in cache_path.parent.iterdir():
+        if stale != cache_path and pattern.fullmatch(stale.name):
+            stale.unlink(missing_ok=True)
+
+
+def _write_cache(data: pd.DataFrame, cache_path: Path) -> None:
+    """Write the cache to a temporary file and move it into place
+
+    Other processes either see the whole file or none of it.
+
+    Args:
+        data: The full input data
+        cache_path: The cache path
+    """
+    descriptor, temporary = tempfile.mkstemp(
+        dir=cache_path.parent, prefix=f".{cache_path.stem}-", suffix=".tmp"
+    )
+    os.close(descriptor)
+    try:
+        data.to_parquet(temporary, index=False)
+        os.replace(temporary, cache_path)
+    finally:
+        Path(temporary).unlink(missing_ok=True)
+
+
+def read_data(
+    filepath: Path,
+    *,
+    schema: dict[str, str] | None = None,
+    nrows: int | None = None,
+    usecols: list[str] | None = None,
+    cache: bool = True,
+) -> pd.DataFrame:
+    """Read in given file with explicit dtypes, output subset if needed
+
+    A full read is kept as a Parquet file in a `.cache` directory next to the
+    source, and used instead of the CSV until the source changes.
 
     Args:
         filepath: The input data path
-        nrows: The number of rows to read. Defaults to None.
+        schema (optional): The dtype of each expected column, other columns
+            are inferred. Defaults to None.
+        nrows (optional): The number of rows to read. Defaults to None.
+        usecols (optional): The columns to read, only which need to be in the
+            file. Defaults to all.
+        cache (optional): Whether to use the binary cache. Defaults to True.
 
     Returns:
         The input data
     """
-    data = pd.read_csv(filepath)
-    return data[:nrows] if nrows is not None else data
+    columns = pd.read_csv(filepath, nrows=0).columns
+    _validate_columns(filepath, columns, schema or {}, usecols or [])
+    # the schema columns a subset read does not need may be absent
+    schema = {c: t for c, t in (schema or {}).items() if c in columns}
+    cache_path = _cache_filepath(filepath, schema)
+    if cache and cache_path.exists():
+        try:
+            data = pd.read_parquet(cache_path, columns=usecols)
+        except FileNotFoundError:
+            _logger.info(f"Cache {cache_path} was replaced whilst reading it")
+        else:
+            # empty categoricals do not survive the round trip
+            data = data.astype({c: t for c, t in schema.items() if c in data.columns})
+            return data[:nrows] if nrows is not None else data
+
+    if nrows is not None or not cache:
+        # the pyarrow engine is faster but cannot stop early
+        return pd.read_csv(
+            filepath,
+            dtype=schema,
+            nrows=nrows,
+            usecols=usecols,
+            engine="pyarrow" if nrows is None else "c",
+        )
+    data = pd.read_csv(filepath, dtype=schema, engine="pyarrow")
+    cache_path.parent.mkdir(exist_ok=True)
+    _logger.info(f"Caching {filepath} to {cache_path}")
+    _write_cache(data, cache_path)
+    _evict_stale(filepath, schema, cache_path)
+    return data[usecols] if usecols is not None else data
@@ -1,13 +1,17 @@
 import logging
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
+from ioe.constants import COLUMN_ALLOCATION_SCHOOL_ID, COLUMN_SCHOOL_ID
+from ioe.data.accumulator import PairAccumulator
+
 _logger = logging.getLogger(__name__)
 
 
 def save_output_journeys(
-    data: list[tuple[int, str, int, str]], filepath: Path, *, save_output: bool = False
+    data: PairAccumulator, filepath: Path, *, save_output: bool = False
 ) -> pd.DataFrame:
     """Manipulate the successful data into desired CSV format saved as a feather file
 
@@ -19,8 +23,7 @@ def save_output_journeys(
     Returns:
         The successful journeys dataframe
     """
-    df = pd.DataFrame(data, columns=["student", "school", "time", "message"])
-    df = df.convert_dtypes()
+    df = data.to_frame(["student", "school", "time", "message"])
     df.sort_values(by=["student", "school"], ignore_index=True, inplace=True)
     if save_output:
         _logger.info("Saving journey output to files")
@@ -29,7 +32,7 @@ def save_output_journeys(
 
 
 def save_output_failures(
-    data: list[tuple[int, str, int, str]], filepath: Path, *, save_output: bool = False
+    data: PairAccumulator, filepath: Path, *, save_output: bool = False
 ) -> pd.DataFrame:
     """Manipulate the failed data into desired CSV format saved as a feather file
 
@@ -41,12 +44,38 @@ def save_output_failures(
     Returns:
         The successful journeys dataframe
     """
-    df = pd.DataFrame(data, columns=["student", "school", "code", "reason"])
-    df = df.convert_dtypes()
+    df = data.to_frame(["student", "school", "code", "reason"])
     df["code"] = pd.to_numeric(df["code"], downcast="unsigned")
-    df["reason"] = df["reason"].astype("category")
     df.sort_values(by=["student", "school", "code"], ignore_index=True, inplace=True)
     if save_output:
         _logger.info("Saving failure output to file")
         df.to_csv(filepath, index=False)
     return df
+
+
+def save_output_matches(
+    students: pd.DataFrame,
+    schools: pd.DataFrame,
+    allocation: np.ndarray,
+    filepath: Path,
+    *,
+    save_output: bool = False,
+) -> pd.DataFrame:
+    """Manipulate the allocation into the matches CSV format used for the map
+
+    Args:
+        students: The students dataframe
+        schools: The schools dataframe
+        allocation: The index of the allocated school for each student
+        filepath: The output filename
+        save_output: Whether to not to save the output. Defaults to False.
+
+    Returns:
+        The students dataframe with the allocated school
+    """
+    df = students.copy()
+    df[COLUMN_ALLOCATION_SCHOOL_ID] = schools[COLUMN_SCHOOL_ID].to_numpy()[allocation]
+    if save_output:
+        _logger.info("Saving matches output to file")
+        df.to_csv(filepath)
+    return df
@@ -0,0 +1,166 @@
+import json
+import logging
+import multiprocessing
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+from multiprocessing.context import BaseContext
+from multiprocessing.queues import Queue
+from pathlib import Path
+from typing import Any
+
+_logger = logging.getLogger("ioe")
+
+_PAIR_FIELDS = ("subject", "student", "school", "backend", "elapsed")
+_PROGRESS_INTERVAL_SECONDS = 10.0
+
+_sample_every = 1
+
+
+def pair_extra(
+    subject: str,
+    student: Any,
+    school: Any,
+    *,
+    backend: str | None = None,
+    elapsed: float | None = None,
+) -> dict[str, Any]:
+    """The structured fields of a per-pair record, for `extra` when logging
+
+    Args:
+        subject: The subject
+        student: The student ID
+        school: The school ID
+        backend (optional): The routing backend, i.e. `tfl`. Defaults to None.
+        elapsed (optional): The seconds the request took. Defaults to None.
+
+    Returns:
+        The fields marking the record as per-pair
+    """
+    extra = {"pair": True, "subject": subject, "student": student, "school": school}
+    if backend is not None:
+        extra.update(backend=backend, elapsed=elapsed)
+    return extra
+
+
+class PairSampler(logging.Filter):
+    """Keep only one in every n per-pair records below warning level"""
+
+    def __init__(self, every: int) -> None:
+        super().__init__()
+        self._every = every
+        self._count = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:  # noqa: A003
+        if not getattr(record, "pair", False) or record.levelno >= logging.WARNING:
+            return True
+        self._count += 1
+        return self._count % self._every == 0
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Format each record as a single JSON object for later analysis"""
+
+    def format(self, record: logging.LogRecord) -> str:  # noqa: A003
+        data = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "process": record.process,
+            "message": record.getMessage(),
+        }
+        data.update({f: getattr(record, f) for f in _PAIR_FIELDS if hasattr(record, f)})
+        return json.dumps(data, default=str)
+
+
+def configure_logging(*, sample_every: int = 1, json_path: Path | None = None) -> None:
+    """Choose how the per-pair records are logged
+
+    Args:
+        sample_every (optional): Keep one in every n per-pair records.
+            Defaults to 1.
+        json_path (optional): Also write the records as JSON lines to this
+            file. Defaults to None.
+    """
+    global _sample_every  # noqa: PLW0603
+    _sample_every = sample_every
+    if json_path is not None:
+        handler = logging.FileHandler(json_path)
+        handler.setFormatter(JsonLinesFormatter())
+        _logger.addHandler(handler)
+
+
+@contextmanager
+def forward_worker_logs(
+    context: BaseContext | None = None,
+) -> Iterator[tuple[Queue, int]]:
+    """Funnel the records of the worker processes through the parent handlers
+
+    Args:
+        context (optional): The context the worker processes are started from.
+            Defaults to the default context.
+
+    Yields:
+        The queue and sampling to pass to `initialise_worker_logging`
+    """
+    queue: Queue = (context or multiprocessing.get_context()).Queue()
+    listener = QueueListener(queue, *_logger.handlers, respect_handler_level=True)
+    listener.start()
+    try:
+        yield queue, _sample_every
+    finally:
+        listener.stop()
+
+
+def initialise_worker_logging(queue: Queue, sample_every: int) -> None:
+    """Send the records of a worker process to the parent, run on creation
+
+    Args:
+        queue: The queue from `forward_worker_logs`
+        sample_every: Keep one in every n per-pair records
+    """
+    for handler in list(_logger.handlers):
+        _logger.removeHandler(handler)
+    handler = QueueHandler(queue)
+    handler.addFilter(PairSampler(sample_every))
+    _logger.addHandler(handler)
+
+
+class ProgressReporter:
+    """Periodically log a summary of the pairs processed so far"""
+
+    def __init__(self, subject: str, n_pairs: int) -> None:
+        self._subject = subject
+        self._n_pairs = n_pairs
+        self._n_done = 0
+        self._n_failures = 0
+        self._start = self._last = time.monotonic()
+
+    def update(self, n_journeys: int, n_failures: int) -> None:
+        """Record the pairs of a finished task, logging if it is time to
+
+        Args:
+            n_journeys: The number of successful journeys in the task
+            n_failures: The number of failed journeys in the task
+        """
+        self._n_done += n_journeys + n_failures
+        self._n_failures += n_failures
+        now = time.monotonic()
+        if (
+            now - self._last < _PROGRESS_INTERVAL_SECONDS
+            and self._n_done < self._n_pairs
+        ):
+            return
+        self._last = now
+        rate = self._n_done / max(now - self._start, 1e-9)
+        _logger.info(
+            "Progress for subject %s: %d/%d pairs, %d failures, %.1f pairs/s, "
+            "%.0fs remaining",
+            self._subject,
+            self._n_done,
+            self._n_pairs,
+            self._n_failures,
+            rate,
+            (self._n_pairs - self._n_done) / rate if rate else float("nan"),
+        )
@@ -1,84 +1,289 @@
 import logging
-from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from http import HTTPStatus
+from multiprocessing.queues import Queue
 
 import pandas as pd
-import requests
 
-from ioe.constants import COLUMN_SCHOOL_ID, COLUMN_TRAVEL
-from ioe.ors.routing import create_ors_routes
+from ioe.constants import COLUMN_SCHOOL_ID, COLUMN_STUDENT_ID, COLUMN_TRAVEL
+from ioe.data.accumulator import PairAccumulator
+from ioe.data.alternatives import AlternativesStore
+from ioe.logs import ProgressReporter, forward_worker_logs, initialise_worker_logging
+from ioe.ors.endpoints import EndpointState
+from ioe.ors.routing import (
+    create_ors_routes,
+    create_shared_endpoint_state,
+    share_endpoint_state,
+)
+from ioe.sharding import Shard, in_shard
 from ioe.tfl.journeys import create_tfl_routes
 
 _logger = logging.getLogger(__name__)
 
 
 def _process_individual_student(
-    args: tuple[str, pd.DataFrame, dict[str, str | int]]
-) -> tuple[list[tuple[int, str, int, str]], list[tuple[int, str, int, str]]]:
+    args: tuple[str, pd.DataFrame, dict[str, str | int]],
+    *,
+    keep_messages: bool = True,
+    keep_alternatives: bool = False,
+) -> tuple[PairAccumulator, PairAccumulator, AlternativesStore | None]:
     """Method to be executed by each process filling the same dictionary.
 
     Args:
         args: The subject, students, and school data
+        keep_messages (optional): Whether to keep the route messages.
+            Defaults to True.
+        keep_alternatives (optional): Whether to keep every journey returned
+            and its legs. Defaults to False.
 
     Returns:
-        The successful journeys and the failed journeys
+        The successful journeys, the failed journeys and the alternatives
     """
     # so can map in parallel
     subject, students, school = args
 
     # initialise internal journeys and failures
-    journeys: list[tuple[int, str, int, str]] = []
-    failures: list[tuple[int, str, int, str]] = []
+    journeys = PairAccumulator(keep_text=keep_messages)
+    failures = PairAccumulator()
+    alternatives = AlternativesStore() if keep_alternatives else None
 
-    _logger.info(f"New school: {school[COLUMN_SCHOOL_ID]}, subject {subject}")
+    _logger.info("New school: %s, subject %s", school[COLUMN_SCHOOL_ID], subject)
     for _, student in students.iterrows():
-        status_code, route = (
-            create_tfl_routes(subject, student, school)
-            if student[COLUMN_TRAVEL] == "P"
-            else create_ors_routes(subject, student, school)
+        create_routes = (
+            create_tfl_routes if student[COLUMN_TRAVEL] == "P" else create_ors_routes
+        )
+        status_code, route = create_routes(
+            subject,
+            student,
+            school,
+            alternatives=alternatives,
+            keep_message=keep_messages,
         )
-        if status_code == requests.codes.OK:
-            journeys.append(route)
+        if status_code == HTTPStatus.OK:
+            journeys.append(*route)
         else:
-            failures.append(route)
+            failures.append(*route)
+    return journeys, failures, alternatives
+
+
+def _initialise_worker(
+    endpoint_state: EndpointState, log_queue: Queue, log_sample_every: int
+) -> None:
+    """Share the parent state with a worker process, run on its creation
+
+    Args:
+        endpoint_state: The openrouteservice endpoint load and health
+        log_queue: The queue to send log records to the parent
+        log_sample_every: Keep one in every n per-pair log records
+    """
+    share_endpoint_state(endpoint_state)
+    initialise_worker_logging(log_queue, log_sample_every)
+
+
+@contextmanager
+def create_process_pool(
+    n_cores: int, *, start_method: str | None = None
+) -> Iterator[ProcessPoolExecutor]:
+    """A pool of routing processes sharing the endpoint state and log handlers
+
+    A long running caller, i.e. the service, can keep one pool for all its
+    requests rather than starting processes for each.
+
+    Args:
+        n_cores: The number of cores to parallelise over
+        start_method (optional): How to start the processes, i.e. `forkserver`
+            when the caller has threads. Defaults to the platform default.
+
+    Yields:
+        The process pool
+    """
+    context = multiprocessing.get_context(start_method)
+    state = create_shared_endpoint_state(context)
+    with forward_worker_logs(context) as worker_logs, ProcessPoolExecutor(
+        max_workers=n_cores,
+        mp_context=context,
+        initializer=_initialise_worker,
+        initargs=(state, *worker_logs),
+    ) as e:
+        yield e
+
+
+def _run_processes(
+    args: list[tuple[str, pd.DataFrame, dict[str, str | int]]],
+    *,
+    keep_messages: bool,
+    n_cores: int,
+    alternatives: AlternativesStore | None = None,
+    executor: Executor | None = None,
+) -> tuple[PairAccumulator, PairAccumulator]:
+    """Process each school in parallel and collect the results
+
+    Args:
+        args: The subject, students, and school data for each process
+        keep_messages: Whether to keep the route messages
+        n_cores: The number of cores to parallelise over
+        alternatives (optional): Collect every journey returned and its legs
+            into this store. Defaults to None.
+        executor (optional): The pool of `create_process_pool` to use, rather
+            than starting one. Defaults to None.
+
+    Returns:
+        The full successful journeys and failed journeys
+    """
+    journeys = PairAccumulator(keep_text=keep_messages)
+    failures = PairAccumulator()
+    if not args:
+        return journeys, failures
+    if executor is None:
+        with create_process_pool(n_cores) as e:
+            return _run_processes(
+                args,
+                keep_messages=keep_messages,
+                n_cores=n_cores,
+                alternatives=alternatives,
+                executor=e,
+            )
+
+    progress = ProgressReporter(args[0][0], sum(len(a[1]) for a in args))
+    futures = [
+        executor.submit(
+            _process_individual_student,
+            a,
+            keep_messages=keep_messages,
+            keep_alternatives=alternatives is not None,
+        )
+        for a in args
+    ]
+
+    # collect results from concurrency
+    for future in as_completed(futures):
+        journey, failure, alternative = future.result()
+        journeys.extend(journey)
+        failures.extend(failure)
+        if alternatives is not None and alternative is not None:
+            alternatives.extend(alternative)
+        progress.update(len(journey), len(failure))
     return journeys, failures
 
 
-def compute_all_pairs_journeys(
+def _select_shard(
+    students: pd.DataFrame, school: dict[str, str | int], shard: Shard | None
+) -> pd.DataFrame:
+    """Keep the students whose pair with the school falls in the shard
+
+    Args:
+        students: The students dataframe
+        school: An individual school data
+        shard: The shard, or None for every student
+
+    Returns:
+        The students to route to the school
+    """
+    if shard is None:
+        return students
+    return students[
+        in_shard(
+            students[COLUMN_STUDENT_ID].to_numpy(),
+            [school[COLUMN_SCHOOL_ID]] * len(students),
+            shard,
+        )
+    ]
+
+
+def compute_all_pairs_journeys(  # noqa: PLR0913
     subject: str,
     students: pd.DataFrame,
     schools: pd.DataFrame,
     *,
+    keep_messages: bool = True,
     n_cores: int = 1,
-) -> tuple[list[tuple[int, str, int, str]], list[tuple[int, str, int, str]]]:
+    shard: Shard | None = None,
+    alternatives: AlternativesStore | None = None,
+    executor: Executor | None = None,
+) -> tuple[PairAccumulator, PairAccumulator]:
     """Loop through all students and school to find the min journey time for each.
 
     Args:
         subject: The subject
         students: The students dataframe
         schools: The schools dataframe
+        keep_messages (optional): Whether to keep the route messages.
+            Defaults to True.
         n_cores (optional): The number of cores to parallelise over. Defaults to 1.
+        shard (optional): Only compute the pairs of this shard. Defaults to None.
+        alternatives (optional): Collect every journey returned and its legs
+            into this store. Defaults to None.
+        executor (optional): The pool of `create_process_pool` to use, rather
+            than starting one. Defaults to None.
 
     Returns:
         The full successful journeys and failed journeys
     """
     _logger.info(f"Start process with {n_cores} cores for subject {subject}")
-    args = [(subject, students, school) for school in schools.to_dict("records")]
-    with ProcessPoolExecutor(max_workers=n_cores) as e:
-        futures = e.map(_process_individual_student, args)
-
-    # collect results from concurrency
-    journeys: list[tuple[int, str, int, str]] = []
-    failures: list[tuple[int, str, int, str]] = []
-    for journey, failure in futures:
-        journeys.extend(journey)
-        failures.extend(failure)
+    args = [
+        (subject, _select_shard(students, school, shard), school)
+        for school in schools.to_dict("records")
+    ]
+    args = [a for a in args if not a[1].empty]
+    journeys, failures = _run_processes(
+        args,
+        keep_messages=keep_messages,
+        n_cores=n_cores,
+        alternatives=alternatives,
+        executor=executor,
+    )
 
-    assert len(students) * len(schools) == len(journeys) + len(  # noqa: S101
-        failures
-    ), (
+    n_pairs = sum(len(a[1]) for a in args)
+    assert n_pairs == len(journeys) + len(failures), (  # noqa: S101
         f"there is a mistmatch in the number of students {len(students)}/schools "
-        f"{len(schools)} and the number of found journeys {len(journeys)}/failures "
-        f"{len(failures)} for subject {subject}"
+        f"{len(schools)} in shard {shard} and the number of found journeys "
+        f"{len(journeys)}/failures {len(failures)} for subject {subject}"
     )
 
     return journeys, failures
+
+
+def compute_pair_journeys(  # noqa: PLR0913
+    subject: str,
+    students: pd.DataFrame,
+    schools: pd.DataFrame,
+    pairs: Iterable[tuple[int, int]],
+    *,
+    keep_messages: bool = True,
+    n_cores: int = 1,
+    alternatives: AlternativesStore | None = None,
+) -> tuple[PairAccumulator, PairAccumulator]:
+    """Find the min journey time for a selection of student school pairs.
+
+    Args:
+        subject: The subject
+        students: The students dataframe
+        schools: The schools dataframe
+        pairs: The positional indices of the student and school of each pair
+        keep_messages (optional): Whether to keep the route messages.
+            Defaults to True.
+        n_cores (optional): The number of cores to parallelise over. Defaults to 1.
+        alternatives (optional): Collect every journey returned and its legs
+            into this store. Defaults to None.
+
+    Returns:
+        The successful journeys and failed journeys of the given pairs
+    """
+    students_per_school: defaultdict[int, list[int]] = defaultdict(list)
+    for student, school in pairs:
+        students_per_school[school].append(student)
+    _logger.info(
+        f"Start process with {n_cores} cores for "
+        f"{sum(map(len, students_per_school.values()))} pairs of subject {subject}"
+    )
+    args = [
+        (subject, students.iloc[sorted(s)], schools.iloc[school].to_dict())
+        for school, s in sorted(students_per_school.items())
+    ]
+    return _run_processes(
+        args, keep_messages=keep_messages, n_cores=n_cores, alternatives=alternatives
+    )
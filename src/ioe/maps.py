@@ -0,0 +1,127 @@
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from ioe.constants import (
+    COLUMN_ALLOCATION_SCHOOL_ID,
+    COLUMN_LATITUDE,
+    COLUMN_LONGITUDE,
+    COLUMN_SCHOOL_ID,
+    COLUMN_STUDENT_ID,
+)
+
+_SCHOOL_LATITUDE = f"{COLUMN_LATITUDE}_school"
+_SCHOOL_LONGITUDE = f"{COLUMN_LONGITUDE}_school"
+_STUDENT_LATITUDE = f"{COLUMN_LATITUDE}_student"
+_STUDENT_LONGITUDE = f"{COLUMN_LONGITUDE}_student"
+
+
+def _prepare_data(
+    schools: pd.DataFrame,
+    students: pd.DataFrame,
+    matches: pd.DataFrame,
+) -> pd.DataFrame:
+    """Merges the three dataframes to make a singular dataframe with
+    student/school ID and the lat lon coordinates.
+
+    Args:
+        schools: All school data.
+        students: All students data.
+        matches: The matched student-school data.
+
+    Returns:
+        The prepared dataframe of coordinates.
+    """
+    schools = schools[[COLUMN_SCHOOL_ID, COLUMN_LATITUDE, COLUMN_LONGITUDE]].rename(
+        columns={COLUMN_LATITUDE: _SCHOOL_LATITUDE, COLUMN_LONGITUDE: _SCHOOL_LONGITUDE}
+    )
+    students = students[[COLUMN_STUDENT_ID, COLUMN_LATITUDE, COLUMN_LONGITUDE]].rename(
+        columns={
+            COLUMN_LATITUDE: _STUDENT_LATITUDE,
+            COLUMN_LONGITUDE: _STUDENT_LONGITUDE,
+        }
+    )
+    # merge all schools on the student matches
+    schools_merge_matches = schools.merge(
+        matches[[COLUMN_STUDENT_ID, COLUMN_ALLOCATION_SCHOOL_ID]],
+        how="left",
+        left_on=COLUMN_SCHOOL_ID,
+        right_on=COLUMN_ALLOCATION_SCHOOL_ID,
+    ).drop(columns=COLUMN_ALLOCATION_SCHOOL_ID)
+    # merge students with the composite matches
+    matches_merge_students = schools_merge_matches.merge(
+        students, how="left", on=COLUMN_STUDENT_ID
+    )
+    # remove NaNs
+    return matches_merge_students.dropna()
+
+
+def _prepare_connecting_lines(df: pd.DataFrame) -> pd.DataFrame:
+    """Prepares the dataframe in a format such that lines can be drawn on the map.
+
+    Args:
+        df: The prepared dataframe with NaNs removed.
+
+    Returns:
+        A dataframe alternating with school row followed by a student row.
+    """
+    return pd.DataFrame(
+        {
+            "ID": df[[COLUMN_SCHOOL_ID, COLUMN_STUDENT_ID]].to_numpy().reshape(-1),
+            COLUMN_LATITUDE: df[[_SCHOOL_LATITUDE, _STUDENT_LATITUDE]]
+            .to_numpy()
+            .reshape(-1),
+            COLUMN_LONGITUDE: df[[_SCHOOL_LONGITUDE, _STUDENT_LONGITUDE]]
+            .to_numpy()
+            .reshape(-1),
+        }
+    )
+
+
+def create_allocation_figure(
+    schools: pd.DataFrame,
+    students: pd.DataFrame,
+    matches: pd.DataFrame,
+) -> go.Figure:
+    """Creates the map of all schools and lines connecting the matched students
+
+    Args:
+        schools: All school data.
+        students: All students data.
+        matches: The matched student-school data.
+
+    Returns:
+        The map figure.
+    """
+    df = _prepare_data(schools, students, matches)
+    # plot all schools
+    fig = px.scatter_mapbox(
+        df,
+        lat=_SCHOOL_LATITUDE,
+        lon=_SCHOOL_LONGITUDE,
+        color_discrete_sequence=["red"],
+    )
+    # plot all students
+    students_trace = px.scatter_mapbox(
+        df,
+        lat=_STUDENT_LATITUDE,
+        lon=_STUDENT_LONGITUDE,
+        color_discrete_sequence=["blue"],
+    )
+    fig.add_trace(students_trace.data[0])
+
+    # connect the student-school pairs
+    df_combined_lat_lon = _prepare_connecting_lines(df)
+    for i in range(0, len(df_combined_lat_lon), 2):
+        connection = px.line_mapbox(
+            df_combined_lat_lon.loc[i : i + 1],
+            lat=COLUMN_LATITUDE,
+            lon=COLUMN_LONGITUDE,
+            color_discrete_sequence=["black"],
+        )
+        fig.add_trace(connection.data[0])
+
+    # prepare final output
+    fig.update_layout(mapbox_style="open-street-map")
+    fig.update_layout(margin={"r": 0, "t": 0, "l": 0, "b": 0})
+    return fig
@@ -0,0 +1,222 @@
+import logging
+import multiprocessing
+import os
+import time
+from collections.abc import Callable
+from multiprocessing.context import BaseContext
+from multiprocessing.sharedctypes import SynchronizedArray
+from multiprocessing.synchronize import Semaphore
+from typing import Any, NamedTuple
+
+import openrouteservice
+import requests
+
+from ioe.constants import (
+    OPENROUTESERVICE_API_KEY,
+    OPENROUTESERVICE_BASE_URLS,
+    OPENROUTESERVICE_HEALTH_RETRY_SECONDS,
+    OPENROUTESERVICE_MAX_CONCURRENCY,
+)
+
+_logger = logging.getLogger(__name__)
+
+_ENDPOINT_ERRORS = (
+    openrouteservice.exceptions.Timeout,
+    requests.exceptions.ConnectionError,
+)
+_HEALTH_PATH = "/v2/health"
+_HEALTH_READY = "ready"
+_HEALTH_TIMEOUT_SECONDS = 5
+
+
+class EndpointState(NamedTuple):
+    """The load and health of each endpoint, shareable between processes"""
+
+    outstanding: SynchronizedArray
+    unhealthy_until: SynchronizedArray
+    slots: list[Semaphore]
+
+
+class EndpointPool:
+    """Openrouteservice clients balanced by least outstanding requests
+
+    Each request goes to the healthy endpoint with the fewest requests in
+    flight, waiting for a free slot if it is at its concurrency limit. An
+    endpoint which cannot be reached is taken out of the rotation, and the
+    request fails over to the next one, until its health check passes again.
+    """
+
+    def __init__(
+        self,
+        clients: list[openrouteservice.Client],
+        *,
+        health_urls: list[str | None],
+        max_concurrency: int,
+    ) -> None:
+        self._clients = clients
+        self._health_urls = health_urls
+        self._max_concurrency = max_concurrency
+        self.state = self.create_state()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def attach(self, state: EndpointState) -> None:
+        """Share the load and health with the other processes
+
+        Args:
+            state: The state created by the parent process
+        """
+        self.state = state
+
+    def create_state(self, context: BaseContext | None = None) -> EndpointState:
+        """Create a fresh state for this pool to share with worker processes
+
+        Args:
+            context (optional): The context the worker processes are started
+                from. Defaults to the default context.
+
+        Returns:
+            The state with every endpoint idle and healthy
+        """
+        context = context or multiprocessing.get_context()
+        return EndpointState(
+            outstanding=context.Array("i", len(self)),
+            unhealthy_until=context.Array("d", len(self)),
+            slots=[
+                context.BoundedSemaphore(self._max_concurrency)
+                for _ in range(len(self))
+            ],
+        )
+
+    def _is_healthy(self, index: int) -> bool:
+        """Whether the endpoint can take requests, rechecking if it was down
+
+        Args:
+            index: The endpoint index
+
+        Returns:
+            Whether the endpoint is healthy
+        """
+        unhealthy_until = self.state.unhealthy_until[index]
+        if unhealthy_until == 0:
+            return True
+        if unhealthy_until > time.time():
+            return False
+        # the retry period is over so check before using it again
+        if not self._check_health(index):
+            return False
+        _logger.info(f"openrouteservice endpoint {index} is healthy again")
+        self.state.unhealthy_until[index] = 0
+        return True
+
+    def _check_health(self, index: int) -> bool:
+        """Query the health endpoint of an on-premise instance
+
+        Args:
+            index: The endpoint index
+
+        Returns:
+            Whether the instance is ready
+        """
+        url = self._health_urls[index]
+        if url is None:
+            return True
+        try:
+            response = requests.get(url, timeout=_HEALTH_TIMEOUT_SECONDS)
+            ready = response.json().get("status") == _HEALTH_READY
+        except (requests.exceptions.RequestException, ValueError):
+            ready = False
+        if not ready:
+            self._mark_unhealthy(index)
+        return ready
+
+    def _mark_unhealthy(self, index: int) -> None:
+        """Take an endpoint out of the rotation for a while
+
+        Args:
+            index: The endpoint index
+        """
+        _logger.warning(f"openrouteservice endpoint {index} is unhealthy")
+        self.state.unhealthy_until[index] = (
+            time.time() + OPENROUTESERVICE_HEALTH_RETRY_SECONDS
+        )
+
+    def _acquire(self, exclude: set[int]) -> int:
+        """Reserve a slot on the least loaded healthy endpoint
+
+        Args:
+            exclude: The endpoints which already failed for this request
+
+        Returns:
+            The endpoint index
+        """
+        candidates = [i for i in range(len(self)) if i not in exclude]
+        healthy = [i for i in candidates if self._is_healthy(i)]
+        # spread the processes when the load is equal
+        offset = os.getpid()
+        with self.state.outstanding.get_lock():
+            index = min(
+                healthy or candidates,
+                key=lambda i: (self.state.outstanding[i], (i + offset) % len(self)),
+            )
+            self.state.outstanding[index] += 1
+        self.state.slots[index].acquire()
+        return index
+
+    def _release(self, index: int) -> None:
+        """Free the slot on the endpoint
+
+        Args:
+            index: The endpoint index
+        """
+        self.state.slots[index].release()
+        with self.state.outstanding.get_lock():
+            self.state.outstanding[index] -= 1
+
+    def request(
+        self, method: Callable[[openrouteservice.Client], Any]
+    ) -> dict[str, Any]:
+        """Perform a request, failing over to another endpoint if unreachable
+
+        Args:
+            method: Calls the SDK with the given client
+
+        Returns:
+            The openrouteservice response
+        """
+        failed: set[int] = set()
+        while len(failed) < len(self):
+            index = self._acquire(failed)
+            try:
+                return method(self._clients[index])
+            except _ENDPOINT_ERRORS:
+                self._mark_unhealthy(index)
+                failed.add(index)
+            finally:
+                self._release(index)
+        error = "All openrouteservice endpoints are unreachable"
+        raise ConnectionError(error)
+
+
+def create_endpoint_pool() -> EndpointPool:
+    """Create the pool from the environment variables
+
+    Returns:
+        The pool of every on-premise instance, or of the API if none given
+    """
+    if OPENROUTESERVICE_BASE_URLS:
+        _logger.info(
+            f"On-premise method selected for URLs {OPENROUTESERVICE_BASE_URLS}"
+        )
+        return EndpointPool(
+            [openrouteservice.Client(base_url=u) for u in OPENROUTESERVICE_BASE_URLS],
+            health_urls=[f"{u}{_HEALTH_PATH}" for u in OPENROUTESERVICE_BASE_URLS],
+            max_concurrency=OPENROUTESERVICE_MAX_CONCURRENCY,
+        )
+    _logger.info("API key method selected")
+    return EndpointPool(
+        [openrouteservice.Client(key=OPENROUTESERVICE_API_KEY)],
+        health_urls=[None],
+        max_concurrency=OPENROUTESERVICE_MAX_CONCURRENCY,
+    )
@@ -0,0 +1,163 @@
+import logging
+from http import HTTPStatus
+
+import numpy as np
+import openrouteservice
+import pandas as pd
+
+from ioe.constants import (
+    COLUMN_LATITUDE,
+    COLUMN_LONGITUDE,
+    COLUMN_SCHOOL_ID,
+    COLUMN_STUDENT_ID,
+    COLUMN_TRAVEL,
+    ISOCHRONE_BANDS_MINUTES,
+    OPENROUTESERVICE_TRANSPORT_MODES,
+)
+from ioe.data.accumulator import PairAccumulator
+from ioe.main import compute_pair_journeys
+from ioe.ors.routing import calculate_ors_isochrones
+from ioe.spatial import points_in_geometry
+
+_logger = logging.getLogger(__name__)
+
+
+def assign_bands(
+    students: pd.DataFrame, features: list[dict], bands: tuple[int, ...]
+) -> tuple[np.ndarray, np.ndarray]:
+    """Find the time band of each student from the nested isochrones
+
+    Args:
+        students: The students dataframe
+        features: The GeoJSON features of each band, in increasing order
+        bands: The time limits in minutes, in increasing order
+
+    Returns:
+        The lower and upper limit of the band of each student in minutes, the
+        upper limit being infinite beyond the largest band
+    """
+    lower = np.full(len(students), float(bands[-1]))
+    upper = np.full(len(students), np.inf)
+    unassigned = np.ones(len(students), dtype=bool)
+    for k, feature in enumerate(features):
+        inside = unassigned & points_in_geometry(
+            students[COLUMN_LONGITUDE], students[COLUMN_LATITUDE], feature["geometry"]
+        )
+        lower[inside] = bands[k - 1] if k else 0
+        upper[inside] = bands[k]
+        unassigned &= ~inside
+    return lower, upper
+
+
+def _band_matters(
+    lower: np.ndarray, upper: np.ndarray, n_alternatives: int
+) -> np.ndarray:
+    """Find the pairs whose band could be among the quickest of the student
+
+    A pair whose band starts after the end of the band of the n quickest
+    schools of the student cannot change the allocation much, so keeps its
+    banded time.
+
+    Args:
+        lower: The students by schools matrix of lower band limits
+        upper: The students by schools matrix of upper band limits
+        n_alternatives: The number of quickest schools per student
+
+    Returns:
+        A students by schools mask of the pairs to route exactly
+    """
+    n_alternatives = min(n_alternatives, upper.shape[1])
+    threshold = np.partition(upper, n_alternatives - 1, axis=1)[:, n_alternatives - 1]
+    return lower < threshold[:, np.newaxis]
+
+
+def compute_banded_journeys(  # noqa: PLR0913
+    subject: str,
+    students: pd.DataFrame,
+    schools: pd.DataFrame,
+    *,
+    bands: tuple[int, ...] = ISOCHRONE_BANDS_MINUTES,
+    keep_messages: bool = True,
+    n_alternatives: int = 2,
+    n_cores: int = 1,
+) -> tuple[PairAccumulator, PairAccumulator]:
+    """Band the journey times of the cycling and driving students by isochrones
+
+    One isochrone request per school and profile gives the time band of every
+    such student. Only the pairs where the band resolution matters, being
+    among the quickest of the student, are routed exactly along with the
+    public transport students. The others take the upper limit of their
+    band, or are recorded as failures if beyond the largest band, as their
+    time is not bounded.
+
+    Args:
+        subject: The subject
+        students: The students dataframe
+        schools: The schools dataframe
+        bands (optional): The time limits in minutes, in increasing order.
+            Defaults to ISOCHRONE_BANDS_MINUTES.
+        keep_messages (optional): Whether to keep the route messages.
+            Defaults to True.
+        n_alternatives (optional): The quickest schools per student to route.
+            Defaults to 2.
+        n_cores (optional): The number of cores to parallelise over. Defaults to 1.
+
+    Returns:
+        The full successful journeys and failed journeys
+    """
+    travel = students[COLUMN_TRAVEL].to_numpy()
+    lower = np.zeros((len(students), len(schools)))
+    upper = np.full(lower.shape, np.inf)
+    for mode, profile in OPENROUTESERVICE_TRANSPORT_MODES.items():
+        rows = np.flatnonzero(travel == mode)
+        if not len(rows):
+            continue
+        for j, school in enumerate(schools.to_dict("records")):
+            try:
+                features = calculate_ors_isochrones(school, profile, bands)
+            except openrouteservice.exceptions.ApiError:
+                # leave the whole range open so the pairs are routed exactly
+                _logger.warning(
+                    f"No {profile} isochrones for school {school[COLUMN_SCHOOL_ID]}, "
+                    f"subject {subject}"
+                )
+                continue
+            lower[rows, j], upper[rows, j] = assign_bands(
+                students.iloc[rows], features, bands
+            )
+
+    banded = np.isin(travel, list(OPENROUTESERVICE_TRANSPORT_MODES))
+    routed = ~banded[:, np.newaxis] | _band_matters(lower, upper, n_alternatives)
+    _logger.info(
+        f"Routing {routed.sum()}/{routed.size} pairs exactly after "
+        f"{len(schools)} isochrones per profile for subject {subject}"
+    )
+    journeys, failures = compute_pair_journeys(
+        subject,
+        students,
+        schools,
+        np.argwhere(routed),
+        keep_messages=keep_messages,
+        n_cores=n_cores,
+    )
+
+    student_ids = students[COLUMN_STUDENT_ID].to_numpy()
+    school_ids = schools[COLUMN_SCHOOL_ID].to_numpy()
+    for i, j in np.argwhere(~routed):
+        profile = OPENROUTESERVICE_TRANSPORT_MODES[travel[i]]
+        if np.isfinite(upper[i, j]):
+            journeys.append(
+                student_ids[i],
+                school_ids[j],
+                int(upper[i, j]),
+                f"{profile} isochrone band "
+                f"{lower[i, j]:.0f}-{upper[i, j]:.0f} minutes",
+            )
+        else:
+            failures.append(
+                student_ids[i],
+                school_ids[j],
+                HTTPStatus.NOT_FOUND,
+                f"{profile} isochrone band over {lower[i, j]:.0f} minutes",
+            )
+    return journeys, failures
@@ -1,29 +1,49 @@
 import logging
+import time
+from http import HTTPStatus
+from multiprocessing.context import BaseContext
 
-import openrouteservice
 import pandas as pd
-import requests
 
 from ioe.constants import (
+    BACKEND_OPENROUTESERVICE,
     COLUMN_LATITUDE,
     COLUMN_LONGITUDE,
     COLUMN_SCHOOL_ID,
     COLUMN_STUDENT_ID,
     COLUMN_TRAVEL,
     MINUTES,
-    OPENROUTESERVICE_API_KEY,
-    OPENROUTESERVICE_BASE_URL,
     OPENROUTESERVICE_TRANSPORT_MODES,
 )
+from ioe.data.alternatives import AlternativesStore
+from ioe.logs import pair_extra
+from ioe.ors.endpoints import EndpointState, create_endpoint_pool
 
 _logger = logging.getLogger(__name__)
 
-if OPENROUTESERVICE_BASE_URL is not None:
-    _client = openrouteservice.Client(base_url=OPENROUTESERVICE_BASE_URL)
-    _logger.info(f"On-premise method selected for URL {OPENROUTESERVICE_BASE_URL}")
-else:
-    _client = openrouteservice.Client(key=OPENROUTESERVICE_API_KEY)
-    _logger.info("API key method selected")
+_pool = create_endpoint_pool()
+
+
+def create_shared_endpoint_state(context: BaseContext | None = None) -> EndpointState:
+    """Create the endpoint load and health to share with the worker processes
+
+    Args:
+        context (optional): The context the worker processes are started from.
+            Defaults to the default context.
+
+    Returns:
+        The state with every endpoint idle and healthy
+    """
+    return _pool.create_state(context)
+
+
+def share_endpoint_state(state: EndpointState) -> None:
+    """Use the endpoint load and health of the parent, run on process creation
+
+    Args:
+        state: The state created by the parent process
+    """
+    _pool.attach(state)
 
 
 def _create_journey_instructions(journey: dict, student: pd.Series) -> tuple[int, str]:
@@ -54,13 +74,42 @@ def _calculate_ors_times(student: pd.Series, school: dict[str, str | int]) -> di
         (student[COLUMN_LONGITUDE], student[COLUMN_LATITUDE]),
         (school[COLUMN_LONGITUDE], school[COLUMN_LATITUDE]),
     )
-    return _client.directions(
-        coords, profile=OPENROUTESERVICE_TRANSPORT_MODES[student[COLUMN_TRAVEL]]
+    profile = OPENROUTESERVICE_TRANSPORT_MODES[student[COLUMN_TRAVEL]]
+    return _pool.request(lambda client: client.directions(coords, profile=profile))
+
+
+def calculate_ors_isochrones(
+    school: dict[str, str | int], profile: str, bands: tuple[int, ...]
+) -> list[dict]:
+    """Calls the openrouteservice SDK for the areas which reach the school in time
+
+    Args:
+        school: an individual school data
+        profile: The openrouteservice profile, i.e. `cycling-regular`
+        bands: The time limits in minutes, in increasing order
+
+    Returns:
+        The GeoJSON features of each band, in increasing order
+    """
+    location = [[school[COLUMN_LONGITUDE], school[COLUMN_LATITUDE]]]
+    data = _pool.request(
+        lambda client: client.isochrones(
+            location,
+            profile=profile,
+            range=[b * MINUTES for b in bands],
+            location_type="destination",
+        )
     )
+    return sorted(data["features"], key=lambda f: f["properties"]["value"])
 
 
 def create_ors_routes(
-    subject: str, student: pd.DataFrame, school: dict
+    subject: str,
+    student: pd.DataFrame,
+    school: dict,
+    *,
+    alternatives: AlternativesStore | None = None,
+    keep_message: bool = True,
 ) -> tuple[int, tuple[int, str, int, str]]:
     """Creates the routes from the openrouteservice
 
@@ -68,29 +117,51 @@ def create_ors_routes(
         subject: The subject data
         student: The student dataframe
         school: The shool dictionary
+        alternatives (optional): Store every route here. Defaults to None.
+        keep_message (optional): Whether to describe the route. Defaults to True.
 
     Returns:
         The requests code and the output for the journey file
     """
     # use ORS SDK to get ORS data
+    start = time.monotonic()
     data = _calculate_ors_times(student, school)
+    elapsed = time.monotonic() - start
 
     # find the number of journeys
     found_journeys = data["routes"]
     _logger.info(
-        f"Number of valid ORS journeys found: {len(found_journeys)} for "
-        f"student: {student[COLUMN_STUDENT_ID]} -> school: "
-        f"{school[COLUMN_SCHOOL_ID]}, subject {subject}."
+        "Number of valid ORS journeys found: %d for student: %s -> school: %s, "
+        "subject %s.",
+        len(found_journeys),
+        student[COLUMN_STUDENT_ID],
+        school[COLUMN_SCHOOL_ID],
+        subject,
+        extra=pair_extra(
+            subject,
+            student[COLUMN_STUDENT_ID],
+            school[COLUMN_SCHOOL_ID],
+            backend=BACKEND_OPENROUTESERVICE,
+            elapsed=elapsed,
+        ),
     )
 
+    if alternatives is not None:
+        alternatives.add_ors_routes(
+            student[COLUMN_STUDENT_ID],
+            school[COLUMN_SCHOOL_ID],
+            found_journeys,
+            OPENROUTESERVICE_TRANSPORT_MODES[student[COLUMN_TRAVEL]],
+        )
+
     # shortest journey
     shortest_journey = min(found_journeys, key=lambda r: r["summary"]["duration"])
     duration, message = _create_journey_instructions(shortest_journey, student)
 
     # prepare the final output
-    return requests.codes.OK, (
+    return HTTPStatus.OK, (
         student[COLUMN_STUDENT_ID],
         school[COLUMN_SCHOOL_ID],
         duration,
-        message,
+        message if keep_message else "",
     )
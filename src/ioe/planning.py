@@ -0,0 +1,198 @@
+import json
+import logging
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from ioe.clustering import cluster_students
+from ioe.constants import (
+    BACKEND_OPENROUTESERVICE,
+    BACKEND_TFL,
+    COLUMN_LATITUDE,
+    COLUMN_LONGITUDE,
+    COLUMN_SCHOOL_ID,
+    COLUMN_STUDENT_ID,
+    COLUMN_TFL_LATITUDE,
+    COLUMN_TRAVEL,
+    DEFAULT_LATENCY_SECONDS,
+    MAX_REQUESTS_PER_MINUTE,
+    MINUTES,
+    OPENROUTESERVICE_BASE_URLS,
+    OPENROUTESERVICE_MAX_CONCURRENCY,
+)
+from ioe.sharding import Shard, in_shard
+
+_logger = logging.getLogger(__name__)
+
+
+def read_latencies(json_path: Path | None = None) -> dict[str, float]:
+    """The typical request latency of each backend from a previous run
+
+    The per-pair records written by `--log-json` hold the seconds each
+    request took. Backends without any measurement keep their default.
+
+    Args:
+        json_path (optional): The JSON lines log of a previous run.
+            Defaults to None.
+
+    Returns:
+        The median seconds per request of each backend
+    """
+    latencies = dict(DEFAULT_LATENCY_SECONDS)
+    if json_path is None:
+        return latencies
+    with json_path.open() as f:
+        records = pd.DataFrame(
+            [r for line in f if "elapsed" in (r := json.loads(line))],
+            columns=["backend", "elapsed"],
+        )
+    for backend, elapsed in records.groupby("backend")["elapsed"]:
+        _logger.info(
+            f"Measured {len(elapsed)} {backend} requests, "
+            f"median {elapsed.median():.2f}s"
+        )
+        latencies[backend] = elapsed.median()
+    return latencies
+
+
+def plan_requests(  # noqa: PLR0913
+    students: pd.DataFrame,
+    schools: pd.DataFrame,
+    *,
+    shard: Shard | None = None,
+    radius_km: float | None = None,
+    n_validation: int = 0,
+    completed: pd.DataFrame | None = None,
+) -> pd.DataFrame:
+    """Count the requests a run would make, without making any
+
+    Args:
+        students: The students dataframe
+        schools: The schools dataframe
+        shard (optional): Only count the pairs of this shard. Defaults to None.
+        radius_km (optional): Only count one student per cluster, as with
+            `compute_approximate_journeys`. Defaults to None.
+        n_validation (optional): The number of approximated pairs routed
+            exactly to measure the error. Defaults to 0.
+        completed (optional): The student and school of the pairs already in
+            the outputs. Defaults to None.
+
+    Returns:
+        The students, pairs, distinct origin destination queries, completed
+        pairs and pairs flagged as unroutable by `snap_to_stops` of each mode
+        of travel and backend
+    """
+    n_students = students.groupby(COLUMN_TRAVEL, observed=True).size()
+    routed = students
+    if radius_km is not None:
+        _, representatives = cluster_students(students, radius_km=radius_km)
+        routed = students.iloc[representatives]
+    snapped = COLUMN_TFL_LATITUDE in students.columns
+    pairs = routed[
+        [COLUMN_STUDENT_ID, COLUMN_LATITUDE, COLUMN_LONGITUDE, COLUMN_TRAVEL]
+        + ([COLUMN_TFL_LATITUDE] if snapped else [])
+    ].merge(
+        schools[[COLUMN_SCHOOL_ID] + ([COLUMN_TFL_LATITUDE] if snapped else [])],
+        how="cross",
+        suffixes=("", "_school"),
+    )
+    if shard is not None:
+        pairs = pairs[
+            in_shard(pairs[COLUMN_STUDENT_ID], pairs[COLUMN_SCHOOL_ID], shard)
+        ]
+    pairs["unroutable"] = (
+        (pairs[COLUMN_TRAVEL] == "P")
+        & (
+            pairs[COLUMN_TFL_LATITUDE].isna()
+            | pairs[f"{COLUMN_TFL_LATITUDE}_school"].isna()
+        )
+        if snapped
+        else False
+    )
+    pairs["completed"] = False
+    if completed is not None:
+        done = pd.MultiIndex.from_frame(
+            completed[["student", "school"]].astype({"school": str})
+        )
+        pairs["completed"] = pd.MultiIndex.from_arrays(
+            [pairs[COLUMN_STUDENT_ID], pairs[COLUMN_SCHOOL_ID].astype(str)]
+        ).isin(done)
+
+    plan = pairs.groupby(COLUMN_TRAVEL, observed=True).agg(
+        pairs=(COLUMN_STUDENT_ID, "size"),
+        completed=("completed", "sum"),
+        unroutable=("unroutable", "sum"),
+    )
+    plan["distinct"] = (
+        pairs.drop_duplicates(
+            [COLUMN_LATITUDE, COLUMN_LONGITUDE, COLUMN_TRAVEL, COLUMN_SCHOOL_ID]
+        )
+        .groupby(COLUMN_TRAVEL, observed=True)
+        .size()
+    )
+    if radius_km is not None:
+        # the validation sample is spread over the approximated pairs
+        approximated = (
+            n_students - routed.groupby(COLUMN_TRAVEL, observed=True).size()
+        ).reindex(plan.index, fill_value=0) * len(schools)
+        n_validation = min(n_validation, approximated.sum())
+        if n_validation:
+            extra = np.round(approximated / approximated.sum() * n_validation)
+            plan["pairs"] += extra.astype(int)
+            plan["distinct"] += extra.astype(int)
+    plan.insert(0, "students", n_students.reindex(plan.index, fill_value=0))
+    plan.insert(
+        0,
+        "backend",
+        np.where(plan.index == "P", BACKEND_TFL, BACKEND_OPENROUTESERVICE),
+    )
+    return plan.reset_index()
+
+
+def estimate_duration(
+    plan: pd.DataFrame, latencies: dict[str, float], *, n_cores: int = 1
+) -> tuple[pd.DataFrame, float]:
+    """Estimate how long the planned requests take from the limits and latencies
+
+    The pairs flagged as unroutable fail without a request. The completed
+    pairs are counted, as the run requests them again and overwrites the
+    outputs.
+
+    TfL requests are limited to `MAX_REQUESTS_PER_MINUTE` and openrouteservice
+    requests to `OPENROUTESERVICE_MAX_CONCURRENCY` per endpoint, and neither
+    can go faster than the processes waiting on them.
+
+    Args:
+        plan: The output of `plan_requests`
+        latencies: The seconds per request of each backend
+        n_cores (optional): The number of cores to parallelise over. Defaults to 1.
+
+    Returns:
+        The requests, throughput and minutes of each backend, and the minutes
+        of the whole run
+    """
+    n_endpoints = max(len(OPENROUTESERVICE_BASE_URLS), 1)
+    estimate = (
+        plan.eval("requests = pairs - unroutable")
+        .groupby("backend")[["requests"]]
+        .sum()
+    )
+    estimate["latency_seconds"] = estimate.index.map(latencies)
+    concurrency = {
+        BACKEND_OPENROUTESERVICE: min(
+            n_cores, OPENROUTESERVICE_MAX_CONCURRENCY * n_endpoints
+        ),
+        BACKEND_TFL: n_cores,
+    }
+    estimate["requests_per_minute"] = [
+        min(
+            concurrency[backend] * MINUTES / latency,
+            MAX_REQUESTS_PER_MINUTE if backend == BACKEND_TFL else np.inf,
+        )
+        for backend, latency in estimate["latency_seconds"].items()
+    ]
+    estimate["minutes"] = estimate["requests"] / estimate["requests_per_minute"]
+    # the backends share the processes, so together they cannot beat their sum
+    busy = (estimate["requests"] * estimate["latency_seconds"]).sum() / MINUTES
+    return estimate.reset_index(), max(estimate["minutes"].max(), busy / n_cores)
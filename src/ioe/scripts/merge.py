@@ -0,0 +1,124 @@
+from argparse import ArgumentParser, Namespace
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from ioe.constants import COLUMN_SCHOOL_ID, COLUMN_STUDENT_ID
+from ioe.data.data_input import SCHEMA_SCHOOLS, SCHEMA_STUDENTS, read_data
+from ioe.sharding import Shard, merge_shard_outputs, shard_filepath
+
+_data_location = Path(__file__).resolve().parents[3] / "data"
+
+
+def _read_args() -> Namespace:
+    """Read in CLI inputs.
+
+    Returns:
+        The CLI options output.
+    """
+    parser = ArgumentParser(
+        description="Combines the outputs of every shard into the standard files"
+    )
+    parser.add_argument(
+        "subject",
+        type=str,
+        help="placement subject",
+    )
+    parser.add_argument(
+        "n_shards",
+        type=int,
+        help="total number of shards N, as given to tfl --shard i/N",
+    )
+    return parser.parse_args()
+
+
+def _check_pairs(
+    journeys: pd.DataFrame,
+    failures: pd.DataFrame,
+    student_ids: pd.Series,
+    school_ids: pd.Series,
+) -> None:
+    """Check every student school pair appears as often as the run routes it
+
+    As in the run, a student or school repeated in the inputs is routed once
+    per row, so its pairs are expected once per row too.
+
+    Args:
+        journeys: The combined journeys
+        failures: The combined failures
+        student_ids: The ID of every student row
+        school_ids: The ID of every school row
+    """
+    found = (
+        pd.concat([journeys[["student", "school"]], failures[["student", "school"]]])
+        .astype({"school": str})
+        .value_counts()
+    )
+    n_students = student_ids.value_counts()
+    n_schools = school_ids.astype(str).value_counts()
+    expected = pd.Series(
+        np.outer(n_students, n_schools).ravel(),
+        index=pd.MultiIndex.from_product(
+            [n_students.index, n_schools.index], names=["student", "school"]
+        ),
+    )
+    index = expected.index.union(found.index)
+    difference = found.reindex(index, fill_value=0) - expected.reindex(
+        index, fill_value=0
+    )
+    extra = difference[difference > 0]
+    if len(extra):
+        error = (
+            f"The shards overlap or hold unexpected pairs, {extra.sum()} records "
+            f"too many, i.e. {extra.index[:5].tolist()}"
+        )
+        raise ValueError(error)
+    missing = difference[difference < 0]
+    if len(missing):
+        error = (
+            f"The shards are missing {-missing.sum()} records, "
+            f"i.e. {missing.index[:5].tolist()}"
+        )
+        raise ValueError(error)
+
+
+def main() -> None:
+    """Merges the sharded OD matrices for a given subject"""
+    args = _read_args()
+    students = read_data(
+        _data_location / f"{args.subject}_students.csv",
+        schema=SCHEMA_STUDENTS,
+        usecols=[COLUMN_STUDENT_ID],
+    )
+    schools = read_data(
+        _data_location / f"{args.subject}_schools.csv",
+        schema=SCHEMA_SCHOOLS,
+        usecols=[COLUMN_SCHOOL_ID],
+    )
+    journeys_path = _data_location / f"{args.subject}_student_school_journeys.csv"
+    failures_path = _data_location / f"{args.subject}_student_school_failures.csv"
+    journeys = merge_shard_outputs(journeys_path, args.n_shards)
+    failures = merge_shard_outputs(failures_path, args.n_shards)
+    _check_pairs(
+        journeys, failures, students[COLUMN_STUDENT_ID], schools[COLUMN_SCHOOL_ID]
+    )
+    journeys.sort_values(by=["student", "school"]).to_csv(journeys_path, index=False)
+    failures.sort_values(by=["student", "school", "code"]).to_csv(
+        failures_path, index=False
+    )
+
+    # the alternatives are only there if the shards ran with --alternatives
+    alternatives_path = (
+        _data_location / f"{args.subject}_student_school_alternatives.parquet"
+    )
+    if shard_filepath(alternatives_path, Shard(0, args.n_shards)).exists():
+        alternatives = merge_shard_outputs(alternatives_path, args.n_shards)
+        # stable, so the legs of each alternative stay in order
+        alternatives.sort_values(
+            by=["student", "school", "rank"], kind="stable", ignore_index=True
+        ).to_parquet(alternatives_path, index=False)
+
+
+if __name__ == "__main__":
+    main()
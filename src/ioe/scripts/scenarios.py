@@ -0,0 +1,106 @@
+import itertools
+from argparse import ArgumentParser, Namespace
+from pathlib import Path
+
+from ioe.allocation.pmedian import create_cost_matrix
+from ioe.allocation.scenarios import Scenario, sweep_scenarios
+from ioe.constants import N_CORES
+from ioe.data.data_input import (
+    SCHEMA_JOURNEYS,
+    SCHEMA_SCHOOLS,
+    SCHEMA_STUDENTS,
+    read_data,
+)
+
+_data_location = Path(__file__).resolve().parents[3] / "data"
+
+
+def _parse_priorities(spec: str) -> tuple[int, ...]:
+    """Read a comma separated set of priorities, or `none` for no priorities
+
+    Args:
+        spec: The priorities specification, i.e. `1,2`
+
+    Returns:
+        The priorities
+    """
+    if spec.lower() == "none":
+        return ()
+    return tuple(int(s) for s in spec.split(","))
+
+
+def _read_args() -> Namespace:
+    """Read in CLI inputs.
+
+    Returns:
+        The CLI options output.
+    """
+    parser = ArgumentParser(
+        description="Solves the allocation for a grid of scenarios and summarises them"
+    )
+    parser.add_argument(
+        "subject",
+        type=str,
+        help="placement subject",
+    )
+    parser.add_argument(
+        "--capacity-scales",
+        type=float,
+        nargs="+",
+        default=[1.0],
+        help="factors to scale the total capacity of the schools by",
+    )
+    parser.add_argument(
+        "--predefined",
+        type=_parse_priorities,
+        nargs="+",
+        default=[(1,)],
+        help="sets of priorities whose schools must be filled, i.e. 1 1,2 none",
+    )
+    parser.add_argument(
+        "--excluded",
+        type=_parse_priorities,
+        nargs="+",
+        default=[()],
+        help="sets of priorities whose schools cannot be used, i.e. 2 none",
+    )
+    parser.add_argument(
+        "--p-facilities",
+        type=int,
+        nargs="+",
+        default=[None],
+        help="numbers of schools to open, defaults to the number of students",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Sweeps the allocation scenarios for a given subject"""
+    args = _read_args()
+    students = read_data(
+        _data_location / f"{args.subject}_students.csv", schema=SCHEMA_STUDENTS
+    )
+    schools = read_data(
+        _data_location / f"{args.subject}_schools.csv", schema=SCHEMA_SCHOOLS
+    )
+    journeys = read_data(
+        _data_location / f"{args.subject}_student_school_journeys.csv",
+        schema=SCHEMA_JOURNEYS,
+    )
+    scenarios = [
+        Scenario(*s)
+        for s in itertools.product(
+            args.capacity_scales, args.predefined, args.excluded, args.p_facilities
+        )
+    ]
+    summary = sweep_scenarios(
+        create_cost_matrix(journeys, students, schools),
+        schools,
+        scenarios,
+        n_cores=N_CORES,
+    )
+    summary.to_csv(_data_location / f"{args.subject}_scenarios.csv", index=False)
+
+
+if __name__ == "__main__":
+    main()
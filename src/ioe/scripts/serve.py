@@ -0,0 +1,54 @@
+from argparse import ArgumentParser, Namespace
+from pathlib import Path
+
+from ioe.constants import N_CORES
+from ioe.logs import configure_logging
+from ioe.service import AllocationService, serve
+
+_data_location = Path(__file__).resolve().parents[3] / "data"
+
+
+def _read_args() -> Namespace:
+    """Read in CLI inputs.
+
+    Returns:
+        The CLI options output.
+    """
+    parser = ArgumentParser(
+        description="Serves travel times, allocations and maps from memory"
+    )
+    parser.add_argument(
+        "--host",
+        type=str,
+        default="127.0.0.1",
+        help="the host to listen on",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8000,
+        help="the port to listen on",
+    )
+    parser.add_argument(
+        "--socket",
+        type=Path,
+        help="listen on this Unix socket instead of a port",
+    )
+    parser.add_argument(
+        "--log-json",
+        type=Path,
+        help="also write the log records to this file as JSON lines",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Keeps the subject data in memory and answers requests on it"""
+    args = _read_args()
+    configure_logging(json_path=args.log_json)
+    with AllocationService(_data_location, n_cores=N_CORES) as service:
+        serve(service, host=args.host, port=args.port, socket_path=args.socket)
+
+
+if __name__ == "__main__":
+    main()
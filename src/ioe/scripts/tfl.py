@@ -1,14 +1,54 @@
-from argparse import ArgumentParser, Namespace
+import logging
+from argparse import ArgumentParser, ArgumentTypeError, Namespace
 from pathlib import Path
 
+import pandas as pd
+
+from ioe.allocation.lazy import lazy_allocation
+from ioe.clustering import compute_approximate_journeys
 from ioe.constants import N_CORES
-from ioe.data.data_input import read_data
-from ioe.data.data_output import save_output_failures, save_output_journeys
+from ioe.data.accumulator import PairAccumulator
+from ioe.data.alternatives import AlternativesStore
+from ioe.data.data_input import (
+    SCHEMA_FAILURES,
+    SCHEMA_JOURNEYS,
+    SCHEMA_SCHOOLS,
+    SCHEMA_STUDENTS,
+    read_data,
+)
+from ioe.data.data_output import (
+    save_output_failures,
+    save_output_journeys,
+    save_output_matches,
+)
+from ioe.logs import configure_logging
 from ioe.main import compute_all_pairs_journeys
+from ioe.ors.isochrones import compute_banded_journeys
+from ioe.planning import estimate_duration, plan_requests, read_latencies
+from ioe.sharding import parse_shard, shard_filepath
+from ioe.tfl.stops import read_stops, snap_to_stops
+
+_logger = logging.getLogger(__name__)
 
 _data_location = Path(__file__).resolve().parents[3] / "data"
 
 
+def _positive_int(value: str) -> int:
+    """Read a CLI input which must be a positive integer
+
+    Args:
+        value: The CLI input
+
+    Returns:
+        The integer
+    """
+    number = int(value)
+    if number < 1:
+        error = f"{value} should be a positive integer"
+        raise ArgumentTypeError(error)
+    return number
+
+
 def _read_args() -> Namespace:
     """Read in CLI inputs.
 
@@ -23,30 +63,252 @@ def _read_args() -> Namespace:
         type=str,
         help="placement subject",
     )
-    return parser.parse_args()
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--lazy",
+        action="store_true",
+        help="only route the pairs which could change the allocation",
+    )
+    mode.add_argument(
+        "--cluster-radius",
+        type=float,
+        help="only route one student per cluster within this many kilometres",
+    )
+    mode.add_argument(
+        "--isochrones",
+        action="store_true",
+        help="band the cycling and driving times by isochrones around each school",
+    )
+    parser.add_argument(
+        "--validation-pairs",
+        type=int,
+        default=100,
+        help="the number of approximated pairs to route exactly to measure error",
+    )
+    parser.add_argument(
+        "--journeys",
+        type=Path,
+        help="a journeys file whose pairs --lazy does not request again",
+    )
+    parser.add_argument(
+        "--no-messages",
+        action="store_true",
+        help="only keep the journey times, not the route descriptions",
+    )
+    parser.add_argument(
+        "--alternatives",
+        action="store_true",
+        help="also save every journey alternative and its legs as Parquet",
+    )
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        help="only compute the shard i/N of the pairs, for 0 <= i < N",
+    )
+    parser.add_argument(
+        "--stops",
+        type=Path,
+        help="a NaPTAN style stops CSV to check and snap the TfL coordinates to",
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="only count the requests and estimate the duration, without routing",
+    )
+    parser.add_argument(
+        "--latencies",
+        type=Path,
+        help="the --log-json file of a previous run to take request latencies from",
+    )
+    parser.add_argument(
+        "--log-sample-every",
+        type=_positive_int,
+        default=1,
+        help="only log one in every n of the per-pair messages",
+    )
+    parser.add_argument(
+        "--log-json",
+        type=Path,
+        help="also write the log records to this file as JSON lines",
+    )
+    args = parser.parse_args()
+    approximate = args.lazy or args.isochrones or args.cluster_radius is not None
+    if approximate and args.shard is not None:
+        parser.error("--shard only applies when computing all pairs")
+    if approximate and args.alternatives:
+        parser.error("--alternatives only applies when computing all pairs")
+    if args.journeys is not None and not args.lazy:
+        parser.error("--journeys only applies with --lazy")
+    if args.plan and (args.lazy or args.isochrones):
+        parser.error("--plan cannot predict the pairs routed by --lazy or --isochrones")
+    return args
+
+
+def _read_known_journeys(
+    filepath: Path, *, keep_messages: bool
+) -> tuple[pd.DataFrame, PairAccumulator]:
+    """Read the journeys of a previous run, to build on rather than request
+
+    Args:
+        filepath: The journeys file
+        keep_messages: Whether to keep the route messages
+
+    Returns:
+        The journeys as a dataframe and as records to add the new ones to
+    """
+    df = read_data(filepath, schema=SCHEMA_JOURNEYS, cache=False)
+    records = PairAccumulator(keep_text=keep_messages)
+    for student, school, time, message in df.itertuples(index=False):
+        records.append(student, school, time, "" if pd.isna(message) else message)
+    return df, records
+
+
+def _output_suffix(args: Namespace) -> str:
+    """Find the suffix of the outputs, which only a full run writes without
+
+    The other modes leave out pairs or approximate their times, so their
+    outputs are kept apart from the full ones which every other command reads.
+
+    Args:
+        args: The CLI options
+
+    Returns:
+        The suffix of the journeys and failures file names
+    """
+    if args.lazy:
+        return "_lazy"
+    if args.isochrones:
+        return "_isochrone"
+    if args.cluster_radius is not None:
+        return "_approximate"
+    return ""
+
+
+def _log_plan(
+    args: Namespace,
+    students: pd.DataFrame,
+    schools: pd.DataFrame,
+    output_paths: list[Path],
+) -> None:
+    """Log the requests of the run and its estimated duration
+
+    Args:
+        args: The CLI options
+        students: The students dataframe
+        schools: The schools dataframe
+        output_paths: The journeys and failures outputs of the run
+    """
+    completed = [
+        read_data(p, schema=schema, usecols=["student", "school"], cache=False)
+        for p, schema in zip(
+            output_paths, (SCHEMA_JOURNEYS, SCHEMA_FAILURES), strict=True
+        )
+        if p.exists()
+    ]
+    plan = plan_requests(
+        students,
+        schools,
+        shard=args.shard,
+        radius_km=args.cluster_radius,
+        n_validation=args.validation_pairs,
+        completed=pd.concat(completed) if completed else None,
+    )
+    estimate, minutes = estimate_duration(
+        plan, read_latencies(args.latencies), n_cores=N_CORES
+    )
+    _logger.info(f"Planned requests for subject {args.subject}:\n{plan.to_string()}")
+    if plan["completed"].any():
+        _logger.warning(
+            f"{plan['completed'].sum()} pairs are already in {output_paths}, "
+            "which the run requests again and overwrites"
+        )
+    _logger.info(f"Estimated duration per backend:\n{estimate.to_string()}")
+    _logger.info(f"Estimated duration of the run: {minutes:.0f} minutes")
 
 
 def main() -> None:
     """Computes the OD matrices for a given set of student school pairs"""
     args = _read_args()
-    students = read_data(_data_location / f"{args.subject}_students.csv")
-    schools = read_data(_data_location / f"{args.subject}_schools.csv")
-    journeys, failures = compute_all_pairs_journeys(
-        args.subject,
-        students,
-        schools,
-        n_cores=N_CORES,
+    configure_logging(sample_every=args.log_sample_every, json_path=args.log_json)
+    students = read_data(
+        _data_location / f"{args.subject}_students.csv", schema=SCHEMA_STUDENTS
     )
-    save_output_journeys(
-        journeys,
-        _data_location / f"{args.subject}_student_school_journeys.csv",
-        save_output=True,
+    schools = read_data(
+        _data_location / f"{args.subject}_schools.csv", schema=SCHEMA_SCHOOLS
     )
-    save_output_failures(
-        failures,
-        _data_location / f"{args.subject}_student_school_failures.csv",
-        save_output=True,
+    if args.stops is not None:
+        stops = read_stops(args.stops)
+        students = snap_to_stops(students, stops)
+        schools = snap_to_stops(schools, stops)
+    outputs = f"{args.subject}_student_school{_output_suffix(args)}"
+    journeys_path = _data_location / f"{outputs}_journeys.csv"
+    failures_path = _data_location / f"{outputs}_failures.csv"
+    alternatives_path = (
+        _data_location / f"{args.subject}_student_school_alternatives.parquet"
     )
+    if args.shard is not None:
+        journeys_path = shard_filepath(journeys_path, args.shard)
+        failures_path = shard_filepath(failures_path, args.shard)
+        alternatives_path = shard_filepath(alternatives_path, args.shard)
+    if args.plan:
+        _log_plan(args, students, schools, [journeys_path, failures_path])
+        return
+
+    alternatives = AlternativesStore() if args.alternatives else None
+    if args.lazy:
+        known, journeys = (
+            (None, PairAccumulator(keep_text=not args.no_messages))
+            if args.journeys is None
+            else _read_known_journeys(args.journeys, keep_messages=not args.no_messages)
+        )
+        new_journeys, failures, allocation = lazy_allocation(
+            args.subject,
+            students,
+            schools,
+            journeys=known,
+            keep_messages=not args.no_messages,
+            n_cores=N_CORES,
+        )
+        journeys.extend(new_journeys)
+        save_output_matches(
+            students,
+            schools,
+            allocation,
+            _data_location / f"{args.subject}_matches.csv",
+            save_output=True,
+        )
+    elif args.isochrones:
+        journeys, failures = compute_banded_journeys(
+            args.subject,
+            students,
+            schools,
+            keep_messages=not args.no_messages,
+            n_cores=N_CORES,
+        )
+    elif args.cluster_radius is not None:
+        journeys, failures, _ = compute_approximate_journeys(
+            args.subject,
+            students,
+            schools,
+            radius_km=args.cluster_radius,
+            keep_messages=not args.no_messages,
+            n_cores=N_CORES,
+            n_validation=args.validation_pairs,
+        )
+    else:
+        journeys, failures = compute_all_pairs_journeys(
+            args.subject,
+            students,
+            schools,
+            keep_messages=not args.no_messages,
+            n_cores=N_CORES,
+            shard=args.shard,
+            alternatives=alternatives,
+        )
+    save_output_journeys(journeys, journeys_path, save_output=True)
+    save_output_failures(failures, failures_path, save_output=True)
+    if alternatives is not None:
+        alternatives.save(alternatives_path)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,459 @@
+import json
+import logging
+import multiprocessing
+import re
+import threading
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Executor
+from contextlib import ExitStack
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from socketserver import ThreadingUnixStreamServer
+from typing import Any, NamedTuple
+
+import pandas as pd
+import pgeocode
+from scipy import sparse
+
+from ioe.allocation.pmedian import create_sparse_cost_matrix, solve_allocation
+from ioe.constants import (
+    COLUMN_ALLOCATION_SCHOOL_ID,
+    COLUMN_LATITUDE,
+    COLUMN_LONGITUDE,
+    COLUMN_STUDENT_ID,
+    COLUMN_TRAVEL,
+)
+from ioe.data.data_input import (
+    SCHEMA_JOURNEYS,
+    SCHEMA_SCHOOLS,
+    SCHEMA_STUDENTS,
+    read_data,
+)
+from ioe.data.data_output import (
+    save_output_failures,
+    save_output_journeys,
+    save_output_matches,
+)
+from ioe.main import compute_all_pairs_journeys, create_process_pool
+from ioe.maps import create_allocation_figure
+
+_logger = logging.getLogger(__name__)
+
+_START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+_MAX_TRAVEL_TIMES = 1024
+_ROUTE = re.compile(r"^/subjects/(?P<subject>[\w-]+)/(?P<action>[\w-]+)$")
+
+
+class SubjectData(NamedTuple):
+    """The inputs of a subject and the matrices built from them"""
+
+    signature: tuple[tuple[int, int], ...]
+    students: pd.DataFrame
+    schools: pd.DataFrame
+    journeys: pd.DataFrame
+    cost_matrix: sparse.csr_array
+
+
+class Allocation(NamedTuple):
+    """The last allocation of a subject and the data it was solved on"""
+
+    signature: tuple[tuple[int, int], ...]
+    matches: pd.DataFrame
+
+
+class AllocationService:
+    """Keeps the inputs, matrices and allocations of each subject in memory
+
+    The files of a subject are read on its first request and read again
+    whenever their size or modification time changes. A reload which fails,
+    i.e. on a half written file, keeps serving the previous version. Each
+    subject reloads under its own lock, so the others keep being served.
+    The last `_MAX_TRAVEL_TIMES` travel times requests are kept, those of a
+    subject being dropped when it reloads.
+
+    Used as a context manager, which starts the routing processes once for
+    every travel times request.
+    """
+
+    def __init__(
+        self,
+        data_location: Path,
+        *,
+        n_cores: int = 1,
+        start_method: str = _START_METHOD,
+    ) -> None:
+        self._data_location = data_location
+        self._n_cores = n_cores
+        self._start_method = start_method
+        self._lock = threading.Lock()
+        self._subject_locks: defaultdict[str, threading.Lock] = defaultdict(
+            threading.Lock
+        )
+        self._geocoder_lock = threading.Lock()
+        self._subjects: dict[str, SubjectData] = {}
+        self._allocations: dict[str, Allocation] = {}
+        self._travel_times: OrderedDict[tuple[Any, ...], dict[str, Any]] = OrderedDict()
+        self._geocoder: pgeocode.Nominatim | None = None
+        self._exit_stack = ExitStack()
+        self._executor: Executor | None = None
+
+    def __enter__(self) -> "AllocationService":
+        # the server threads already run, so the processes must not be forked
+        self._executor = self._exit_stack.enter_context(
+            create_process_pool(self._n_cores, start_method=self._start_method)
+        )
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._executor = None
+        self._exit_stack.close()
+
+    def _filepaths(self, subject: str) -> tuple[Path, Path, Path]:
+        """The students, schools and journeys files of a subject
+
+        Args:
+            subject: The subject
+
+        Returns:
+            The paths of the three input files
+        """
+        return (
+            self._data_location / f"{subject}_students.csv",
+            self._data_location / f"{subject}_schools.csv",
+            self._data_location / f"{subject}_student_school_journeys.csv",
+        )
+
+    def _load(
+        self, subject: str, signature: tuple[tuple[int, int], ...]
+    ) -> SubjectData:
+        """Read the files of a subject and build its cost matrix
+
+        Args:
+            subject: The subject
+            signature: The size and modification time of each file
+
+        Returns:
+            The subject data
+        """
+        students_path, schools_path, journeys_path = self._filepaths(subject)
+        students = read_data(students_path, schema=SCHEMA_STUDENTS)
+        schools = read_data(schools_path, schema=SCHEMA_SCHOOLS)
+        journeys = read_data(journeys_path, schema=SCHEMA_JOURNEYS)
+        return SubjectData(
+            signature=signature,
+            students=students,
+            schools=schools,
+            journeys=journeys,
+            cost_matrix=create_sparse_cost_matrix(journeys, students, schools),
+        )
+
+    def subject(self, subject: str) -> SubjectData:
+        """The data of a subject, reloaded if any of its files changed
+
+        Args:
+            subject: The subject
+
+        Returns:
+            The subject data
+        """
+        filepaths = self._filepaths(subject)
+        missing = [str(f) for f in filepaths if not f.exists()]
+        if missing:
+            error = f"Subject {subject} is missing the files {missing}"
+            raise FileNotFoundError(error)
+        signature = tuple((f.stat().st_size, f.stat().st_mtime_ns) for f in filepaths)
+        with self._lock:
+            subject_lock = self._subject_locks[subject]
+        with subject_lock:
+            current = self._subjects.get(subject)
+            if current is not None and current.signature == signature:
+                return current
+            _logger.info(f"Loading the data of subject {subject}")
+            try:
+                data = self._load(subject, signature)
+            except Exception:
+                if current is None:
+                    raise
+                _logger.exception(
+                    f"Reloading subject {subject} failed, keeping the previous data"
+                )
+                return current
+            with self._lock:
+                self._subjects[subject] = data
+                # the travel times of the previous data can never be asked again
+                for key in [k for k in self._travel_times if k[0] == subject]:
+                    del self._travel_times[key]
+            return data
+
+    def _geocode(self, postcode: str) -> tuple[float, float]:
+        """Find the coordinates of a postcode from the in memory table
+
+        Args:
+            postcode: The postcode
+
+        Returns:
+            The latitude and longitude
+        """
+        with self._geocoder_lock:
+            if self._geocoder is None:
+                self._geocoder = pgeocode.Nominatim("GB_full")
+        location = self._geocoder.query_postal_code(postcode)
+        if pd.isna(location[COLUMN_LATITUDE]):
+            error = f"Unknown postcode {postcode}"
+            raise ValueError(error)
+        return float(location[COLUMN_LATITUDE]), float(location[COLUMN_LONGITUDE])
+
+    def travel_times(self, subject: str, student: dict[str, Any]) -> dict[str, Any]:
+        """Route a student who is not in the data to every school of a subject
+
+        Args:
+            subject: The subject
+            student: The mode of travel and either the postcode or the
+                latitude and longitude of the student
+
+        Returns:
+            The journeys and failures of every school
+        """
+        data = self.subject(subject)
+        if "postcode" in student:
+            latitude, longitude = self._geocode(student["postcode"])
+        else:
+            latitude = float(student["latitude"])
+            longitude = float(student["longitude"])
+        # the schools may have changed since the last identical request
+        key = (
+            subject,
+            data.signature,
+            round(latitude, 5),
+            round(longitude, 5),
+            student["travel"],
+        )
+        with self._lock:
+            if key in self._travel_times:
+                self._travel_times.move_to_end(key)
+                return self._travel_times[key]
+
+        journeys, failures = compute_all_pairs_journeys(
+            subject,
+            pd.DataFrame(
+                {
+                    COLUMN_STUDENT_ID: [int(student.get("id", -1))],
+                    COLUMN_LATITUDE: [latitude],
+                    COLUMN_LONGITUDE: [longitude],
+                    COLUMN_TRAVEL: [student["travel"]],
+                }
+            ),
+            data.schools,
+            n_cores=self._n_cores,
+            executor=self._executor,
+        )
+        result = {
+            "latitude": latitude,
+            "longitude": longitude,
+            "journeys": save_output_journeys(journeys, Path()).to_dict("records"),
+            "failures": save_output_failures(failures, Path()).to_dict("records"),
+        }
+        with self._lock:
+            self._travel_times[key] = result
+            while len(self._travel_times) > _MAX_TRAVEL_TIMES:
+                self._travel_times.popitem(last=False)
+        return result
+
+    def allocate(self, subject: str) -> Allocation:
+        """Solve the allocation of a subject on its current data
+
+        Args:
+            subject: The subject
+
+        Returns:
+            The allocation
+        """
+        data = self.subject(subject)
+        allocation = solve_allocation(data.cost_matrix, data.schools)
+        result = Allocation(
+            signature=data.signature,
+            matches=save_output_matches(
+                data.students, data.schools, allocation, Path()
+            ),
+        )
+        with self._lock:
+            self._allocations[subject] = result
+        return result
+
+    def allocation(self, subject: str) -> Allocation:
+        """The last allocation of a subject, solved again if the data changed
+
+        Args:
+            subject: The subject
+
+        Returns:
+            The allocation
+        """
+        signature = self.subject(subject).signature
+        with self._lock:
+            current = self._allocations.get(subject)
+        if current is not None and current.signature == signature:
+            return current
+        return self.allocate(subject)
+
+    def render_map(self, subject: str) -> str:
+        """The map of the last allocation of a subject
+
+        Args:
+            subject: The subject
+
+        Returns:
+            The HTML page of the map
+        """
+        data = self.subject(subject)
+        matches = self.allocation(subject).matches
+        return create_allocation_figure(data.schools, data.students, matches).to_html(
+            include_plotlyjs="cdn"
+        )
+
+    @property
+    def subjects(self) -> list[str]:
+        """The subjects currently in memory"""
+        with self._lock:
+            return sorted(self._subjects)
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """Answer the requests from the service of the server
+
+    * `GET /health` the subjects in memory
+    * `POST /subjects/{subject}/travel-times` route a new student, the body
+      being i.e. `{"postcode": "WC1H 0AL", "travel": "P"}`
+    * `POST /subjects/{subject}/allocation` solve the allocation again
+    * `GET /subjects/{subject}/allocation` the last allocation
+    * `GET /subjects/{subject}/map` the map of the last allocation
+    """
+
+    def _send(self, status: HTTPStatus, body: str, content_type: str) -> None:
+        """Write the response
+
+        Args:
+            status: The status code
+            body: The response body
+            content_type: The media type of the body
+        """
+        content = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _send_json(self, status: HTTPStatus, data: Any) -> None:
+        """Write a JSON response
+
+        Args:
+            status: The status code
+            data: The data to serialise
+        """
+        self._send(status, json.dumps(data, default=str), "application/json")
+
+    def _read_json(self) -> dict[str, Any]:
+        """Read the JSON body of the request
+
+        Returns:
+            The body, empty if there is none
+        """
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else {}
+
+    def _dispatch(self, method: str) -> None:
+        """Route the request to the service and report any error
+
+        Args:
+            method: The HTTP method
+        """
+        service: AllocationService = self.server.service  # type: ignore[attr-defined]
+        try:
+            if method == "GET" and self.path == "/health":
+                self._send_json(HTTPStatus.OK, {"subjects": service.subjects})
+                return
+            match = _ROUTE.match(self.path)
+            if match is None:
+                self._send_json(HTTPStatus.NOT_FOUND, {"error": self.path})
+                return
+            subject, action = match["subject"], match["action"]
+            if (method, action) == ("POST", "travel-times"):
+                self._send_json(
+                    HTTPStatus.OK, service.travel_times(subject, self._read_json())
+                )
+            elif action == "allocation":
+                allocation = (
+                    service.allocate(subject)
+                    if method == "POST"
+                    else service.allocation(subject)
+                )
+                self._send_json(
+                    HTTPStatus.OK,
+                    allocation.matches[
+                        [COLUMN_STUDENT_ID, COLUMN_ALLOCATION_SCHOOL_ID]
+                    ].to_dict("records"),
+                )
+            elif (method, action) == ("GET", "map"):
+                self._send(HTTPStatus.OK, service.render_map(subject), "text/html")
+            else:
+                self._send_json(HTTPStatus.NOT_FOUND, {"error": self.path})
+        except FileNotFoundError as e:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": str(e)})
+        except (KeyError, ValueError) as e:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+        except Exception as e:
+            _logger.exception(f"Failed to answer {method} {self.path}")
+            self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)})
+
+    def do_GET(self) -> None:  # noqa: N802
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:  # noqa: N802
+        self._dispatch("POST")
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        # the client address of a Unix socket is empty
+        _logger.debug(format, *args)
+
+
+class _UnixHTTPServer(ThreadingUnixStreamServer):
+    """An HTTP server on a Unix socket"""
+
+    daemon_threads = True
+
+
+def serve(
+    service: AllocationService,
+    *,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    socket_path: Path | None = None,
+) -> None:
+    """Answer requests until interrupted
+
+    Args:
+        service: The allocation service, entered so its processes are running
+        host (optional): The host to listen on. Defaults to 127.0.0.1.
+        port (optional): The port to listen on. Defaults to 8000.
+        socket_path (optional): Listen on this Unix socket instead of a port.
+            Defaults to None.
+    """
+    if socket_path is not None:
+        socket_path.unlink(missing_ok=True)
+        server: ThreadingHTTPServer | _UnixHTTPServer = _UnixHTTPServer(
+            str(socket_path), _RequestHandler
+        )
+        _logger.info(f"Serving on {socket_path}")
+    else:
+        server = ThreadingHTTPServer((host, port), _RequestHandler)
+        _logger.info(f"Serving on http://{host}:{port}")
+    server.service = service  # type: ignore[union-attr]
+    with server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            _logger.info("Stopping the server")
@@ -0,0 +1,125 @@
+import zlib
+from argparse import ArgumentTypeError
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+
+class Shard(NamedTuple):
+    """A disjoint slice of the student school pairs, zero indexed"""
+
+    shard_index: int
+    n_shards: int
+
+    def __str__(self) -> str:
+        return f"{self.shard_index}/{self.n_shards}"
+
+
+def parse_shard(spec: str) -> Shard:
+    """Read a shard specification of the form `i/N` with `0 <= i < N`
+
+    Args:
+        spec: The shard specification
+
+    Returns:
+        The shard
+    """
+    try:
+        shard_index, n_shards = (int(s) for s in spec.split("/"))
+    except ValueError:
+        error = f"Shard '{spec}' should be of the form i/N"
+        raise ArgumentTypeError(error) from None
+    if not 0 <= shard_index < n_shards:
+        error = f"Shard index {shard_index} should be in the range 0 to {n_shards - 1}"
+        raise ArgumentTypeError(error)
+    return Shard(shard_index, n_shards)
+
+
+def assign_shards(
+    student_ids: npt.ArrayLike, school_ids: npt.ArrayLike, n_shards: int
+) -> np.ndarray:
+    """Find the shard of each student school pair
+
+    The shard only depends on the IDs, not on the order of the data or the
+    machine, so every node agrees on the partition.
+
+    Args:
+        student_ids: The student ID of each pair
+        school_ids: The school ID of each pair
+        n_shards: The total number of shards
+
+    Returns:
+        The shard index of each pair
+    """
+    return np.array(
+        [
+            zlib.crc32(f"{student}|{school}".encode()) % n_shards
+            for student, school in zip(
+                np.ravel(student_ids), np.ravel(school_ids), strict=True
+            )
+        ],
+        dtype=int,
+    )
+
+
+def in_shard(
+    student_ids: npt.ArrayLike, school_ids: npt.ArrayLike, shard: Shard
+) -> np.ndarray:
+    """Whether each student school pair belongs to the shard
+
+    Args:
+        student_ids: The student ID of each pair
+        school_ids: The school ID of each pair
+        shard: The shard
+
+    Returns:
+        The mask of the pairs in the shard
+    """
+    return assign_shards(student_ids, school_ids, shard.n_shards) == shard.shard_index
+
+
+def shard_filepath(filepath: Path, shard: Shard) -> Path:
+    """The output file of a single shard, i.e. `x.shard-0-of-4.csv`
+
+    Args:
+        filepath: The standard output file
+        shard: The shard
+
+    Returns:
+        The output file of the shard
+    """
+    return filepath.with_suffix(
+        f".shard-{shard.shard_index}-of-{shard.n_shards}{filepath.suffix}"
+    )
+
+
+def merge_shard_outputs(filepath: Path, n_shards: int) -> pd.DataFrame:
+    """Concatenate the output files of every shard, CSV or Parquet
+
+    Args:
+        filepath: The standard output file
+        n_shards: The total number of shards
+
+    Returns:
+        The combined output of the shards
+    """
+    frames = []
+    for shard_index in range(n_shards):
+        shard = Shard(shard_index, n_shards)
+        shard_path = shard_filepath(filepath, shard)
+        if not shard_path.exists():
+            error = f"Missing output of shard {shard}: {shard_path}"
+            raise FileNotFoundError(error)
+        df = (
+            pd.read_parquet(shard_path)
+            if shard_path.suffix == ".parquet"
+            else pd.read_csv(shard_path)
+        )
+        if not in_shard(df["student"], df["school"], shard).all():
+            error = f"Output {shard_path} contains pairs outside of shard {shard}"
+            raise ValueError(error)
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,166 @@
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from ioe.constants import COLUMN_LATITUDE, COLUMN_LONGITUDE, EARTH_RADIUS_KM
+
+
+def haversine_distances(
+    latitude_1: npt.ArrayLike,
+    longitude_1: npt.ArrayLike,
+    latitude_2: npt.ArrayLike,
+    longitude_2: npt.ArrayLike,
+) -> np.ndarray:
+    """Great-circle distance between coordinates, broadcasting like numpy
+
+    Args:
+        latitude_1: The latitudes of the first points in degrees
+        longitude_1: The longitudes of the first points in degrees
+        latitude_2: The latitudes of the second points in degrees
+        longitude_2: The longitudes of the second points in degrees
+
+    Returns:
+        The distances in kilometres
+    """
+    phi_1, lambda_1, phi_2, lambda_2 = (
+        np.radians(np.asarray(c, dtype=float))
+        for c in (latitude_1, longitude_1, latitude_2, longitude_2)
+    )
+    a = (
+        np.sin((phi_2 - phi_1) / 2) ** 2
+        + np.cos(phi_1) * np.cos(phi_2) * np.sin((lambda_2 - lambda_1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def pairwise_distances(origins: pd.DataFrame, destinations: pd.DataFrame) -> np.ndarray:
+    """The straight-line distance between every origin and destination
+
+    Args:
+        origins: Data with latitude and longitude columns, i.e. students
+        destinations: Data with latitude and longitude columns, i.e. schools
+
+    Returns:
+        The origins by destinations matrix of distances in kilometres
+    """
+    return haversine_distances(
+        origins[COLUMN_LATITUDE].to_numpy(dtype=float)[:, np.newaxis],
+        origins[COLUMN_LONGITUDE].to_numpy(dtype=float)[:, np.newaxis],
+        destinations[COLUMN_LATITUDE].to_numpy(dtype=float)[np.newaxis, :],
+        destinations[COLUMN_LONGITUDE].to_numpy(dtype=float)[np.newaxis, :],
+    )
+
+
+def _unit_vectors(latitudes: npt.ArrayLike, longitudes: npt.ArrayLike) -> np.ndarray:
+    """The points on the unit sphere, so chord lengths order like distances
+
+    Args:
+        latitudes: The latitudes in degrees
+        longitudes: The longitudes in degrees
+
+    Returns:
+        The n by 3 cartesian coordinates
+    """
+    phi = np.radians(np.asarray(latitudes, dtype=float))
+    lam = np.radians(np.asarray(longitudes, dtype=float))
+    return np.column_stack(
+        (np.cos(phi) * np.cos(lam), np.cos(phi) * np.sin(lam), np.sin(phi))
+    )
+
+
+def build_point_index(latitudes: npt.ArrayLike, longitudes: npt.ArrayLike) -> cKDTree:
+    """Build a spatial index over points for nearest neighbour queries
+
+    Args:
+        latitudes: The latitudes of the points in degrees
+        longitudes: The longitudes of the points in degrees
+
+    Returns:
+        The k-d tree of the points on the unit sphere
+    """
+    return cKDTree(_unit_vectors(latitudes, longitudes))
+
+
+def nearest_points(
+    index: cKDTree, latitudes: npt.ArrayLike, longitudes: npt.ArrayLike
+) -> tuple[np.ndarray, np.ndarray]:
+    """Find the nearest indexed point to each query point
+
+    Args:
+        index: The output of `build_point_index`
+        latitudes: The latitudes of the query points in degrees
+        longitudes: The longitudes of the query points in degrees
+
+    Returns:
+        The great-circle distance in kilometres and the position of the
+        nearest indexed point
+    """
+    chords, positions = index.query(_unit_vectors(latitudes, longitudes))
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(chords / 2, 1)), positions
+
+
+def _points_in_ring(
+    longitudes: np.ndarray, latitudes: np.ndarray, ring: np.ndarray
+) -> np.ndarray:
+    """Ray casting test of every point against every edge of a ring at once
+
+    Args:
+        longitudes: The longitudes of the points
+        latitudes: The latitudes of the points
+        ring: The longitude, latitude vertices of the ring
+
+    Returns:
+        Whether each point crosses an odd number of edges
+    """
+    x_1, y_1 = ring[:, 0], ring[:, 1]
+    x_2, y_2 = np.roll(x_1, -1), np.roll(y_1, -1)
+    y = latitudes[:, np.newaxis]
+    straddles = (y_1 > y) != (y_2 > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_crossing = x_1 + (y - y_1) * (x_2 - x_1) / (y_2 - y_1)
+    crossings = straddles & (longitudes[:, np.newaxis] < x_crossing)
+    return crossings.sum(axis=1) % 2 == 1
+
+
+def points_in_geometry(
+    longitudes: npt.ArrayLike, latitudes: npt.ArrayLike, geometry: dict
+) -> np.ndarray:
+    """Whether each point lies within a GeoJSON polygon or multipolygon
+
+    Holes are handled by the even-odd rule over all the rings of a polygon.
+
+    Args:
+        longitudes: The longitudes of the points in degrees
+        latitudes: The latitudes of the points in degrees
+        geometry: The GeoJSON geometry
+
+    Returns:
+        The mask of the points inside
+    """
+    longitudes = np.asarray(longitudes, dtype=float)
+    latitudes = np.asarray(latitudes, dtype=float)
+    polygons = (
+        geometry["coordinates"]
+        if geometry["type"] == "MultiPolygon"
+        else [geometry["coordinates"]]
+    )
+    inside = np.zeros(len(longitudes), dtype=bool)
+    for rings in polygons:
+        exterior = np.asarray(rings[0], dtype=float)
+        # only test the points within the bounding box
+        candidates = np.flatnonzero(
+            (longitudes >= exterior[:, 0].min())
+            & (longitudes <= exterior[:, 0].max())
+            & (latitudes >= exterior[:, 1].min())
+            & (latitudes <= exterior[:, 1].max())
+        )
+        in_polygon = np.zeros(len(candidates), dtype=bool)
+        for ring in rings:
+            in_polygon ^= _points_in_ring(
+                longitudes[candidates],
+                latitudes[candidates],
+                np.asarray(ring, dtype=float),
+            )
+        inside[candidates[in_polygon]] = True
+    return inside
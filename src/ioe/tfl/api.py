@@ -6,6 +6,8 @@ from requests_ratelimiter import LimiterAdapter
 from ioe.constants import (
     COLUMN_LATITUDE,
     COLUMN_LONGITUDE,
+    COLUMN_TFL_LATITUDE,
+    COLUMN_TFL_LONGITUDE,
     MAX_REQUESTS_PER_MINUTE,
     TFL_API_PREFIX,
 )
@@ -18,6 +20,23 @@ _adapter = LimiterAdapter(
 _session.mount(TFL_API_PREFIX, _adapter)
 
 
+def _coordinates(location: pd.Series | dict[str, str | int]) -> str:
+    """The coordinates to send to TfL, the snapped ones if there are any
+
+    Args:
+        location: An individual student or school data
+
+    Returns:
+        The `lat,lon` of the location
+    """
+    columns = (
+        [COLUMN_TFL_LATITUDE, COLUMN_TFL_LONGITUDE]
+        if COLUMN_TFL_LATITUDE in location
+        else [COLUMN_LATITUDE, COLUMN_LONGITUDE]
+    )
+    return ",".join(f"{location[c]}" for c in columns)
+
+
 def get_request_response(
     student: pd.Series,
     school: dict[str, str | int],
@@ -31,12 +50,8 @@ def get_request_response(
     Returns:
         The API response
     """
-    student_coord = ",".join(student[[COLUMN_LATITUDE, COLUMN_LONGITUDE]].astype(str))
-    school_coord = ",".join(
-        [f"{school[s]}" for s in [COLUMN_LATITUDE, COLUMN_LONGITUDE]]
-    )
     connection_string = create_connection_string(
-        student_coord,
-        school_coord,
+        _coordinates(student),
+        _coordinates(school),
     )
     return _session.get(connection_string)
@@ -1,10 +1,18 @@
 import logging
+from http import HTTPStatus
 
 import pandas as pd
-import requests
 from requests import Response
 
-from ioe.constants import COLUMN_SCHOOL_ID, COLUMN_STUDENT_ID
+from ioe.constants import (
+    BACKEND_TFL,
+    COLUMN_SCHOOL_ID,
+    COLUMN_STUDENT_ID,
+    COLUMN_TFL_ACCESS_MINUTES,
+    COLUMN_TFL_LATITUDE,
+)
+from ioe.data.alternatives import AlternativesStore
+from ioe.logs import pair_extra
 from ioe.tfl.api import get_request_response
 
 _logger = logging.getLogger(__name__)
@@ -27,11 +35,14 @@ def _create_journey_instructions(journey: dict) -> tuple[int, str]:
     return duration, message
 
 
-def _create_journey(
+def _create_journey(  # noqa: PLR0913
     subject: str,
     student: pd.Series,
     school: dict,
     response: Response,
+    *,
+    alternatives: AlternativesStore | None = None,
+    keep_message: bool = True,
 ) -> tuple[int, str, int, str]:
     """Create final journey with the shortest leg for the student, school pair
 
@@ -40,6 +51,10 @@ def _create_journey(
         student: Individual student data
         school: Individual school data
         response: The TfL API response
+        alternatives (optional): Store every journey and its legs here.
+            Defaults to None.
+        keep_message (optional): Whether to describe the route, otherwise the
+            message is empty. Defaults to True.
 
     Returns:
         The student, school, duration, and output message
@@ -47,14 +62,42 @@ def _create_journey(
     # find the number of journeys
     found_journeys = response.json()["journeys"]
     _logger.info(
-        f"Number of valid TfL journeys found: {len(found_journeys)} for "
-        f"student: {student[COLUMN_STUDENT_ID]} -> school: "
-        f"{school[COLUMN_SCHOOL_ID]}, subject {subject}"
+        "Number of valid TfL journeys found: %d for student: %s -> school: %s, "
+        "subject %s",
+        len(found_journeys),
+        student[COLUMN_STUDENT_ID],
+        school[COLUMN_SCHOOL_ID],
+        subject,
+        extra=pair_extra(
+            subject,
+            student[COLUMN_STUDENT_ID],
+            school[COLUMN_SCHOOL_ID],
+            backend=BACKEND_TFL,
+            elapsed=response.elapsed.total_seconds(),
+        ),
     )
 
+    # the walks onto the stops the coordinates were snapped to
+    access_minutes = (
+        round(student.get(COLUMN_TFL_ACCESS_MINUTES, 0)),
+        round(school.get(COLUMN_TFL_ACCESS_MINUTES, 0)),
+    )
+    if alternatives is not None:
+        alternatives.add_tfl_journeys(
+            student[COLUMN_STUDENT_ID],
+            school[COLUMN_SCHOOL_ID],
+            found_journeys,
+            access_minutes=access_minutes,
+        )
+
     # shortest journey
     shortest_journey = min(found_journeys, key=lambda j: j["duration"])
-    duration, message = _create_journey_instructions(shortest_journey)
+    duration, message = (
+        _create_journey_instructions(shortest_journey)
+        if keep_message
+        else (shortest_journey["duration"], "")
+    )
+    duration += sum(access_minutes)
 
     # prepare the final output
     return student[COLUMN_STUDENT_ID], school[COLUMN_SCHOOL_ID], duration, message
@@ -80,14 +123,45 @@ def _create_failure(
     code = response.status_code
     reason = response.reason
     _logger.error(
-        f"Status code: {code} for student: {student[COLUMN_STUDENT_ID]} "
-        f"-> school: {school[COLUMN_SCHOOL_ID]}, subject: {subject}"
+        "Status code: %d for student: %s -> school: %s, subject: %s",
+        code,
+        student[COLUMN_STUDENT_ID],
+        school[COLUMN_SCHOOL_ID],
+        subject,
+        extra=pair_extra(
+            subject,
+            student[COLUMN_STUDENT_ID],
+            school[COLUMN_SCHOOL_ID],
+            backend=BACKEND_TFL,
+            elapsed=response.elapsed.total_seconds(),
+        ),
     )
     return student[COLUMN_STUDENT_ID], school[COLUMN_SCHOOL_ID], code, reason
 
 
+def _find_unroutable(student: pd.Series, school: dict) -> str | None:
+    """Find why the pair cannot be routed, from the stops checked beforehand
+
+    Args:
+        student: Individual student data
+        school: Individual school data
+
+    Returns:
+        The reason the pair cannot be routed, or None if it can
+    """
+    for name, location in (("student", student), ("school", school)):
+        if COLUMN_TFL_LATITUDE in location and pd.isna(location[COLUMN_TFL_LATITUDE]):
+            return f"No stop near the {name}"
+    return None
+
+
 def create_tfl_routes(
-    subject: str, student: pd.DataFrame, school: dict[str, str | int]
+    subject: str,
+    student: pd.DataFrame,
+    school: dict[str, str | int],
+    *,
+    alternatives: AlternativesStore | None = None,
+    keep_message: bool = True,
 ) -> tuple[int, tuple[int, str, int, str]]:
     """Method to be executed by each process filling the same dictionary
 
@@ -95,11 +169,40 @@ def create_tfl_routes(
         subject: School subject
         student: Individual student data
         school: Individual school data
+        alternatives (optional): Store every journey and its legs here.
+            Defaults to None.
+        keep_message (optional): Whether to describe the route. Defaults to True.
 
     Returns:
         Response code, and the journey/failure
     """
+    reason = _find_unroutable(student, school)
+    if reason is not None:
+        _logger.warning(
+            "%s for student: %s -> school: %s, subject: %s",
+            reason,
+            student[COLUMN_STUDENT_ID],
+            school[COLUMN_SCHOOL_ID],
+            subject,
+            extra=pair_extra(
+                subject, student[COLUMN_STUDENT_ID], school[COLUMN_SCHOOL_ID]
+            ),
+        )
+        return HTTPStatus.NOT_FOUND, (
+            student[COLUMN_STUDENT_ID],
+            str(school[COLUMN_SCHOOL_ID]),
+            HTTPStatus.NOT_FOUND,
+            reason,
+        )
+
     response = get_request_response(student, school)
-    if response.status_code != requests.codes.OK:
+    if response.status_code != HTTPStatus.OK:
         return response.status_code, _create_failure(subject, student, school, response)
-    return response.status_code, _create_journey(subject, student, school, response)
+    return response.status_code, _create_journey(
+        subject,
+        student,
+        school,
+        response,
+        alternatives=alternatives,
+        keep_message=keep_message,
+    )
@@ -0,0 +1,93 @@
+import logging
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from ioe.constants import (
+    ACCESS_SPEEDS_KMH,
+    COLUMN_LATITUDE,
+    COLUMN_LONGITUDE,
+    COLUMN_STOP_LATITUDE,
+    COLUMN_STOP_LONGITUDE,
+    COLUMN_STOP_STATUS,
+    COLUMN_TFL_ACCESS_MINUTES,
+    COLUMN_TFL_LATITUDE,
+    COLUMN_TFL_LONGITUDE,
+    MINUTES,
+    TFL_SNAP_RADIUS_KM,
+    TFL_STOP_RADIUS_KM,
+    VALUE_INACTIVE,
+)
+from ioe.data.data_input import SCHEMA_STOPS, read_data
+from ioe.spatial import build_point_index, nearest_points
+
+_logger = logging.getLogger(__name__)
+
+
+def read_stops(filepath: Path) -> pd.DataFrame:
+    """Read the active stops of a NaPTAN style CSV
+
+    Args:
+        filepath: The stops file, with ATCOCode, Latitude and Longitude columns
+
+    Returns:
+        The stops which are not marked inactive
+    """
+    stops = read_data(filepath, schema=SCHEMA_STOPS)
+    if COLUMN_STOP_STATUS in stops.columns:
+        stops = stops[stops[COLUMN_STOP_STATUS].str.lower() != VALUE_INACTIVE]
+    return stops.dropna(subset=[COLUMN_STOP_LATITUDE, COLUMN_STOP_LONGITUDE])
+
+
+def snap_to_stops(
+    locations: pd.DataFrame,
+    stops: pd.DataFrame,
+    *,
+    stop_radius_km: float = TFL_STOP_RADIUS_KM,
+    snap_radius_km: float = TFL_SNAP_RADIUS_KM,
+) -> pd.DataFrame:
+    """Find the coordinates to send to TfL for each location
+
+    A location with a stop within the stop radius is sent as it is. One
+    further away is moved onto its nearest stop within the snap radius, the
+    walk to it being added to the journey time, and one with no stop within
+    the snap radius cannot be routed so has no coordinates.
+
+    Args:
+        locations: The students or schools dataframe
+        stops: The stops dataframe
+        stop_radius_km (optional): The distance within which a location is
+            sent unchanged. Defaults to TFL_STOP_RADIUS_KM.
+        snap_radius_km (optional): The distance within which a location is
+            moved onto its nearest stop. Defaults to TFL_SNAP_RADIUS_KM.
+
+    Returns:
+        The locations with their TfL coordinates and access minutes
+    """
+    coordinates = locations[[COLUMN_LATITUDE, COLUMN_LONGITUDE]].to_numpy(dtype=float)
+    unique, inverse = np.unique(coordinates, axis=0, return_inverse=True)
+    distances, nearest = nearest_points(
+        build_point_index(stops[COLUMN_STOP_LATITUDE], stops[COLUMN_STOP_LONGITUDE]),
+        unique[:, 0],
+        unique[:, 1],
+    )
+    snapped = (distances > stop_radius_km) & (distances <= snap_radius_km)
+    unroutable = distances > snap_radius_km
+    stop_coordinates = stops[[COLUMN_STOP_LATITUDE, COLUMN_STOP_LONGITUDE]].to_numpy(
+        dtype=float
+    )[nearest]
+    tfl_coordinates = np.where(snapped[:, np.newaxis], stop_coordinates, unique)
+    tfl_coordinates[unroutable] = np.nan
+    _logger.info(
+        f"Of {len(unique)} unique locations, {snapped.sum()} snapped to a stop "
+        f"and {unroutable.sum()} further than {snap_radius_km} km from any stop"
+    )
+
+    locations = locations.copy()
+    locations[COLUMN_TFL_LATITUDE] = tfl_coordinates[inverse.ravel(), 0]
+    locations[COLUMN_TFL_LONGITUDE] = tfl_coordinates[inverse.ravel(), 1]
+    locations[COLUMN_TFL_ACCESS_MINUTES] = np.where(
+        snapped, distances / ACCESS_SPEEDS_KMH["P"] * MINUTES, 0.0
+    )[inverse.ravel()]
+    return locations
@@ -0,0 +1,125 @@
+import math
+import os
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# the constants refuse to import without credentials, which the fakes never use
+os.environ.setdefault("TFL_APP_KEY", "test")
+os.environ.setdefault("OPENROUTESERVICE_BASE_URL", "http://localhost:8080/ors")
+
+from ioe.constants import (  # noqa: E402
+    COLUMN_LATITUDE,
+    COLUMN_LONGITUDE,
+    COLUMN_SCHOOL_ID,
+    COLUMN_STUDENT_ID,
+    COLUMN_TRAVEL,
+    MINUTES,
+    OPTIMISTIC_SPEEDS_KMH,
+)
+from ioe.data.alternatives import AlternativesStore  # noqa: E402
+from ioe.data.data_input import SCHEMA_SCHOOLS, SCHEMA_STUDENTS, read_data  # noqa: E402
+from ioe.spatial import haversine_distances  # noqa: E402
+
+_data_location = Path(__file__).resolve().parents[1] / "data"
+
+FAILED_STUDENT = 4
+FAILED_SCHOOL = "IOE00045"
+
+
+def fake_time(student: pd.Series, school: dict) -> int:
+    """A deterministic journey time slower than the optimistic speed
+
+    Args:
+        student: Individual student data
+        school: Individual school data
+
+    Returns:
+        The journey time in minutes
+    """
+    distance = haversine_distances(
+        student[COLUMN_LATITUDE],
+        student[COLUMN_LONGITUDE],
+        school[COLUMN_LATITUDE],
+        school[COLUMN_LONGITUDE],
+    )
+    bound = distance * MINUTES / OPTIMISTIC_SPEEDS_KMH[student[COLUMN_TRAVEL]]
+    noise = (
+        int(student[COLUMN_STUDENT_ID]) * 7 + int(school[COLUMN_SCHOOL_ID][3:])
+    ) % 9
+    return math.ceil(1.5 * bound) + noise
+
+
+def fake_journeys(time: int) -> list[dict]:
+    """The journeys of a TfL response, a bus taking `time` and a slower walk
+
+    Args:
+        time: The minutes of the quickest journey
+
+    Returns:
+        The journeys with their legs
+    """
+    return [
+        {
+            "duration": time,
+            "legs": [
+                {"mode": {"id": "walking"}, "duration": 2},
+                {
+                    "mode": {"id": "bus"},
+                    "duration": time - 2,
+                    "routeOptions": [{"name": "N1"}],
+                },
+            ],
+        },
+        {
+            "duration": time + 5,
+            "legs": [{"mode": {"id": "walking"}, "duration": time + 5}],
+        },
+    ]
+
+
+def fake_routes(
+    subject: str,
+    student: pd.Series,
+    school: dict,
+    *,
+    alternatives: AlternativesStore | None = None,
+    keep_message: bool = True,
+) -> tuple[int, tuple[int, str, int, str]]:
+    """Stand in for `create_tfl_routes` and `create_ors_routes`
+
+    One pair always fails, every other takes `fake_time` by `fake_journeys`.
+    """
+    student_id, school_id = int(student[COLUMN_STUDENT_ID]), school[COLUMN_SCHOOL_ID]
+    if (student_id, school_id) == (FAILED_STUDENT, FAILED_SCHOOL):
+        return 404, (student_id, school_id, 404, "Not Found")
+    time = fake_time(student, school)
+    if alternatives is not None:
+        alternatives.add_tfl_journeys(student_id, school_id, fake_journeys(time))
+    return 200, (student_id, school_id, time, f"{time} min" if keep_message else "")
+
+
+@pytest.fixture()
+def students() -> pd.DataFrame:
+    return read_data(
+        _data_location / "example_subject_students.csv",
+        schema=SCHEMA_STUDENTS,
+        cache=False,
+    )
+
+
+@pytest.fixture()
+def schools() -> pd.DataFrame:
+    return read_data(
+        _data_location / "example_subject_schools.csv",
+        schema=SCHEMA_SCHOOLS,
+        cache=False,
+    )
+
+
+@pytest.fixture()
+def routes(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Route every pair with `fake_routes`, in the forked workers too"""
+    monkeypatch.setattr("ioe.main.create_tfl_routes", fake_routes)
+    monkeypatch.setattr("ioe.main.create_ors_routes", fake_routes)
@@ -0,0 +1,84 @@
+import pickle
+from datetime import timedelta
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from ioe.data.accumulator import PairAccumulator
+from ioe.data.data_input import SCHEMA_JOURNEYS, read_data
+from ioe.data.data_output import save_output_journeys
+from ioe.tfl import journeys
+
+_RECORDS = [
+    (2, "IOE00044", 35, "Walk THEN Bus"),
+    (4, "IOE00043", 12, "Walk"),
+    (2, "IOE00043", 20, "Walk"),
+]
+
+
+def _accumulator(records: list, *, keep_text: bool = True) -> PairAccumulator:
+    accumulator = PairAccumulator(keep_text=keep_text)
+    for record in records:
+        accumulator.append(*record)
+    return accumulator
+
+
+@pytest.mark.parametrize("keep_text", [True, False])
+def test_pickle_round_trip(keep_text: bool) -> None:  # noqa: FBT001
+    accumulator = _accumulator(_RECORDS, keep_text=keep_text)
+    restored = pickle.loads(pickle.dumps(accumulator))  # noqa: S301
+    assert list(restored) == list(accumulator)
+    assert restored.keep_text == keep_text
+
+
+def test_extend_remaps_the_strings() -> None:
+    accumulator = _accumulator(_RECORDS[:1])
+    accumulator.extend(_accumulator(_RECORDS[1:]))
+    assert list(accumulator) == _RECORDS
+
+
+@pytest.mark.parametrize("keep_text", [True, False])
+def test_extend_without_texts(keep_text: bool) -> None:  # noqa: FBT001
+    accumulator = _accumulator(_RECORDS[:1], keep_text=keep_text)
+    accumulator.extend(_accumulator(_RECORDS[1:], keep_text=False))
+    accumulator.extend(_accumulator(_RECORDS[2:]))
+    texts = ["Walk THEN Bus", "", "", "Walk"] if keep_text else [None] * 4
+    assert [r[3] for r in accumulator] == texts
+    frame = accumulator.to_frame(["student", "school", "time", "message"])
+    assert frame["time"].tolist() == [35, 12, 20, 20]
+
+
+def test_journeys_without_messages_match_the_schema(tmp_path: Path) -> None:
+    filepath = tmp_path / "journeys.csv"
+    save_output_journeys(
+        _accumulator(_RECORDS, keep_text=False), filepath, save_output=True
+    )
+    df = read_data(filepath, schema=SCHEMA_JOURNEYS, cache=False)
+    assert list(df.columns) == list(SCHEMA_JOURNEYS)
+    assert df["message"].isna().all()
+    assert df["time"].tolist() == [20, 35, 12]
+
+
+class _Response:
+    """The parts of a TfL response read by `_create_journey`"""
+
+    elapsed = timedelta(seconds=1)
+
+    def json(self) -> dict:
+        return {"journeys": [{"duration": 25, "legs": []}]}
+
+
+def test_messages_are_not_built_when_not_kept(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    def fail(journey: dict) -> tuple[int, str]:
+        raise AssertionError
+
+    monkeypatch.setattr(journeys, "_create_journey_instructions", fail)
+    student = pd.Series({"ST: ID": 2})
+    school = {"SE2 PP: Code": "IOE00043"}
+    response = _Response()
+    assert journeys._create_journey(
+        "test", student, school, response, keep_message=False  # type: ignore[arg-type]
+    ) == (2, "IOE00043", 25, "")
@@ -0,0 +1,48 @@
+import pickle
+
+import pandas as pd
+from conftest import fake_journeys
+
+from ioe.data.alternatives import AlternativesStore, constrained_journeys
+
+
+def _store(pairs: list[tuple[int, str, int]]) -> AlternativesStore:
+    store = AlternativesStore()
+    for student, school, time in pairs:
+        store.add_tfl_journeys(student, school, fake_journeys(time))
+    return store
+
+
+def test_pickle_round_trip() -> None:
+    store = _store([(2, "IOE00043", 20), (4, "IOE00044", 30)])
+    restored = pickle.loads(pickle.dumps(store))  # noqa: S301
+    assert len(restored) == len(store)
+    pd.testing.assert_frame_equal(restored.to_frame(), store.to_frame())
+
+
+def _sorted(store: AlternativesStore) -> pd.DataFrame:
+    return (
+        store.to_frame()
+        .astype({"school": str})
+        .sort_values(["student", "school", "rank"], kind="stable", ignore_index=True)
+    )
+
+
+def test_ranks_do_not_depend_on_the_merge_order() -> None:
+    first = _store([(2, "IOE00043", 20)])
+    first.extend(_store([(4, "IOE00044", 30)]))
+    second = _store([(4, "IOE00044", 30)])
+    second.extend(_store([(2, "IOE00043", 20)]))
+    pd.testing.assert_frame_equal(_sorted(first), _sorted(second))
+    assert _sorted(first)["rank"].tolist() == [0, 0, 1, 0, 0, 1]
+
+
+def test_constrained_journeys() -> None:
+    alternatives = _store([(2, "IOE00043", 20), (4, "IOE00044", 30)]).to_frame()
+    quickest = constrained_journeys(alternatives)
+    assert quickest["time"].tolist() == [20, 30]
+    no_bus = constrained_journeys(alternatives, excluded_modes=["bus"])
+    assert no_bus["time"].tolist() == [25, 35]
+    assert constrained_journeys(
+        alternatives, excluded_modes=["bus"], max_walking_minutes=30
+    )["student"].tolist() == [2]
@@ -0,0 +1,88 @@
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ioe.clustering import cluster_students, compute_approximate_journeys
+from ioe.constants import COLUMN_TRAVEL
+from ioe.main import compute_all_pairs_journeys
+from ioe.scripts import tfl
+from ioe.spatial import haversine_distances
+
+
+def test_clusters_are_within_the_radius(students: pd.DataFrame) -> None:
+    labels, representatives = cluster_students(students, radius_km=5)
+    rows = representatives[labels]
+    assert (students[COLUMN_TRAVEL].to_numpy()[rows] == students[COLUMN_TRAVEL]).all()
+    distances = haversine_distances(
+        students["latitude"],
+        students["longitude"],
+        students["latitude"].to_numpy()[rows],
+        students["longitude"].to_numpy()[rows],
+    )
+    assert (distances <= 5).all()
+    assert (labels[representatives] == np.arange(len(representatives))).all()
+
+
+@pytest.mark.usefixtures("routes")
+@pytest.mark.parametrize("radius_km", [3, 5])
+def test_correction_does_not_increase_the_error(
+    students: pd.DataFrame, schools: pd.DataFrame, radius_km: float
+) -> None:
+    journeys, failures, validation = compute_approximate_journeys(
+        "test", students, schools, radius_km=radius_km, n_validation=500, seed=0
+    )
+    assert validation is not None
+    # the correction is scored out of sample, but the fake times grow with
+    # the distance, so it still helps up to rounding
+    assert (
+        validation.corrected.mean_absolute <= validation.uncorrected.mean_absolute + 0.5
+    )
+    assert len(journeys) + len(failures) == len(students) * len(schools)
+
+
+def test_duplicated_students_are_rejected(
+    students: pd.DataFrame, schools: pd.DataFrame
+) -> None:
+    students = pd.concat([students, students.head(1)])
+    with pytest.raises(ValueError, match="more than once"):
+        compute_approximate_journeys(
+            "test", students, schools, radius_km=3, n_validation=0
+        )
+
+
+@pytest.mark.usefixtures("routes")
+def test_validation_pairs_keep_their_exact_journeys(
+    students: pd.DataFrame, schools: pd.DataFrame
+) -> None:
+    # every approximated pair is sampled, so every pair is exact
+    journeys, failures, _ = compute_approximate_journeys(
+        "test", students, schools, radius_km=5, n_validation=10**6, seed=0
+    )
+    expected_journeys, expected_failures = compute_all_pairs_journeys(
+        "test", students, schools
+    )
+    assert sorted(journeys) == sorted(expected_journeys)
+    assert sorted(failures) == sorted(expected_failures)
+
+
+@pytest.mark.usefixtures("routes")
+def test_approximate_outputs_are_kept_apart(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    data_location = Path(__file__).resolve().parents[1] / "data"
+    for name in ("students", "schools"):
+        shutil.copy(data_location / f"example_subject_{name}.csv", tmp_path)
+    monkeypatch.setattr(tfl, "_data_location", tmp_path)
+    monkeypatch.setattr(
+        sys, "argv", ["tfl", "example_subject", "--cluster-radius", "5"]
+    )
+    tfl.main()
+    assert not (tmp_path / "example_subject_student_school_journeys.csv").exists()
+    journeys = pd.read_csv(
+        tmp_path / "example_subject_student_school_approximate_journeys.csv"
+    )
+    assert len(journeys) > 0
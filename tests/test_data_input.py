@@ -0,0 +1,81 @@
+import os
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from ioe.data.data_input import SCHEMA_JOURNEYS, SCHEMA_STUDENTS, read_data
+
+_JOURNEYS = pd.DataFrame(
+    {
+        "student": [2, 4],
+        "school": ["IOE00043", "IOE00044"],
+        "time": [20, 35],
+        "message": ["Walk", "Walk THEN Bus"],
+    }
+)
+
+
+@pytest.fixture()
+def filepath(tmp_path: Path) -> Path:
+    filepath = tmp_path / "journeys.csv"
+    _JOURNEYS.to_csv(filepath, index=False)
+    return filepath
+
+
+def _caches(filepath: Path) -> list[str]:
+    return sorted(p.name for p in (filepath.parent / ".cache").iterdir())
+
+
+def test_read_applies_the_schema(filepath: Path) -> None:
+    # without the cache, then writing it, then from it
+    for cache in (False, True, True):
+        data = read_data(filepath, schema=SCHEMA_JOURNEYS, cache=cache)
+        assert data.dtypes.astype(str).to_dict() == SCHEMA_JOURNEYS
+        pd.testing.assert_frame_equal(
+            data.astype(str), _JOURNEYS.astype(str), check_dtype=False
+        )
+
+
+def test_only_the_requested_columns_are_required(tmp_path: Path) -> None:
+    filepath = tmp_path / "pairs.csv"
+    _JOURNEYS[["student", "school"]].to_csv(filepath, index=False)
+    for cache in (False, True, True):
+        data = read_data(
+            filepath, schema=SCHEMA_JOURNEYS, usecols=["student", "school"], cache=cache
+        )
+        assert data["student"].tolist() == [2, 4]
+    with pytest.raises(ValueError, match="time"):
+        read_data(filepath, schema=SCHEMA_JOURNEYS)
+    with pytest.raises(ValueError, match="time"):
+        read_data(filepath, schema=SCHEMA_JOURNEYS, usecols=["student", "time"])
+
+
+def test_schemas_keep_their_own_cache(filepath: Path) -> None:
+    read_data(filepath, schema=SCHEMA_JOURNEYS)
+    read_data(filepath)
+    assert len(_caches(filepath)) == 2
+    # a read with the other schema does not evict the first
+    read_data(filepath, schema=SCHEMA_JOURNEYS)
+    assert len(_caches(filepath)) == 2
+
+
+def test_stale_caches_are_evicted(filepath: Path) -> None:
+    read_data(filepath, schema=SCHEMA_JOURNEYS)
+    read_data(filepath)
+    first = _caches(filepath)
+
+    pd.concat([_JOURNEYS, _JOURNEYS]).to_csv(filepath, index=False)
+    stat = filepath.stat()
+    os.utime(filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert len(read_data(filepath, schema=SCHEMA_JOURNEYS)) == 4
+    caches = _caches(filepath)
+    # only the entry of the same schema was replaced, and no temporary is left
+    assert len(caches) == 2
+    assert len(set(caches) - set(first)) == 1
+    assert all(c.endswith(".parquet") for c in caches)
+
+
+def test_missing_schema_columns_are_reported(filepath: Path) -> None:
+    with pytest.raises(ValueError, match="ST: ID"):
+        read_data(filepath, schema=SCHEMA_STUDENTS)
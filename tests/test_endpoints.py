@@ -0,0 +1,132 @@
+import multiprocessing
+import time
+from typing import Any
+
+import pytest
+import requests
+
+from ioe.ors import endpoints
+from ioe.ors.endpoints import EndpointPool
+
+
+class _Client:
+    """Stands in for `openrouteservice.Client`, failing if unreachable"""
+
+    def __init__(self, name: str, *, reachable: bool = True) -> None:
+        self.name = name
+        self.reachable = reachable
+
+    def directions(self) -> dict[str, Any]:
+        if not self.reachable:
+            raise requests.exceptions.ConnectionError
+        return {"endpoint": self.name}
+
+
+class _HealthResponse:
+    def __init__(self, status: str) -> None:
+        self.status = status
+
+    def json(self) -> dict[str, str]:
+        return {"status": self.status}
+
+
+def _pool(*clients: _Client, max_concurrency: int = 2) -> EndpointPool:
+    return EndpointPool(
+        list(clients),  # type: ignore[arg-type]
+        health_urls=[f"http://{c.name}/ors/v2/health" for c in clients],
+        max_concurrency=max_concurrency,
+    )
+
+
+def _directions(client: Any) -> dict[str, Any]:
+    return client.directions()
+
+
+def test_least_outstanding_endpoint_is_used() -> None:
+    pool = _pool(_Client("a"), _Client("b"), _Client("c"))
+    pool.state.outstanding[:] = [2, 0, 1]
+    assert pool.request(_directions) == {"endpoint": "b"}
+    # the slot is given back once the request is done
+    assert pool.state.outstanding[:] == [2, 0, 1]
+
+
+def test_slots_limit_the_concurrency() -> None:
+    pool = _pool(_Client("a"), max_concurrency=1)
+
+    def check_slot(client: Any) -> dict[str, Any]:
+        assert pool.state.outstanding[0] == 1
+        assert not pool.state.slots[0].acquire(block=False)
+        return client.directions()
+
+    pool.request(check_slot)
+    assert pool.state.slots[0].acquire(block=False)
+
+
+def test_load_is_shared_with_the_workers() -> None:
+    pool = _pool(_Client("a"), _Client("b"))
+    context = multiprocessing.get_context("fork")
+    started, finish = context.Event(), context.Event()
+
+    def hold(client: Any) -> dict[str, Any]:
+        started.set()
+        finish.wait(10)
+        return client.directions()
+
+    process = context.Process(target=pool.request, args=(hold,))
+    process.start()
+    try:
+        assert started.wait(10)
+        # the parent sees the request of the worker, so avoids its endpoint
+        assert sum(pool.state.outstanding[:]) == 1
+        busy = pool.state.outstanding[:].index(1)
+        assert pool.request(_directions) == {"endpoint": "ab"[1 - busy]}
+    finally:
+        finish.set()
+        process.join()
+    assert pool.state.outstanding[:] == [0, 0]
+
+
+def test_requests_fail_over() -> None:
+    pool = _pool(_Client("a", reachable=False), _Client("b"))
+    pool.state.outstanding[:] = [0, 1]
+    assert pool.request(_directions) == {"endpoint": "b"}
+    assert pool.state.unhealthy_until[0] > time.time()
+    assert pool.state.unhealthy_until[1] == 0
+    assert pool.state.outstanding[:] == [0, 1]
+
+
+def test_unreachable_endpoints_raise() -> None:
+    pool = _pool(_Client("a", reachable=False), _Client("b", reachable=False))
+    with pytest.raises(ConnectionError, match="unreachable"):
+        pool.request(_directions)
+    assert all(t > time.time() for t in pool.state.unhealthy_until[:])
+    assert pool.state.outstanding[:] == [0, 0]
+
+
+@pytest.mark.parametrize("status", ["ready", "not ready"])
+def test_endpoints_are_readmitted_once_healthy(
+    monkeypatch: pytest.MonkeyPatch, status: str
+) -> None:
+    checked = []
+
+    def get(url: str, *, timeout: float) -> _HealthResponse:
+        checked.append(url)
+        return _HealthResponse(status)
+
+    monkeypatch.setattr(endpoints.requests, "get", get)
+    pool = _pool(_Client("a"), _Client("b"))
+    pool.state.outstanding[:] = [0, 1]
+    # still within the retry period, so not checked
+    pool.state.unhealthy_until[0] = time.time() + 60
+    assert pool.request(_directions) == {"endpoint": "b"}
+    assert checked == []
+
+    pool.state.unhealthy_until[0] = time.time() - 1
+    response = pool.request(_directions)
+    assert checked == ["http://a/ors/v2/health"]
+    if status == "ready":
+        assert response == {"endpoint": "a"}
+        assert pool.state.unhealthy_until[0] == 0
+    else:
+        assert response == {"endpoint": "b"}
+        assert pool.state.unhealthy_until[0] > time.time()
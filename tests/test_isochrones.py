@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ioe.constants import (
+    COLUMN_LATITUDE,
+    COLUMN_LONGITUDE,
+    COLUMN_SCHOOL_ID,
+    COLUMN_STUDENT_ID,
+    COLUMN_TRAVEL,
+)
+from ioe.ors import isochrones
+from ioe.ors.isochrones import _band_matters, assign_bands, compute_banded_journeys
+from ioe.spatial import points_in_geometry
+
+_BANDS = (10, 20, 30)
+
+
+def _square(longitude: float, latitude: float, half_width: float) -> list:
+    return [
+        [longitude - half_width, latitude - half_width],
+        [longitude + half_width, latitude - half_width],
+        [longitude + half_width, latitude + half_width],
+        [longitude - half_width, latitude + half_width],
+    ]
+
+
+def _features(longitude: float, latitude: float) -> list[dict]:
+    """Nested squares around a location, 0.01 degrees wide per minute"""
+    return [
+        {
+            "geometry": {
+                "type": "Polygon",
+                "coordinates": [_square(longitude, latitude, band / 100)],
+            }
+        }
+        for band in _BANDS
+    ]
+
+
+def test_points_in_geometry() -> None:
+    longitudes = [0.0, 0.7, 3.0, 5.0, 9.0]
+    latitudes = [0.0, 0.0, 0.0, 0.0, 0.0]
+    polygon = {"type": "Polygon", "coordinates": [_square(0, 0, 1), _square(0, 0, 0.5)]}
+    assert points_in_geometry(longitudes, latitudes, polygon).tolist() == [
+        False,
+        True,
+        False,
+        False,
+        False,
+    ]
+    multipolygon = {
+        "type": "MultiPolygon",
+        "coordinates": [[_square(0, 0, 1)], [_square(5, 0, 1)]],
+    }
+    assert points_in_geometry(longitudes, latitudes, multipolygon).tolist() == [
+        True,
+        True,
+        False,
+        True,
+        False,
+    ]
+
+
+def test_assign_bands() -> None:
+    students = pd.DataFrame(
+        {COLUMN_LONGITUDE: [0.0, 0.15, 0.25, 1.0], COLUMN_LATITUDE: [0.0] * 4}
+    )
+    lower, upper = assign_bands(students, _features(0, 0), _BANDS)
+    assert lower.tolist() == [0, 10, 20, 30]
+    assert upper.tolist() == [10, 20, 30, np.inf]
+
+
+def test_band_matters() -> None:
+    lower = np.array([[0, 10, 20], [30, 30, 0]])
+    upper = np.array([[10, 20, 30], [np.inf, np.inf, 10]])
+    assert _band_matters(lower, upper, 1).tolist() == [
+        [True, False, False],
+        [False, False, True],
+    ]
+    # nothing known within the bands, so every pair is routed
+    assert _band_matters(lower, upper, 2).tolist() == [
+        [True, True, False],
+        [True, True, True],
+    ]
+
+
+@pytest.mark.usefixtures("routes")
+def test_banded_journeys(monkeypatch: pytest.MonkeyPatch) -> None:
+    def fake_isochrones(school: dict, profile: str, bands: tuple) -> list[dict]:
+        assert bands == _BANDS
+        return _features(school[COLUMN_LONGITUDE], school[COLUMN_LATITUDE])
+
+    monkeypatch.setattr(isochrones, "calculate_ors_isochrones", fake_isochrones)
+    students = pd.DataFrame(
+        {
+            COLUMN_STUDENT_ID: [1, 2, 3],
+            COLUMN_LATITUDE: [51.5, 51.5, 51.5],
+            COLUMN_LONGITUDE: [-0.1, -0.25, -0.1],
+            COLUMN_TRAVEL: ["B", "B", "P"],
+        }
+    )
+    # the last school is over 100 km away
+    schools = pd.DataFrame(
+        {
+            COLUMN_SCHOOL_ID: ["IOE00001", "IOE00002", "IOE00003"],
+            COLUMN_LATITUDE: [51.5, 51.5, 52.5],
+            COLUMN_LONGITUDE: [-0.1, -0.25, -0.1],
+        }
+    )
+    journeys, failures = compute_banded_journeys(
+        "test", students, schools, bands=_BANDS, n_alternatives=1
+    )
+
+    times = {(student, school): time for student, school, time, _ in journeys}
+    assert set(times) == {
+        (1, "IOE00001"),
+        (1, "IOE00002"),
+        (2, "IOE00001"),
+        (2, "IOE00002"),
+        (3, "IOE00001"),
+        (3, "IOE00002"),
+        (3, "IOE00003"),
+    }
+    # the schools outside the quickest band keep their upper limit
+    assert times[1, "IOE00002"] == times[2, "IOE00001"] == 20
+    # beyond the largest band there is no bound, so no time
+    assert [(student, school, code) for student, school, code, _ in failures] == [
+        (1, "IOE00003", 404),
+        (2, "IOE00003", 404),
+    ]
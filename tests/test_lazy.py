@@ -0,0 +1,124 @@
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pulp
+import pytest
+from scipy import sparse
+
+from ioe.allocation import lazy
+from ioe.allocation.estimates import lower_bound_travel_times
+from ioe.allocation.lazy import lazy_allocation
+from ioe.allocation.pmedian import create_cost_matrix, solve_allocation
+from ioe.constants import COLUMN_TRAVEL, LARGE_VALUE_PLACEHOLDER
+from ioe.data.accumulator import PairAccumulator
+from ioe.data.data_output import save_output_journeys
+from ioe.main import compute_all_pairs_journeys
+from ioe.scripts import tfl
+from ioe.spatial import pairwise_distances
+
+
+def _times(
+    journeys: PairAccumulator, students: pd.DataFrame, schools: pd.DataFrame
+) -> np.ndarray:
+    return create_cost_matrix(save_output_journeys(journeys, Path()), students, schools)
+
+
+@pytest.mark.usefixtures("routes")
+def test_estimates_are_lower_bounds(
+    students: pd.DataFrame, schools: pd.DataFrame
+) -> None:
+    journeys, _ = compute_all_pairs_journeys("test", students, schools)
+    estimates = lower_bound_travel_times(
+        pairwise_distances(students, schools), students[COLUMN_TRAVEL].to_numpy()
+    )
+    assert (estimates <= _times(journeys, students, schools)).all()
+
+
+@pytest.mark.usefixtures("routes")
+def test_lazy_allocation_matches_full_allocation(
+    students: pd.DataFrame, schools: pd.DataFrame
+) -> None:
+    journeys, failures = compute_all_pairs_journeys("test", students, schools)
+    full = _times(journeys, students, schools)
+    expected = solve_allocation(full, schools)
+
+    lazy_journeys, lazy_failures, allocation = lazy_allocation(
+        "test", students, schools
+    )
+    rows = np.arange(len(students))
+    assert full[rows, allocation].sum() == full[rows, expected].sum()
+    assert (full[rows, allocation] != LARGE_VALUE_PLACEHOLDER).all()
+    # every allocated pair was routed, but not every pair
+    routed = _times(lazy_journeys, students, schools)
+    assert (routed[rows, allocation] == full[rows, allocation]).all()
+    assert len(lazy_journeys) + len(lazy_failures) < len(journeys) + len(failures)
+
+
+@pytest.mark.usefixtures("routes")
+def test_known_journeys_are_not_requested(
+    students: pd.DataFrame, schools: pd.DataFrame, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    journeys, _ = compute_all_pairs_journeys("test", students, schools)
+    full = _times(journeys, students, schools)
+    expected = solve_allocation(full, schools)
+
+    def fail(*args: object, **kwargs: object) -> None:
+        raise AssertionError
+
+    monkeypatch.setattr(lazy, "compute_pair_journeys", fail)
+    new_journeys, _, allocation = lazy_allocation(
+        "test", students, schools, journeys=save_output_journeys(journeys, Path())
+    )
+    assert not len(new_journeys)
+    rows = np.arange(len(students))
+    assert full[rows, allocation].sum() == full[rows, expected].sum()
+
+
+@pytest.mark.usefixtures("routes")
+def test_lazy_outputs_keep_the_known_journeys(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    data_location = Path(__file__).resolve().parents[1] / "data"
+    for name in ("students", "schools"):
+        shutil.copy(data_location / f"example_subject_{name}.csv", tmp_path)
+    monkeypatch.setattr(tfl, "_data_location", tmp_path)
+    journeys_path = tmp_path / "example_subject_student_school_lazy_journeys.csv"
+
+    monkeypatch.setattr(sys, "argv", ["tfl", "example_subject", "--lazy"])
+    tfl.main()
+    first = pd.read_csv(journeys_path)
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["tfl", "example_subject", "--lazy", "--journeys", str(journeys_path)],
+    )
+    tfl.main()
+    second = pd.read_csv(journeys_path)
+    assert len(second) >= len(first)
+    pd.testing.assert_frame_equal(
+        second.merge(first[["student", "school"]]), first, check_like=True
+    )
+
+
+class _InfeasibleSolver(pulp.LpSolver):
+    """A solver which finds every problem infeasible"""
+
+    def actualSolve(self, lp: pulp.LpProblem) -> int:  # noqa: N802
+        lp.assignStatus(pulp.LpStatusInfeasible)
+        return lp.status
+
+
+@pytest.mark.parametrize("sparse_input", [False, True])
+def test_solve_allocation_raises_when_not_optimal(
+    students: pd.DataFrame, schools: pd.DataFrame, sparse_input: bool  # noqa: FBT001
+) -> None:
+    cost_matrix = np.ones((len(students), len(schools)))
+    with pytest.raises(ValueError, match="infeasible"):
+        solve_allocation(
+            sparse.csr_array(cost_matrix) if sparse_input else cost_matrix,
+            schools,
+            solver=_InfeasibleSolver(),
+        )
@@ -0,0 +1,31 @@
+import logging
+import sys
+
+import pytest
+
+from ioe.logs import PairSampler, pair_extra
+from ioe.scripts import tfl
+
+
+def _record(level: int, *, pair: bool) -> logging.LogRecord:
+    record = logging.LogRecord("ioe", level, __file__, 0, "message", None, None)
+    if pair:
+        record.__dict__.update(pair_extra("test", 2, "IOE00043"))
+    return record
+
+
+def test_pair_sampler_keeps_one_in_every_n() -> None:
+    sampler = PairSampler(3)
+    kept = [sampler.filter(_record(logging.INFO, pair=True)) for _ in range(9)]
+    assert sum(kept) == 3
+    assert sampler.filter(_record(logging.INFO, pair=False))
+    assert sampler.filter(_record(logging.WARNING, pair=True))
+
+
+@pytest.mark.parametrize("every", ["0", "-1", "x"])
+def test_log_sample_every_must_be_positive(
+    monkeypatch: pytest.MonkeyPatch, every: str
+) -> None:
+    monkeypatch.setattr(sys, "argv", ["tfl", "test", "--log-sample-every", every])
+    with pytest.raises(SystemExit):
+        tfl._read_args()
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ioe.constants import (
+    BACKEND_TFL,
+    COLUMN_SCHOOL_ID,
+    COLUMN_STUDENT_ID,
+    COLUMN_TFL_LATITUDE,
+    COLUMN_TRAVEL,
+    DEFAULT_LATENCY_SECONDS,
+    MAX_REQUESTS_PER_MINUTE,
+    MINUTES,
+)
+from ioe.main import compute_all_pairs_journeys
+from ioe.planning import estimate_duration, plan_requests
+from ioe.sharding import Shard
+
+
+@pytest.mark.usefixtures("routes")
+def test_plan_counts_the_pairs_of_the_run(
+    students: pd.DataFrame, schools: pd.DataFrame
+) -> None:
+    unique = plan_requests(students, schools)
+    # a repeated student is routed again, so is planned again
+    students = pd.concat([students, students.iloc[:1]], ignore_index=True)
+    plan = plan_requests(students, schools)
+    journeys, failures = compute_all_pairs_journeys("test", students, schools)
+    assert plan["pairs"].sum() == len(journeys) + len(failures)
+    assert plan["pairs"].sum() == unique["pairs"].sum() + len(schools)
+    assert plan["students"].sum() == len(students)
+    assert plan["distinct"].sum() == unique["distinct"].sum()
+
+
+def test_shards_split_the_plan(students: pd.DataFrame, schools: pd.DataFrame) -> None:
+    total = plan_requests(students, schools).set_index(COLUMN_TRAVEL)["pairs"]
+    shards = sum(
+        plan_requests(students, schools, shard=Shard(shard_index=i, n_shards=3))
+        .set_index(COLUMN_TRAVEL)["pairs"]
+        .reindex(total.index, fill_value=0)
+        for i in range(3)
+    )
+    pd.testing.assert_series_equal(shards, total)
+
+
+def test_plan_counts_completed_and_unroutable_pairs(
+    students: pd.DataFrame, schools: pd.DataFrame
+) -> None:
+    students = students.assign(**{COLUMN_TFL_LATITUDE: 51.5})
+    schools = schools.assign(**{COLUMN_TFL_LATITUDE: 51.5})
+    students.loc[students[COLUMN_TRAVEL] == "P", COLUMN_TFL_LATITUDE] = np.nan
+    schools.loc[schools.index[:2], COLUMN_TFL_LATITUDE] = np.nan
+    completed = pd.DataFrame(
+        {
+            "student": students[COLUMN_STUDENT_ID].iloc[:3],
+            "school": schools[COLUMN_SCHOOL_ID].iloc[0],
+        }
+    )
+    plan = plan_requests(students, schools, completed=completed).set_index(
+        COLUMN_TRAVEL
+    )
+    n_public = (students[COLUMN_TRAVEL] == "P").sum()
+    assert plan.loc["P", "unroutable"] == n_public * len(schools)
+    # only public transport is routed by TfL
+    assert plan.drop(index="P")["unroutable"].eq(0).all()
+    assert plan["completed"].sum() == len(completed)
+
+
+def test_duration_is_limited_by_the_rate_limit() -> None:
+    plan = pd.DataFrame(
+        {
+            COLUMN_TRAVEL: ["P"],
+            "backend": [BACKEND_TFL],
+            "students": [100],
+            "pairs": [10_000],
+            "distinct": [10_000],
+            "completed": [0],
+            "unroutable": [1_000],
+        }
+    )
+    estimate, minutes = estimate_duration(plan, DEFAULT_LATENCY_SECONDS, n_cores=64)
+    assert estimate["requests"].item() == 9_000
+    assert minutes == pytest.approx(9_000 / MAX_REQUESTS_PER_MINUTE)
+    _, slow_minutes = estimate_duration(plan, DEFAULT_LATENCY_SECONDS, n_cores=1)
+    assert slow_minutes == pytest.approx(
+        9_000 * DEFAULT_LATENCY_SECONDS[BACKEND_TFL] / MINUTES
+    )
+
+
+def test_completed_pairs_are_requested_again() -> None:
+    plan = pd.DataFrame(
+        {
+            COLUMN_TRAVEL: ["P"],
+            "backend": [BACKEND_TFL],
+            "students": [1],
+            "pairs": [10],
+            "distinct": [10],
+            "completed": [4],
+            "unroutable": [0],
+        }
+    )
+    estimate, _ = estimate_duration(plan, DEFAULT_LATENCY_SECONDS)
+    assert estimate["requests"].item() == 10
@@ -0,0 +1,66 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ioe.allocation.pmedian import (
+    create_cost_matrix,
+    create_sparse_cost_matrix,
+    solve_allocation,
+)
+from ioe.constants import COLUMN_SCHOOL_ID, COLUMN_STUDENT_ID, LARGE_VALUE_PLACEHOLDER
+from ioe.data.data_input import SCHEMA_JOURNEYS, read_data
+
+_data_location = Path(__file__).resolve().parents[1] / "data"
+
+
+@pytest.fixture()
+def journeys() -> pd.DataFrame:
+    return read_data(
+        _data_location / "example_subject_student_school_journeys.csv",
+        schema=SCHEMA_JOURNEYS,
+        cache=False,
+    )
+
+
+def test_sparse_cost_matrix_matches_dense(
+    journeys: pd.DataFrame, students: pd.DataFrame, schools: pd.DataFrame
+) -> None:
+    # a missing pair, a zero minute journey and a pair routed twice
+    journeys = journeys.iloc[1:].copy()
+    journeys.loc[journeys.index[0], "time"] = 0
+    journeys = pd.concat([journeys, journeys.iloc[[1]].assign(time=99)])
+
+    dense = create_cost_matrix(journeys, students, schools)
+    cost_matrix = create_sparse_cost_matrix(journeys, students, schools)
+    assert cost_matrix.nnz == len(students) * len(schools) - 1
+    assert (
+        cost_matrix.toarray() == np.where(dense == LARGE_VALUE_PLACEHOLDER, 0, dense)
+    ).all()
+    first, second = journeys.iloc[:2][["student", "school"]].itertuples(index=False)
+    rows = pd.Index(students[COLUMN_STUDENT_ID])
+    columns = pd.Index(schools[COLUMN_SCHOOL_ID])
+    assert cost_matrix[rows.get_loc(first.student), columns.get_loc(first.school)] == 0
+    assert (
+        cost_matrix[rows.get_loc(second.student), columns.get_loc(second.school)] == 99
+    )
+
+
+@pytest.mark.parametrize("missing", [0, 200])
+def test_sparse_allocation_matches_dense(
+    journeys: pd.DataFrame,
+    students: pd.DataFrame,
+    schools: pd.DataFrame,
+    missing: int,
+) -> None:
+    journeys = journeys.sample(len(journeys) - missing, random_state=0).sort_index()
+    dense = create_cost_matrix(journeys, students, schools)
+    cost_matrix = create_sparse_cost_matrix(journeys, students, schools)
+
+    rows = np.arange(len(students))
+    expected = solve_allocation(dense, schools)
+    allocation = solve_allocation(cost_matrix, schools)
+    assert dense[rows, allocation].sum() == dense[rows, expected].sum()
+    # only the stored pairs can be allocated
+    assert (dense[rows, allocation] != LARGE_VALUE_PLACEHOLDER).all()
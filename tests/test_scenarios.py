@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ioe.allocation.scenarios import Scenario, scale_capacities, sweep_scenarios
+from ioe.constants import COLUMN_COUNT
+
+
+@pytest.mark.parametrize(
+    ("capacities", "scale", "expected"),
+    [
+        ([1] * 10, 0.9, 9),
+        ([1] * 10, 0.5, 5),
+        ([1] * 10, 1.5, 15),
+        ([3, 1, 2], 1.0, 6),
+        ([3, 1, 2], 0.5, 3),
+    ],
+)
+def test_scale_capacities_scales_the_total(
+    capacities: list[int], scale: float, expected: int
+) -> None:
+    scaled = scale_capacities(np.array(capacities), scale)
+    assert scaled.sum() == expected
+    assert (np.abs(scaled - np.array(capacities) * scale) < 1).all()
+
+
+def test_sweep_scenarios(students: pd.DataFrame, schools: pd.DataFrame) -> None:
+    rng = np.random.default_rng(0)
+    cost_matrix = rng.integers(5, 60, size=(len(students), len(schools)))
+    summary = sweep_scenarios(
+        cost_matrix,
+        schools,
+        [Scenario(), Scenario(capacity_scale=0.5), Scenario(p_facilities=0)],
+    ).set_index("scenario")
+    assert summary["status"].tolist() == ["Optimal", "Optimal", "Infeasible"]
+    fill = summary.filter(like="fill ").iloc[1]
+    capacities = scale_capacities(schools[COLUMN_COUNT].to_numpy(), 0.5)
+    assert (fill.to_numpy() <= capacities).all()
+    assert summary.index[2].endswith("p 0")
@@ -0,0 +1,93 @@
+import os
+import shutil
+import threading
+from pathlib import Path
+
+import pytest
+
+from ioe import service as service_module
+from ioe.main import create_process_pool
+from ioe.service import AllocationService, SubjectData
+
+_data_location = Path(__file__).resolve().parents[1] / "data"
+
+_SUBJECTS = ("example_subject", "other_subject")
+
+
+@pytest.fixture()
+def data_location(tmp_path: Path) -> Path:
+    for subject in _SUBJECTS:
+        for name in ("students", "schools", "student_school_journeys"):
+            shutil.copy(
+                _data_location / f"example_subject_{name}.csv",
+                tmp_path / f"{subject}_{name}.csv",
+            )
+    return tmp_path
+
+
+def test_pool_starts_without_forking() -> None:
+    with create_process_pool(1, start_method=service_module._START_METHOD) as executor:
+        assert executor.submit(os.getpid).result() != os.getpid()
+
+
+@pytest.mark.usefixtures("routes")
+def test_travel_times_reuse_one_pool(data_location: Path) -> None:
+    # the fake routes are only patched into forked workers
+    with AllocationService(data_location, n_cores=2, start_method="fork") as service:
+        executor = service._executor
+        assert executor is not None
+        for latitude in (51.52, 51.53):
+            result = service.travel_times(
+                "example_subject",
+                {"latitude": latitude, "longitude": -0.13, "travel": "P"},
+            )
+            assert len(result["journeys"]) + len(result["failures"]) == len(
+                service.subject("example_subject").schools
+            )
+            assert service._executor is executor
+    assert service._executor is None
+
+
+def test_reloading_a_subject_serves_the_others(
+    data_location: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    service = AllocationService(data_location)
+    load = service._load
+    loading, release = threading.Event(), threading.Event()
+
+    def slow_load(subject: str, signature: tuple) -> SubjectData:
+        if subject == "other_subject":
+            loading.set()
+            release.wait()
+        return load(subject, signature)
+
+    monkeypatch.setattr(service, "_load", slow_load)
+    thread = threading.Thread(target=service.subject, args=("other_subject",))
+    thread.start()
+    try:
+        assert loading.wait(10)
+        assert len(service.subject("example_subject").students) > 0
+    finally:
+        release.set()
+        thread.join()
+    assert "other_subject" in service._subjects
+
+
+@pytest.mark.usefixtures("routes")
+def test_travel_times_are_bounded(
+    data_location: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(service_module, "_MAX_TRAVEL_TIMES", 2)
+    with AllocationService(data_location, start_method="fork") as service:
+        for latitude in (51.51, 51.52, 51.53, 51.52):
+            service.travel_times(
+                "example_subject",
+                {"latitude": latitude, "longitude": -0.13, "travel": "P"},
+            )
+        assert [k[2] for k in service._travel_times] == [51.53, 51.52]
+
+        # a reload drops the travel times of the previous data
+        schools = data_location / "example_subject_schools.csv"
+        os.utime(schools, ns=(0, schools.stat().st_mtime_ns + 10**9))
+        service.subject("example_subject")
+        assert not service._travel_times
@@ -0,0 +1,137 @@
+import shutil
+import sys
+from argparse import ArgumentTypeError
+from pathlib import Path
+from types import ModuleType
+
+import pandas as pd
+import pytest
+
+from ioe.data.alternatives import read_alternatives
+from ioe.scripts import merge, tfl
+from ioe.scripts.merge import _check_pairs
+from ioe.sharding import Shard, assign_shards, parse_shard
+
+_data_location = Path(__file__).resolve().parents[1] / "data"
+
+_SUBJECT = "example_subject"
+
+
+def _run(monkeypatch: pytest.MonkeyPatch, module: ModuleType, *args: str) -> None:
+    monkeypatch.setattr(sys, "argv", [module.__name__, *args])
+    module.main()
+
+
+@pytest.fixture()
+def data_location(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    for name in ("students", "schools"):
+        shutil.copy(_data_location / f"{_SUBJECT}_{name}.csv", tmp_path)
+    monkeypatch.setattr(tfl, "_data_location", tmp_path)
+    monkeypatch.setattr(merge, "_data_location", tmp_path)
+    return tmp_path
+
+
+def test_parse_shard() -> None:
+    assert parse_shard("1/4") == Shard(shard_index=1, n_shards=4)
+    assert str(parse_shard("1/4")) == "1/4"
+    for spec in ("4/4", "-1/4", "1", "a/b"):
+        with pytest.raises(ArgumentTypeError):
+            parse_shard(spec)
+
+
+def test_shards_partition_the_pairs() -> None:
+    shards = assign_shards(range(100), ["IOE00043"] * 100, 3)
+    assert set(shards) == {0, 1, 2}
+    assert (shards == assign_shards(range(100), ["IOE00043"] * 100, 3)).all()
+
+
+@pytest.mark.usefixtures("routes")
+@pytest.mark.parametrize("n_shards", [1, 3])
+def test_merged_shards_match_a_single_run(
+    data_location: Path, monkeypatch: pytest.MonkeyPatch, n_shards: int
+) -> None:
+    outputs = [
+        data_location / f"{_SUBJECT}_student_school_{name}.csv"
+        for name in ("journeys", "failures")
+    ]
+    alternatives_path = (
+        data_location / f"{_SUBJECT}_student_school_alternatives.parquet"
+    )
+    _run(monkeypatch, tfl, _SUBJECT, "--alternatives")
+    expected = [pd.read_csv(f) for f in outputs]
+    expected_alternatives = read_alternatives(alternatives_path)
+    for f in [*outputs, alternatives_path]:
+        f.unlink()
+
+    for shard_index in range(n_shards):
+        _run(
+            monkeypatch,
+            tfl,
+            _SUBJECT,
+            "--alternatives",
+            "--shard",
+            f"{shard_index}/{n_shards}",
+        )
+    _run(monkeypatch, merge, _SUBJECT, str(n_shards))
+    for f, df in zip(outputs, expected, strict=True):
+        pd.testing.assert_frame_equal(pd.read_csv(f), df)
+    # a single run lists the pairs by school, the merge by student
+    pd.testing.assert_frame_equal(
+        read_alternatives(alternatives_path).astype({"school": str}),
+        expected_alternatives.astype({"school": str})
+        .sort_values(["student", "school", "rank"], kind="stable")
+        .reset_index(drop=True),
+    )
+
+
+@pytest.mark.usefixtures("routes")
+def test_merge_requires_every_shard(
+    data_location: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    _run(monkeypatch, tfl, _SUBJECT, "--shard", "0/2")
+    with pytest.raises(FileNotFoundError, match="shard 1/2"):
+        _run(monkeypatch, merge, _SUBJECT, "2")
+
+
+def _records(*pairs: tuple[int, str]) -> pd.DataFrame:
+    return pd.DataFrame(pairs, columns=["student", "school"])
+
+
+def test_check_pairs() -> None:
+    student_ids = pd.Series([1, 2, 2])
+    school_ids = pd.Series(["IOE00043", "IOE00044"])
+    journeys = _records((1, "IOE00043"), (1, "IOE00044"), (2, "IOE00043"))
+    # the repeated student is routed once per row
+    failures = _records((2, "IOE00044"), (2, "IOE00043"), (2, "IOE00044"))
+    _check_pairs(journeys, failures, student_ids, school_ids)
+
+    with pytest.raises(ValueError, match="overlap"):
+        _check_pairs(journeys, journeys, student_ids, school_ids)
+    # an unexpected pair in place of a missing one
+    with pytest.raises(ValueError, match="unexpected"):
+        _check_pairs(
+            journeys,
+            pd.concat([failures.iloc[:2], _records((3, "IOE00044"))]),
+            student_ids,
+            school_ids,
+        )
+    with pytest.raises(ValueError, match="missing 1 records"):
+        _check_pairs(journeys, failures.iloc[:2], student_ids, school_ids)
+
+
+@pytest.mark.usefixtures("routes")
+def test_merge_keeps_repeated_students(
+    data_location: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    students_path = data_location / f"{_SUBJECT}_students.csv"
+    students = pd.read_csv(students_path)
+    pd.concat([students, students.iloc[:1]]).to_csv(students_path, index=False)
+    for shard_index in range(2):
+        _run(monkeypatch, tfl, _SUBJECT, "--shard", f"{shard_index}/2")
+    _run(monkeypatch, merge, _SUBJECT, "2")
+    n_records = sum(
+        len(pd.read_csv(data_location / f"{_SUBJECT}_student_school_{name}.csv"))
+        for name in ("journeys", "failures")
+    )
+    n_schools = len(pd.read_csv(data_location / f"{_SUBJECT}_schools.csv"))
+    assert n_records == (len(students) + 1) * n_schools
@@ -0,0 +1,82 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import fake_journeys
+
+from ioe.constants import (
+    ACCESS_SPEEDS_KMH,
+    COLUMN_LATITUDE,
+    COLUMN_LONGITUDE,
+    COLUMN_SCHOOL_ID,
+    COLUMN_STOP_LATITUDE,
+    COLUMN_STOP_LONGITUDE,
+    COLUMN_STUDENT_ID,
+    COLUMN_TFL_ACCESS_MINUTES,
+    COLUMN_TFL_LATITUDE,
+    COLUMN_TFL_LONGITUDE,
+    MINUTES,
+)
+from ioe.data.alternatives import AlternativesStore, constrained_journeys
+from ioe.spatial import haversine_distances
+from ioe.tfl import journeys
+from ioe.tfl.stops import snap_to_stops
+
+_STOPS = pd.DataFrame({COLUMN_STOP_LATITUDE: [51.5], COLUMN_STOP_LONGITUDE: [-0.1]})
+
+
+def test_snap_to_stops() -> None:
+    # at the stop, 1 km from it, 5 km from it and the first one again
+    locations = pd.DataFrame(
+        {
+            COLUMN_LATITUDE: [51.5, 51.509, 51.545, 51.5],
+            COLUMN_LONGITUDE: [-0.1, -0.1, -0.1, -0.1],
+        }
+    )
+    snapped = snap_to_stops(locations, _STOPS)
+
+    assert snapped[COLUMN_TFL_LATITUDE].tolist()[:2] == [51.5, 51.5]
+    assert snapped[COLUMN_TFL_LONGITUDE].tolist()[:2] == [-0.1, -0.1]
+    distance = haversine_distances(51.509, -0.1, 51.5, -0.1)
+    assert snapped[COLUMN_TFL_ACCESS_MINUTES].tolist()[:2] == [
+        0.0,
+        pytest.approx(distance / ACCESS_SPEEDS_KMH["P"] * MINUTES),
+    ]
+    assert np.isnan(snapped.loc[2, [COLUMN_TFL_LATITUDE, COLUMN_TFL_LONGITUDE]]).all()
+    pd.testing.assert_series_equal(snapped.iloc[3], snapped.iloc[0], check_names=False)
+
+
+class _Response:
+    """The parts of a TfL response read by `_create_journey`"""
+
+    elapsed = timedelta(seconds=1)
+
+    def json(self) -> dict:
+        return {"journeys": fake_journeys(20)}
+
+
+def test_alternatives_include_the_access_walks() -> None:
+    student = pd.Series(
+        {COLUMN_STUDENT_ID: 2, COLUMN_TFL_ACCESS_MINUTES: 6.4}, dtype=object
+    )
+    school = {COLUMN_SCHOOL_ID: "IOE00043", COLUMN_TFL_ACCESS_MINUTES: 3.2}
+    alternatives = AlternativesStore()
+    _, _, duration, _ = journeys._create_journey(
+        "test",
+        student,
+        school,
+        _Response(),  # type: ignore[arg-type]
+        alternatives=alternatives,
+        keep_message=False,
+    )
+    assert duration == 20 + 6 + 3
+
+    stored = alternatives.to_frame()
+    quickest = stored[stored["rank"] == 0]
+    assert quickest["mode"].tolist() == ["walking", "walking", "bus", "walking"]
+    assert quickest["leg_duration"].tolist() == [6, 2, 18, 3]
+    assert stored.groupby("rank")["duration"].first().tolist() == [29, 34]
+    # the quickest alternative walks 11 minutes, the other one 34
+    assert constrained_journeys(stored)["time"].tolist() == [duration]
+    assert constrained_journeys(stored, max_walking_minutes=10).empty